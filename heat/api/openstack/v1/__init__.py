@@ -299,6 +299,14 @@ class API(wsgi.Router):
                                '{output_key}',
                         'action': 'show_output',
                         'method': 'GET'
+                    },
+
+                    # Stack trace
+                    {
+                        'name': 'stack_trace',
+                        'url': '/stacks/{stack_name}/{stack_id}/trace',
+                        'action': 'trace',
+                        'method': 'GET'
                     }
                 ])
 
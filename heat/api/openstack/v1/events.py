@@ -93,7 +93,7 @@ class EventController(object):
 
     def _event_list(self, req, identity, detail=False, filters=None,
                     limit=None, marker=None, sort_keys=None, sort_dir=None,
-                    nested_depth=None):
+                    nested_depth=None, tail=False):
         events = self.rpc_client.list_events(req.context,
                                              identity,
                                              filters=filters,
@@ -101,7 +101,8 @@ class EventController(object):
                                              marker=marker,
                                              sort_keys=sort_keys,
                                              sort_dir=sort_dir,
-                                             nested_depth=nested_depth)
+                                             nested_depth=nested_depth,
+                                             tail=tail)
         keys = None if detail else summary_keys
 
         return [format_event(req, e, keys) for e in events]
@@ -115,6 +116,7 @@ class EventController(object):
             'sort_dir': util.PARAM_TYPE_SINGLE,
             'sort_keys': util.PARAM_TYPE_MULTI,
             'nested_depth': util.PARAM_TYPE_SINGLE,
+            'tail': util.PARAM_TYPE_SINGLE,
         }
         filter_whitelist = {
             'resource_status': util.PARAM_TYPE_MIXED,
@@ -131,6 +133,9 @@ class EventController(object):
                 if key in params:
                     params[key] = param_utils.extract_int(
                         key, params[key], allow_zero=True)
+            if rpc_api.PARAM_TAIL in params:
+                params[rpc_api.PARAM_TAIL] = param_utils.extract_bool(
+                    rpc_api.PARAM_TAIL, params[rpc_api.PARAM_TAIL])
         except ValueError as e:
             raise exc.HTTPBadRequest(six.text_type(e))
 
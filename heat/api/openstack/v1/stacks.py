@@ -183,6 +183,12 @@ class StackController(object):
         except ValueError as e:
             raise exc.HTTPBadRequest(six.text_type(e))
 
+    def _live_outputs(self, params):
+        p_name = rpc_api.PARAM_LIVE_OUTPUTS
+        if p_name in params:
+            return self._extract_bool_param(p_name, params[p_name])
+        return False
+
     def _extract_int_param(self, name, value,
                            allow_zero=True, allow_negative=False):
         try:
@@ -197,6 +203,18 @@ class StackController(object):
         except ValueError as e:
             raise exc.HTTPBadRequest(six.text_type(e))
 
+    def _extract_fields_param(self, fields):
+        # The id, links and project are derived from the stack identity,
+        # which is always returned, so they need not be requested.
+        always_shown = ('id', 'links', 'project')
+        allowed = set(stacks_view.basic_keys) - set([rpc_api.STACK_ID])
+        invalid = [f for f in fields
+                   if f not in allowed and f not in always_shown]
+        if invalid:
+            msg = _('Invalid fields: %s') % ', '.join(invalid)
+            raise exc.HTTPBadRequest(msg)
+        return [f for f in fields if f not in always_shown]
+
     def _index(self, req, use_admin_cnxt=False):
         filter_whitelist = {
             # usage of keys in this list are not encouraged, please use
@@ -221,6 +239,7 @@ class StackController(object):
             'tags_any': util.PARAM_TYPE_SINGLE,
             'not_tags': util.PARAM_TYPE_SINGLE,
             'not_tags_any': util.PARAM_TYPE_SINGLE,
+            'fields': util.PARAM_TYPE_MULTI,
         }
         params = util.get_allowed_params(req.params, whitelist)
         stack_keys = dict.fromkeys(rpc_api.STACK_KEYS, util.PARAM_TYPE_MIXED)
@@ -289,6 +308,10 @@ class StackController(object):
                 params[rpc_api.PARAM_NOT_TAGS_ANY])
             not_tags_any = params[rpc_api.PARAM_NOT_TAGS_ANY]
 
+        if rpc_api.PARAM_FIELDS in params:
+            params[rpc_api.PARAM_FIELDS] = self._extract_fields_param(
+                params[rpc_api.PARAM_FIELDS])
+
         # get the with_count value, if invalid, raise ValueError
         with_count = False
         if req.params.get('with_count'):
@@ -296,6 +319,12 @@ class StackController(object):
                 'with_count',
                 req.params.get('with_count'))
 
+        approximate = False
+        p_name = rpc_api.PARAM_APPROXIMATE_COUNT
+        if req.params.get(p_name):
+            approximate = self._extract_bool_param(
+                p_name, req.params.get(p_name))
+
         if not filter_params:
             filter_params = None
 
@@ -322,7 +351,8 @@ class StackController(object):
                                                      tags=tags,
                                                      tags_any=tags_any,
                                                      not_tags=not_tags,
-                                                     not_tags_any=not_tags_any)
+                                                     not_tags_any=not_tags_any,
+                                                     approximate=approximate)
             except AttributeError as ex:
                 LOG.warning(_LW("Old Engine Version: %s"), ex)
 
@@ -436,8 +466,10 @@ class StackController(object):
                 p_name, params[p_name])
         else:
             resolve_outputs = True
+        live_outputs = self._live_outputs(params)
         stack_list = self.rpc_client.show_stack(req.context,
-                                                identity, resolve_outputs)
+                                                identity, resolve_outputs,
+                                                live_outputs=live_outputs)
 
         if not stack_list:
             raise exc.HTTPInternalServerError()
@@ -727,9 +759,15 @@ class StackController(object):
 
     @util.identified_stack
     def show_output(self, req, identity, output_key):
-        return {'output': self.rpc_client.show_output(req.context,
-                                                      identity,
-                                                      output_key)}
+        live_outputs = self._live_outputs(req.params)
+        return {'output': self.rpc_client.show_output(
+            req.context, identity, output_key, live_outputs=live_outputs)}
+
+    @util.identified_stack
+    def trace(self, req, identity):
+        """Show the critical path of the latest traced stack operation."""
+        return {'trace': self.rpc_client.get_stack_trace(req.context,
+                                                         identity)}
 
 
 class StackSerializer(serializers.JSONResponseSerializer):
@@ -133,14 +133,35 @@ def purge_deleted():
     """Remove database records that have been previously soft deleted."""
     utils.purge_deleted(CONF.command.age,
                         CONF.command.granularity,
-                        CONF.command.project_id)
+                        CONF.command.project_id,
+                        CONF.command.batch_size,
+                        CONF.command.pause)
 
 
 def do_crypt_parameters_and_properties():
     """Encrypt/decrypt hidden parameters and resource properties data."""
     ctxt = context.get_admin_context()
     prev_encryption_key = CONF.command.previous_encryption_key
-    if CONF.command.crypt_operation == "encrypt":
+    if CONF.command.dry_run:
+        estimates = utils.estimate_crypt_parameters_and_properties(
+            ctxt, CONF.command.crypt_operation, prev_encryption_key,
+            CONF.command.batch_size, CONF.command.workers or 1)
+        print_format = "%-16s %-12s %-12s %-16s"
+        print(print_format % (_('Table'), _('Rows'), _('Sampled'),
+                              _('Estimated Secs')))
+        for table, estimate in sorted(estimates.items()):
+            print(print_format % (table, estimate['rows'],
+                                  estimate['sampled'],
+                                  '%.1f' % estimate['estimated_seconds']))
+    elif CONF.command.workers or CONF.command.checkpoint:
+        excs = utils.crypt_parameters_and_properties(
+            ctxt, CONF.command.crypt_operation, prev_encryption_key,
+            CONF.command.verbose_update_params, CONF.command.batch_size,
+            CONF.command.workers or 1, CONF.command.checkpoint)
+        if excs:
+            print(_('%d rows could not be processed, see the log for '
+                    'details.') % len(excs))
+    elif CONF.command.crypt_operation == "encrypt":
         utils.encrypt_parameters_and_properties(
             ctxt, prev_encryption_key, CONF.command.verbose_update_params)
     elif CONF.command.crypt_operation == "decrypt":
@@ -179,6 +200,16 @@ def add_command_parsers(subparsers):
     parser.add_argument(
         '-p', '--project-id',
         help=_('Project ID to purge deleted stacks.'))
+    # optional parameter, can be skipped. default=20
+    parser.add_argument(
+        '-b', '--batch-size', type=int, default=20,
+        help=_('Number of stacks to purge in each transaction, oldest '
+               'first, defaults to 20.'))
+    # optional parameter, can be skipped. default=0
+    parser.add_argument(
+        '--pause', type=float, default=0,
+        help=_('Seconds to wait between batches, to reduce the load on the '
+               'database, defaults to 0.'))
     # update_params parser
     parser = subparsers.add_parser('update_params')
     parser.set_defaults(func=do_crypt_parameters_and_properties)
@@ -197,6 +228,22 @@ def add_command_parsers(subparsers):
     parser.add_argument('--verbose-update-params', action='store_true',
                         help=_('Print an INFO message when processing of each '
                                'raw_template or resource begins or ends'))
+    parser.add_argument('--workers', type=int,
+                        help=_('Number of worker processes to share the '
+                               'encryption or decryption between. Rows are '
+                               'written back in batches, and rows modified '
+                               'in the meantime are skipped and reported.'))
+    parser.add_argument('--batch-size', type=int, default=50,
+                        help=_('Number of rows to read and write back at a '
+                               'time, defaults to 50.'))
+    parser.add_argument('--checkpoint',
+                        help=_('File in which to record the progress, so '
+                               'that an interrupted run can be resumed by '
+                               'running it again with the same file.'))
+    parser.add_argument('--dry-run', action='store_true',
+                        help=_('Only count the rows to process and estimate '
+                               'the time it would take, by processing the '
+                               'first batch without writing it back.'))
 
     parser = subparsers.add_parser('resource_data_list')
     parser.set_defaults(func=do_resource_data_list)
@@ -80,9 +80,28 @@ service_opts = [
     cfg.IntOpt('max_template_size',
                default=524288,
                help=_('Maximum raw byte size of any template.')),
+    cfg.IntOpt('template_url_cache_size',
+               default=0,
+               help=_('Maximum number of templates and files fetched from '
+                      'http(s) URLs to keep in memory. A cached copy is used '
+                      'only when the server confirms that it is still '
+                      'current, using its ETag or Last-Modified header. '
+                      'Set to 0 to disable the in-memory cache.')),
+    cfg.StrOpt('template_url_cache_dir',
+               help=_('Directory in which to cache templates and files '
+                      'fetched from http(s) URLs, so that the cache is '
+                      'shared between processes and survives restarts. '
+                      'Like the in-memory cache, a cached copy is used only '
+                      'when the server confirms that it is still current.')),
     cfg.IntOpt('max_nested_stack_depth',
                default=5,
                help=_('Maximum depth allowed when using nested stacks.')),
+    cfg.IntOpt('max_repeat_size',
+               default=100000,
+               min=1,
+               help=_('Maximum number of items that the repeat intrinsic '
+                      'function may generate, which is the product of the '
+                      'lengths of the lists in its for_each argument.')),
     cfg.IntOpt('num_engine_workers',
                help=_('Number of heat-engine processes to fork and run. '
                       'Will default to either to 4 or number of CPUs on '
@@ -127,6 +146,12 @@ engine_opts = [
                default=100,
                help=_('Maximum number of stacks any one tenant may have'
                       ' active at one time.')),
+    cfg.IntOpt('approximate_stack_count_limit',
+               default=1000,
+               min=1,
+               help=_('Maximum number of stacks counted when an approximate '
+                      'stack count is requested. Larger counts are reported '
+                      'as this number.')),
     cfg.IntOpt('action_retry_limit',
                default=5,
                help=_('Number of times to retry to bring a '
@@ -160,6 +185,15 @@ engine_opts = [
                help=_('Maximum events that will be available per stack. Older'
                       ' events will be deleted when this is reached. Set to 0'
                       ' for unlimited events per stack.')),
+    cfg.FloatOpt('deployment_metadata_publish_delay',
+                 default=0,
+                 min=0,
+                 help=_('Seconds to wait before publishing the metadata of '
+                        'a server to Swift or Zaqar after one of its '
+                        'software deployments changes. Changes made in the '
+                        'meantime are published together. Metadata still '
+                        'waiting when the engine stops is published as it '
+                        'stops, but is lost if the engine is killed.')),
     cfg.IntOpt('stack_action_timeout',
                default=3600,
                help=_('Timeout in seconds for stack action (ie. create or'
@@ -169,10 +203,46 @@ engine_opts = [
                help=_('The amount of time in seconds after an error has'
                       ' occurred that tasks may continue to run before'
                       ' being cancelled.')),
+    cfg.IntOpt('max_concurrent_resource_actions',
+               default=0,
+               min=0,
+               help=_('Maximum number of resources of a stack that may be '
+                      'in progress at the same time during a legacy stack '
+                      'action. Set to 0 for unlimited.')),
+    cfg.DictOpt('resource_type_concurrency_limits',
+                default={},
+                help=_('Maximum number of resources of a given type that '
+                       'may be in progress at the same time during a legacy '
+                       'stack action, e.g. "OS::Nova::Server:50". Resources '
+                       'that are ready to start wait for a free slot, with '
+                       'those on the longest dependency chain started '
+                       'first.')),
+    cfg.IntOpt('max_poll_interval',
+               default=10,
+               min=1,
+               help=_('Maximum interval in seconds between checks for '
+                      'completion of resources, such as servers and '
+                      'volumes, whose polling backs off exponentially.')),
+    cfg.BoolOpt('cache_stack_outputs',
+                default=True,
+                help=_('Store the resolved values of stack outputs with the '
+                       'stack when it completes an action, and serve them '
+                       'from there until the stack or its resources '
+                       'change.')),
     cfg.IntOpt('engine_life_check_timeout',
                default=2,
                help=_('RPC timeout for the engine liveness check that is used'
                       ' for stack locking.')),
+    cfg.IntOpt('stack_lock_lease_duration',
+               default=0,
+               help=_('Number of seconds for which a stack lock is leased. '
+                      'An engine renews the leases of all of the locks it '
+                      'holds every third of this time, and other engines '
+                      'consider a lock whose lease has expired to be stale '
+                      'without checking over RPC whether the engine holding '
+                      'it is alive. Lease expiry is measured by the '
+                      'database server\'s clock. Set to 0 to disable '
+                      'leases.')),
     cfg.BoolOpt('enable_cloud_watch_lite',
                 default=False,
                 help=_('Enable the legacy OS::Heat::CWLiteAlarm resource.')),
@@ -187,6 +257,36 @@ engine_opts = [
                 help=_('Enables engine with convergence architecture. All '
                        'stacks with this option will be created using '
                        'convergence engine.')),
+    cfg.FloatOpt('convergence_sync_point_coalesce_window',
+                 default=0.0,
+                 min=0.0,
+                 help=_('Time in seconds for which an engine collects '
+                        'notifications from the predecessors of a '
+                        'convergence sync point before writing them to the '
+                        'database in a single update. This reduces '
+                        'conflicting updates for resources with many '
+                        'dependencies. Set to 0 to write every notification '
+                        'immediately.')),
+    cfg.IntOpt('template_cache_size',
+               default=100,
+               min=0,
+               help=_('Maximum number of parsed templates of convergence '
+                      'stacks that each engine process keeps in memory, so '
+                      'that they need not be reloaded and decrypted from the '
+                      'database each time a stack is loaded. Set to 0 to '
+                      'disable the cache.')),
+    cfg.BoolOpt('enable_stack_tracing',
+                default=False,
+                help=_('Record the time spent in each phase of each resource '
+                       'action during stack operations, and store it so that '
+                       'the critical path of the most recent operation on a '
+                       'stack can be retrieved through the API.')),
+    cfg.IntOpt('max_traced_operations_per_stack',
+               default=5,
+               min=1,
+               help=_('Maximum number of operations on each stack whose '
+                      'traces are kept. When a new operation is traced, '
+                      'the traces of the oldest operations are deleted.')),
     cfg.BoolOpt('observe_on_update',
                 default=False,
                 help=_('On update, enables heat to collect existing resource '
@@ -348,6 +448,16 @@ client_http_log_debug_opts = [
                 default=False,
                 help=_("Allow client's debug log output."))]
 
+nova_client_opts = [
+    cfg.IntOpt('server_status_batch_interval',
+               default=0,
+               min=0,
+               help=_('If set, the status of servers that resources are '
+                      'waiting on is refreshed for all of the servers in a '
+                      'project with a single request at most once in this '
+                      'many seconds, instead of with a request for each '
+                      'server. Set to 0 to disable.'))]
+
 revision_group = cfg.OptGroup('revision')
 revision_opts = [
     cfg.StrOpt('heat_revision',
@@ -413,6 +523,7 @@ def list_opts():
     yield 'clients_heat', heat_client_opts
     yield 'clients_keystone', keystone_client_opts
     yield 'clients_nova', client_http_log_debug_opts
+    yield 'clients_nova', nova_client_opts
     yield 'clients_cinder', client_http_log_debug_opts
 
 
@@ -14,6 +14,126 @@
 import six
 
 from heat.common import exception
+from heat.objects import resource as resource_objects
+
+_FAILED = 'FAILED'
+
+
+def _member_key(failed, created_time, name):
+    # Failed members sort first, then by created_time then by name
+    return (not failed, created_time, name)
+
+
+class GroupInspector(object):
+    """A snapshot of the members of a group.
+
+    The members of the group are looked up only once, so to resolve an
+    attribute that fans out across every member, use a single inspector for
+    the whole resolution rather than the module-level functions below, which
+    each take a new snapshot.
+
+    If the group's nested stack is not already loaded, the sizes and names of
+    the members are read with a single database query of the nested stack's
+    resources; the nested stack is loaded only when the member resources
+    themselves are needed.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self._rows = None
+        self._members = None
+        self._nested_stack = None
+        self._nested_loaded = False
+
+    def _nested(self):
+        if not self._nested_loaded:
+            self._nested_stack = self.group.nested()
+            self._nested_loaded = True
+        return self._nested_stack
+
+    def _use_db(self):
+        # A nested stack that is already loaded may have changed in memory,
+        # so it must be preferred to the database.
+        return (not self._nested_loaded and
+                getattr(self.group, '_nested', None) is None and
+                self.group.resource_id is not None)
+
+    def _member_rows(self):
+        """Return (name, failed) for every member, in sorted order."""
+        if self._rows is None:
+            if self._use_db():
+                summaries = resource_objects.Resource.get_summaries_by_stack(
+                    self.group.context, self.group.resource_id)
+                keys = sorted(_member_key(status == _FAILED, created, name)
+                              for name, status, created in summaries)
+                self._rows = [(name, not ok) for ok, created, name in keys]
+            else:
+                self._rows = [(r.name, r.status == r.FAILED)
+                              for r in self._all_members()]
+        return self._rows
+
+    def _all_members(self):
+        """Return every member resource, including failed ones, sorted."""
+        if self._members is None:
+            nested = self._nested()
+            resources = list(six.itervalues(nested)) if nested else []
+            self._members = sorted(
+                resources,
+                key=lambda r: _member_key(r.status == r.FAILED,
+                                          r.created_time, r.name))
+        return self._members
+
+    def size(self, include_failed=False):
+        """Return the number of members of the group."""
+        return sum(1 for name, failed in self._member_rows()
+                   if include_failed or not failed)
+
+    def member_names(self, include_failed=False):
+        """Return the sorted list of names of the members of the group."""
+        return [name for name, failed in self._member_rows()
+                if include_failed or not failed]
+
+    def members(self, include_failed=False):
+        """Return the sorted list of member resources of the group."""
+        return [r for r in self._all_members()
+                if include_failed or r.status != r.FAILED]
+
+    def member_refids(self, exclude=None):
+        """Return the sorted list of reference IDs of the members."""
+        exclude = set(exclude or [])
+        refids = (r.FnGetRefId() for r in self.members())
+        return [refid for refid in refids if refid not in exclude]
+
+    def resource(self, key, use_indices, resource_name):
+        """Return a member, by its index in the sorted list or its name."""
+        nested_stack = self._nested()
+        if not nested_stack:
+            return None
+        try:
+            if use_indices:
+                return self.members()[int(resource_name)]
+            else:
+                return nested_stack[resource_name]
+        except (IndexError, KeyError):
+            raise exception.InvalidTemplateAttribute(
+                resource=self.group.name, key=key)
+
+    def rsrc_attr(self, key, use_indices, resource_name, *attr_path):
+        resource = self.resource(key, use_indices, resource_name)
+        if resource:
+            return resource.FnGetAtt(*attr_path)
+
+    def rsrc_id(self, key, use_indices, resource_name):
+        resource = self.resource(key, use_indices, resource_name)
+        if resource:
+            return resource.FnGetRefId()
+
+    def nested_attrs(self, key, use_indices, *path):
+        path = key.split(".", 2)[1:] + list(path)
+        if len(path) > 1:
+            return self.rsrc_attr(key, use_indices, *path)
+        else:
+            return self.rsrc_id(key, use_indices, *path)
 
 
 def get_size(group, include_failed=False):
@@ -22,12 +142,7 @@ def get_size(group, include_failed=False):
     The size exclude failed members default, set include_failed=True
     to get total size.
     """
-    if group.nested():
-        resources = [r for r in six.itervalues(group.nested())
-                     if include_failed or r.status != r.FAILED]
-        return len(resources)
-    else:
-        return 0
+    return GroupInspector(group).size(include_failed)
 
 
 def get_members(group, include_failed=False):
@@ -37,13 +152,7 @@ def get_members(group, include_failed=False):
     If include_failed is set, failed members will be put first in the
     list sorted by created_time then by name.
     """
-    resources = []
-    if group.nested():
-        resources = [r for r in six.itervalues(group.nested())
-                     if include_failed or r.status != r.FAILED]
-
-    return sorted(resources,
-                  key=lambda r: (r.status != r.FAILED, r.created_time, r.name))
+    return GroupInspector(group).members(include_failed)
 
 
 def get_member_refids(group, exclude=None):
@@ -51,14 +160,7 @@ def get_member_refids(group, exclude=None):
 
     The list of resources is sorted first by created_time then by name.
     """
-    members = get_members(group)
-    if len(members) == 0:
-        return []
-
-    if exclude is None:
-        exclude = []
-    return [r.FnGetRefId() for r in members
-            if r.FnGetRefId() not in exclude]
+    return GroupInspector(group).member_refids(exclude)
 
 
 def get_member_names(group):
@@ -66,41 +168,24 @@ def get_member_names(group):
 
     Failed resources will be ignored.
     """
-    return [r.name for r in get_members(group)]
+    return GroupInspector(group).member_names()
 
 
 def get_resource(stack, resource_name, use_indices, key):
-    nested_stack = stack.nested()
-    if not nested_stack:
-        return None
-    try:
-        if use_indices:
-            return get_members(stack)[int(resource_name)]
-        else:
-            return nested_stack[resource_name]
-    except (IndexError, KeyError):
-        raise exception.InvalidTemplateAttribute(resource=stack.name,
-                                                 key=key)
+    return GroupInspector(stack).resource(key, use_indices, resource_name)
 
 
 def get_rsrc_attr(stack, key, use_indices, resource_name, *attr_path):
-    resource = get_resource(stack, resource_name, use_indices, key)
-    if resource:
-        return resource.FnGetAtt(*attr_path)
+    return GroupInspector(stack).rsrc_attr(key, use_indices, resource_name,
+                                           *attr_path)
 
 
 def get_rsrc_id(stack, key, use_indices, resource_name):
-    resource = get_resource(stack, resource_name, use_indices, key)
-    if resource:
-        return resource.FnGetRefId()
+    return GroupInspector(stack).rsrc_id(key, use_indices, resource_name)
 
 
 def get_nested_attrs(stack, key, use_indices, *path):
-    path = key.split(".", 2)[1:] + list(path)
-    if len(path) > 1:
-        return get_rsrc_attr(stack, key, use_indices, *path)
-    else:
-        return get_rsrc_id(stack, key, use_indices, *path)
+    return GroupInspector(stack).nested_attrs(key, use_indices, *path)
 
 
 def get_member_definitions(group, include_failed=False):
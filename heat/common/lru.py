@@ -0,0 +1,76 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""A size-limited in-memory cache that discards the least recently used."""
+
+import collections
+
+
+class LRUCache(object):
+    """A cache of items ordered from least to most recently used.
+
+    Each item has a size, which is 1 unless given when it is stored. Once the
+    total size of the items exceeds the maximum, the least recently used
+    items are discarded. The maximum is read from a function each time an
+    item is stored, so that it can follow a config option; a maximum of 0 or
+    less disables the cache.
+    """
+
+    def __init__(self, max_size):
+        """Initialise with a function that returns the maximum size."""
+        self._max_size = max_size
+        self._items = collections.OrderedDict()
+        self.size = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        """Iterate over the keys, from least to most recently used."""
+        return iter(self._items)
+
+    def get(self, key, default=None):
+        """Return the value stored for a key, marking it as recently used."""
+        try:
+            item = self._items.pop(key)
+        except KeyError:
+            return default
+        self._items[key] = item
+        return item[0]
+
+    def put(self, key, value, size=1):
+        """Store a value for a key, unless it is bigger than the cache."""
+        self.discard(key)
+        max_size = self._max_size()
+        if size > max_size:
+            return
+        self._items[key] = (value, size)
+        self.size += size
+        while self.size > max_size:
+            old_value, old_size = self._items.popitem(last=False)[1]
+            self.size -= old_size
+
+    def discard(self, key):
+        """Remove the value stored for a key, if there is one."""
+        try:
+            value, size = self._items.pop(key)
+        except KeyError:
+            return
+        self.size -= size
+
+    def clear(self):
+        self._items.clear()
+        self.size = 0
@@ -12,14 +12,17 @@
 #    under the License.
 
 import collections
+import hashlib
 
 from oslo_config import cfg
 from oslo_serialization import jsonutils
+from oslo_utils import encodeutils
 import six
 import yaml
 
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common import lru
 
 if hasattr(yaml, 'CSafeLoader'):
     _yaml_loader_base = yaml.CSafeLoader
@@ -57,9 +60,27 @@ yaml_loader.add_constructor(u'tag:yaml.org,2002:timestamp',
 yaml_dumper.add_representer(collections.OrderedDict,
                             yaml_dumper.represent_ordered_dict)
 
+# The maximum total size, in characters, of the template strings whose parsed
+# form is kept in the parse cache
+MAX_PARSE_CACHE_SIZE = 16 * 1024 * 1024
+
+# Parsed templates, keyed by the SHA-256 digest of the template string. The
+# size of each is the length of the template string.
+_parse_cache = lru.LRUCache(lambda: MAX_PARSE_CACHE_SIZE)
+
+
+def _looks_like_json(tmpl_str):
+    if isinstance(tmpl_str, six.binary_type):
+        return tmpl_str.lstrip()[:1] in (b'{', b'[')
+    return tmpl_str.lstrip()[:1] in (u'{', u'[')
+
 
 def simple_parse(tmpl_str):
     try:
+        # Anything that is not a JSON object or array will be rejected
+        # anyway, so don't waste time trying to parse YAML as JSON.
+        if not _looks_like_json(tmpl_str):
+            raise ValueError()
         tpl = jsonutils.loads(tmpl_str)
     except ValueError:
         try:
@@ -99,24 +120,48 @@ def validate_template_limit(contain_str):
         raise exception.RequestLimitExceeded(message=msg)
 
 
+def _copy_parsed(data):
+    """Return a copy of a parsed template that shares no mutable data.
+
+    This is much faster than copy.deepcopy(), since parsed templates contain
+    only dicts, lists and immutable scalar values.
+    """
+    if isinstance(data, dict):
+        return {k: _copy_parsed(v) for k, v in six.iteritems(data)}
+    if isinstance(data, list):
+        return [_copy_parsed(v) for v in data]
+    return data
+
+
 def parse(tmpl_str):
     """Takes a string and returns a dict containing the parsed structure.
 
     This includes determination of whether the string is using the
     JSON or YAML format.
+
+    Since the same templates are often parsed repeatedly (e.g. for each
+    member of a resource group), the results are cached by the content of
+    the string; each call returns a separate copy.
     """
 
     # TODO(ricolin): Move this validation to api side.
     # Validate nested stack template.
     validate_template_limit(six.text_type(tmpl_str))
 
-    tpl = simple_parse(tmpl_str)
-    # Looking for supported version keys in the loaded template
-    if not ('HeatTemplateFormatVersion' in tpl
-            or 'heat_template_version' in tpl
-            or 'AWSTemplateFormatVersion' in tpl):
-        raise ValueError(_("Template format version not found."))
-    return tpl
+    key = hashlib.sha256(encodeutils.safe_encode(tmpl_str)).hexdigest()
+    tpl = _parse_cache.get(key)
+    if tpl is None:
+        tpl = simple_parse(tmpl_str)
+        # Looking for supported version keys in the loaded template
+        if not ('HeatTemplateFormatVersion' in tpl
+                or 'heat_template_version' in tpl
+                or 'AWSTemplateFormatVersion' in tpl):
+            raise ValueError(_("Template format version not found."))
+        size = len(tmpl_str)
+        if size > MAX_PARSE_CACHE_SIZE:
+            return tpl
+        _parse_cache.put(key, tpl, size)
+    return _copy_parsed(tpl)
 
 
 def convert_json_to_yaml(json_str):
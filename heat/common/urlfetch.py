@@ -13,25 +13,158 @@
 
 """Utility for fetching a resource (e.g. a template) from a URL."""
 
+import collections
+import hashlib
+import json
+import os
+
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_utils import encodeutils
 import requests
 from requests import exceptions
+from six.moves import http_cookiejar
 from six.moves import urllib
 
 from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LI
+from heat.common.i18n import _LW
+from heat.common import lru
 
 cfg.CONF.import_opt('max_template_size', 'heat.common.config')
+cfg.CONF.import_opt('template_url_cache_size', 'heat.common.config')
+cfg.CONF.import_opt('template_url_cache_dir', 'heat.common.config')
 
 LOG = logging.getLogger(__name__)
 
+# The chunk size only bounds how far past max_template_size a download can
+# go before it is stopped.
+CHUNK_SIZE = 65536
+
+_session = None
+_memory_cache = lru.LRUCache(lambda: cfg.CONF.template_url_cache_size)
+
 
 class URLFetchError(exception.Error, IOError):
     pass
 
 
+CacheEntry = collections.namedtuple('CacheEntry',
+                                    ['etag', 'last_modified', 'data'])
+
+
+def get_session():
+    """Return the HTTP session shared by this process, to reuse connections.
+
+    This is used both to fetch templates and to push software deployment
+    metadata. Only the connection pool is shared: the session accepts no
+    cookies, so that none set for one request is sent with another, which
+    may be on behalf of a different tenant.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        session.cookies.set_policy(
+            http_cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        _session = session
+    return _session
+
+
+def _cache_path(url):
+    name = hashlib.sha256(encodeutils.safe_encode(url)).hexdigest()
+    return os.path.join(cfg.CONF.template_url_cache_dir, name)
+
+
+def _cache_get(url):
+    """Return the cached copy of the data at a URL, or None."""
+    entry = _memory_cache.get(url)
+    if entry is not None:
+        return entry
+
+    if cfg.CONF.template_url_cache_dir:
+        path = _cache_path(url)
+        try:
+            with open(path + '.json') as f:
+                meta = json.load(f)
+            with open(path + '.data', 'rb') as f:
+                data = f.read()
+        except (IOError, OSError, ValueError):
+            return None
+        if meta.get('url') == url:
+            entry = CacheEntry(meta.get('etag'), meta.get('last_modified'),
+                               data)
+            _memory_cache.put(url, entry)
+            return entry
+    return None
+
+
+def _write_file(path, data, mode='wb'):
+    # Write to a temporary file first, so that another process never reads
+    # a partially written file
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, mode) as f:
+        f.write(data)
+    os.rename(tmp_path, path)
+
+
+def _cache_put(url, resp, data):
+    """Cache the data at a URL if the response allows revalidating it."""
+    etag = resp.headers.get('ETag')
+    last_modified = resp.headers.get('Last-Modified')
+    if not (etag or last_modified):
+        return
+    if 'no-store' in resp.headers.get('Cache-Control', ''):
+        return
+
+    entry = CacheEntry(etag, last_modified, data)
+    _memory_cache.put(url, entry)
+
+    if cfg.CONF.template_url_cache_dir:
+        path = _cache_path(url)
+        try:
+            if not os.path.isdir(cfg.CONF.template_url_cache_dir):
+                os.makedirs(cfg.CONF.template_url_cache_dir)
+            # The data is written before its metadata, so that a reader
+            # never pairs new metadata with old data
+            _write_file(path + '.data', data)
+            _write_file(path + '.json', json.dumps({
+                'url': url, 'etag': etag, 'last_modified': last_modified}),
+                mode='w')
+        except (IOError, OSError) as ex:
+            LOG.warning(_LW('Failed to cache %(url)s: %(ex)s'),
+                        {'url': url, 'ex': ex})
+
+
+def _check_size(size):
+    if size > cfg.CONF.max_template_size:
+        raise URLFetchError(_("Template exceeds maximum allowed size (%s"
+                              " bytes)") % cfg.CONF.max_template_size)
+
+
+def _read_content(resp):
+    """Read the body of a response, up to the maximum template size."""
+    # We cannot use resp.content here because it would download the
+    # entire file, and a large enough file would bring down the engine. The
+    # 'Content-Length' header could be faked, so it's only used to size the
+    # buffer; the content is downloaded in chunks until max_template_size is
+    # reached.
+    try:
+        length = int(resp.headers.get('Content-Length', 0))
+    except ValueError:
+        length = 0
+    _check_size(length)
+    result = bytearray(length)
+    size = 0
+    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+        end = size + len(chunk)
+        _check_size(end)
+        result[size:end] = chunk
+        size = end
+    del result[size:]
+    return bytes(result)
+
+
 def get(url, allowed_schemes=('http', 'https')):
     """Get the data at the specified URL.
 
@@ -39,6 +172,10 @@ def get(url, allowed_schemes=('http', 'https')):
     The file: scheme is also supported if you override
     the allowed_schemes argument.
     Raise an IOError if getting the data fails.
+
+    If caching is enabled, data fetched from http(s) URLs is cached, and a
+    conditional request is used to check whether the cached copy is still
+    current.
     """
     LOG.info(_LI('Fetching data from %s'), url)
 
@@ -53,25 +190,28 @@ def get(url, allowed_schemes=('http', 'https')):
         except urllib.error.URLError as uex:
             raise URLFetchError(_('Failed to retrieve template: %s') % uex)
 
+    use_cache = (cfg.CONF.template_url_cache_size > 0 or
+                 bool(cfg.CONF.template_url_cache_dir))
+    cached = _cache_get(url) if use_cache else None
+    headers = {}
+    if cached is not None:
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+
     try:
-        resp = requests.get(url, stream=True)
+        resp = get_session().get(url, stream=True, headers=headers)
+        if cached is not None and resp.status_code == 304:
+            resp.close()
+            LOG.debug('Using cached copy of %s', url)
+            _check_size(len(cached.data))
+            return cached.data
         resp.raise_for_status()
 
-        # We cannot use resp.text here because it would download the
-        # entire file, and a large enough file would bring down the
-        # engine.  The 'Content-Length' header could be faked, so it's
-        # necessary to download the content in chunks to until
-        # max_template_size is reached.  The chunk_size we use needs
-        # to balance CPU-intensive string concatenation with accuracy
-        # (eg. it's possible to fetch 1000 bytes greater than
-        # max_template_size with a chunk_size of 1000).
-        reader = resp.iter_content(chunk_size=1000)
-        result = b""
-        for chunk in reader:
-            result += chunk
-            if len(result) > cfg.CONF.max_template_size:
-                raise URLFetchError("Template exceeds maximum allowed size (%s"
-                                    " bytes)" % cfg.CONF.max_template_size)
+        result = _read_content(resp)
+        if use_cache:
+            _cache_put(url, resp, result)
         return result
 
     except exceptions.RequestException as ex:
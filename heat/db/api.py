@@ -114,6 +114,10 @@ def resource_update(context, resource_id, values, atomic_key,
                                 expected_engine_id)
 
 
+def resource_update_batch(context, updates):
+    return IMPL.resource_update_batch(context, updates)
+
+
 def resource_update_and_save(context, resource_id, values):
     return IMPL.resource_update_and_save(context, resource_id, values)
 
@@ -138,6 +142,10 @@ def resource_get_all_active_by_stack(context, stack_id):
     return IMPL.resource_get_all_active_by_stack(context, stack_id)
 
 
+def resource_get_summaries_by_stack(context, stack_id):
+    return IMPL.resource_get_summaries_by_stack(context, stack_id)
+
+
 def resource_get_all_by_root_stack(context, stack_id, filters=None):
     return IMPL.resource_get_all_by_root_stack(context, stack_id, filters)
 
@@ -190,6 +198,17 @@ def stack_get_all(context, limit=None, sort_keys=None, marker=None,
                               eager_load=eager_load)
 
 
+def stack_get_all_summary(context, columns, limit=None, sort_keys=None,
+                          marker=None, sort_dir=None, filters=None,
+                          show_deleted=False, show_nested=False,
+                          show_hidden=False, tags=None, tags_any=None,
+                          not_tags=None, not_tags_any=None):
+    return IMPL.stack_get_all_summary(context, columns, limit, sort_keys,
+                                      marker, sort_dir, filters,
+                                      show_deleted, show_nested, show_hidden,
+                                      tags, tags_any, not_tags, not_tags_any)
+
+
 def stack_get_all_by_owner_id(context, owner_id):
     return IMPL.stack_get_all_by_owner_id(context, owner_id)
 
@@ -201,7 +220,7 @@ def stack_get_all_by_root_owner_id(context, owner_id):
 def stack_count_all(context, filters=None,
                     show_deleted=False, show_nested=False, show_hidden=False,
                     tags=None, tags_any=None, not_tags=None,
-                    not_tags_any=None):
+                    not_tags_any=None, approximate=False):
     return IMPL.stack_count_all(context, filters=filters,
                                 show_deleted=show_deleted,
                                 show_nested=show_nested,
@@ -209,7 +228,8 @@ def stack_count_all(context, filters=None,
                                 tags=tags,
                                 tags_any=tags_any,
                                 not_tags=not_tags,
-                                not_tags_any=not_tags_any)
+                                not_tags_any=not_tags_any,
+                                approximate=approximate)
 
 
 def stack_create(context, values):
@@ -224,17 +244,27 @@ def stack_delete(context, stack_id):
     return IMPL.stack_delete(context, stack_id)
 
 
-def stack_lock_create(context, stack_id, engine_id):
-    return IMPL.stack_lock_create(context, stack_id, engine_id)
+def stack_lock_create(context, stack_id, engine_id, lease_duration=None):
+    return IMPL.stack_lock_create(context, stack_id, engine_id,
+                                  lease_duration=lease_duration)
 
 
 def stack_lock_get_engine_id(context, stack_id):
     return IMPL.stack_lock_get_engine_id(context, stack_id)
 
 
-def stack_lock_steal(context, stack_id, old_engine_id, new_engine_id):
+def stack_lock_lease_expired(context, stack_id):
+    return IMPL.stack_lock_lease_expired(context, stack_id)
+
+
+def stack_lock_renew(context, engine_id, lease_duration):
+    return IMPL.stack_lock_renew(context, engine_id, lease_duration)
+
+
+def stack_lock_steal(context, stack_id, old_engine_id, new_engine_id,
+                     lease_duration=None):
     return IMPL.stack_lock_steal(context, stack_id, old_engine_id,
-                                 new_engine_id)
+                                 new_engine_id, lease_duration=lease_duration)
 
 
 def stack_lock_release(context, stack_id, engine_id):
@@ -254,6 +284,18 @@ def stack_count_total_resources(context, stack_id):
     return IMPL.stack_count_total_resources(context, stack_id)
 
 
+def stack_output_cache_get(context, stack_id):
+    return IMPL.stack_output_cache_get(context, stack_id)
+
+
+def stack_output_cache_set(context, stack_id, values):
+    return IMPL.stack_output_cache_set(context, stack_id, values)
+
+
+def stack_output_cache_invalidate(context, stack_id):
+    return IMPL.stack_output_cache_invalidate(context, stack_id)
+
+
 def user_creds_create(context):
     return IMPL.user_creds_create(context)
 
@@ -285,13 +327,29 @@ def event_get_all_by_tenant(context, limit=None, marker=None,
 
 
 def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
-                           sort_keys=None, sort_dir=None, filters=None):
+                           sort_keys=None, sort_dir=None, filters=None,
+                           keyset=False):
     return IMPL.event_get_all_by_stack(context, stack_id,
                                        limit=limit,
                                        marker=marker,
                                        sort_keys=sort_keys,
                                        sort_dir=sort_dir,
-                                       filters=filters)
+                                       filters=filters,
+                                       keyset=keyset)
+
+
+def event_get_all_by_root_stack(context, root_stack_id, limit=None,
+                                marker=None, sort_keys=None, sort_dir=None,
+                                filters=None, nested_depth=None,
+                                keyset=True):
+    return IMPL.event_get_all_by_root_stack(context, root_stack_id,
+                                            limit=limit,
+                                            marker=marker,
+                                            sort_keys=sort_keys,
+                                            sort_dir=sort_dir,
+                                            filters=filters,
+                                            nested_depth=nested_depth,
+                                            keyset=keyset)
 
 
 def event_count_all_by_stack(context, stack_id):
@@ -302,6 +360,14 @@ def event_create(context, values):
     return IMPL.event_create(context, values)
 
 
+def event_create_batch(context, values_list):
+    return IMPL.event_create_batch(context, values_list)
+
+
+def event_prune_by_stack(context, stack_id, limit):
+    return IMPL.event_prune_by_stack(context, stack_id, limit)
+
+
 def watch_rule_get(context, watch_rule_id):
     return IMPL.watch_rule_get(context, watch_rule_id)
 
@@ -451,6 +517,14 @@ def sync_point_update_input_data(context, entity_id,
                                              atomic_key, input_data)
 
 
+def stack_trace_create(context, values):
+    return IMPL.stack_trace_create(context, values)
+
+
+def stack_trace_get_all_by_stack(context, stack_id, operation=None):
+    return IMPL.stack_trace_get_all_by_stack(context, stack_id, operation)
+
+
 def db_sync(engine, version=None):
     """Migrate the database to `version` or the most recent version."""
     return IMPL.db_sync(engine, version=version)
@@ -12,8 +12,13 @@
 #    under the License.
 
 """Implementation of SQLAlchemy backend."""
+import collections
 import datetime
+import itertools
+import multiprocessing
+import os
 import sys
+import time
 
 from oslo_config import cfg
 from oslo_db import api as oslo_db_api
@@ -45,6 +50,7 @@ from heat.rpc import api as rpc_api
 
 CONF = cfg.CONF
 CONF.import_opt('hidden_stack_tags', 'heat.common.config')
+CONF.import_opt('approximate_stack_count_limit', 'heat.common.config')
 CONF.import_opt('max_events_per_stack', 'heat.common.config')
 CONF.import_group('profiler', 'heat.common.config')
 
@@ -234,6 +240,77 @@ def resource_update(context, resource_id, values, atomic_key,
         return bool(rows_updated)
 
 
+def _bulk_update_values(model, updates):
+    """Return the column values for a multi-row update of the given rows.
+
+    Columns that are set to the same value in every row are updated with that
+    value; others are updated with a CASE expression selecting the value for
+    each row by its ID.
+    """
+    values = {}
+    for column in updates[0]['values']:
+        col_type = getattr(model, column).type
+        col_values = [u['values'][column] for u in updates]
+        if all(v == col_values[0] for v in col_values[1:]):
+            values[column] = col_values[0]
+        else:
+            whens = dict((u['id'], sqlalchemy.literal(u['values'][column],
+                                                      type_=col_type))
+                         for u in updates)
+            values[column] = sqlalchemy.case(whens, value=model.id)
+    return values
+
+
+def resource_update_batch(context, updates):
+    """Update a number of resources using multi-row statements.
+
+    Each update is a dict containing the resource 'id' and the 'values' to
+    write. If it also contains an 'atomic_key' (and optionally an
+    'expected_engine_id'), the update is applied only if the resource matches
+    them, in the same way as resource_update(), and the atomic_key of the
+    resource is incremented. Otherwise the values are written unconditionally.
+
+    Updates that write the same set of columns are applied together in a
+    single statement, all within one transaction.
+
+    :returns: the set of IDs of resources whose compare-and-swap check failed
+    """
+    groups = collections.OrderedDict()
+    for update in updates:
+        key = (frozenset(update['values']), 'atomic_key' in update)
+        groups.setdefault(key, []).append(update)
+
+    failed = set()
+    session = context.session
+    with session.begin(subtransactions=True):
+        for (columns, compare_and_swap), group in six.iteritems(groups):
+            if compare_and_swap:
+                conditions = [and_(models.Resource.id == u['id'],
+                                   models.Resource.atomic_key ==
+                                   u['atomic_key'],
+                                   models.Resource.engine_id ==
+                                   u.get('expected_engine_id'))
+                              for u in group]
+                matched = set(r.id for r in session.query(
+                    models.Resource.id).filter(
+                        sqlalchemy.or_(*conditions)).with_for_update())
+                failed.update(u['id'] for u in group
+                              if u['id'] not in matched)
+                group = [u for u in group if u['id'] in matched]
+                if not group:
+                    continue
+
+            values = _bulk_update_values(models.Resource, group)
+            if compare_and_swap:
+                values['atomic_key'] = func.coalesce(
+                    models.Resource.atomic_key, 0) + 1
+            session.query(models.Resource).filter(
+                models.Resource.id.in_([u['id'] for u in group])).update(
+                    values, synchronize_session='fetch')
+
+    return failed
+
+
 def resource_update_and_save(context, resource_id, values):
     resource = context.session.query(models.Resource).get(resource_id)
     update_and_save(context, resource, values)
@@ -395,6 +472,26 @@ def resource_get_all_active_by_stack(context, stack_id):
     return dict((res.id, res) for res in results)
 
 
+def resource_get_summaries_by_stack(context, stack_id):
+    """Return the name, status and creation time of a stack's resources.
+
+    Only the current resources are included: those that have been deleted or
+    replaced are left out.
+    """
+    filters = {'stack_id': stack_id, 'action': 'DELETE', 'status': 'COMPLETE'}
+    subquery = context.session.query(models.Resource.id).filter_by(**filters)
+
+    return context.session.query(
+        models.Resource.name,
+        models.Resource.status,
+        models.Resource.created_at
+    ).filter_by(
+        stack_id=stack_id, replaced_by=None
+    ).filter(
+        models.Resource.id.notin_(subquery.as_scalar())
+    ).all()
+
+
 def resource_get_all_by_root_stack(context, stack_id, filters=None):
     query = context.session.query(
         models.Resource
@@ -520,7 +617,8 @@ def _paginate_query(context, query, model, limit=None, sort_keys=None,
 
 def _query_stack_get_all(context,  show_deleted=False,
                          show_nested=False, show_hidden=False, tags=None,
-                         tags_any=None, not_tags=None, not_tags_any=None):
+                         tags_any=None, not_tags=None, not_tags_any=None,
+                         load_tags=True):
     if show_nested:
         query = soft_delete_aware_query(
             context, models.Stack, show_deleted=show_deleted
@@ -533,7 +631,8 @@ def _query_stack_get_all(context,  show_deleted=False,
     if not context.is_admin:
         query = query.filter_by(tenant=context.tenant_id)
 
-    query = query.options(orm.subqueryload("tags"))
+    if load_tags:
+        query = query.options(orm.subqueryload("tags"))
     if tags:
         for tag in tags:
             tag_alias = orm_aliased(models.StackTag)
@@ -553,7 +652,8 @@ def _query_stack_get_all(context,  show_deleted=False,
             tag_alias = orm_aliased(models.StackTag)
             subquery = subquery.join(tag_alias, models.Stack.tags)
             subquery = subquery.filter(tag_alias.tag == tag)
-        not_stack_ids = [s.id for s in subquery.all()]
+        not_stack_ids = [s.id for s in
+                         subquery.with_entities(models.Stack.id)]
         query = query.filter(models.Stack.id.notin_(not_stack_ids))
 
     if not_tags_any:
@@ -586,6 +686,48 @@ def stack_get_all(context, limit=None, sort_keys=None, marker=None,
                                   marker, sort_dir, filters).all()
 
 
+def stack_get_all_summary(context, columns, limit=None, sort_keys=None,
+                          marker=None, sort_dir=None, filters=None,
+                          show_deleted=False, show_nested=False,
+                          show_hidden=False, tags=None, tags_any=None,
+                          not_tags=None, not_tags_any=None):
+    """Return a dict of the given columns for each matching stack.
+
+    Only the requested columns are selected from the stack table. If the
+    'tags' pseudo-column is requested, the tags of all of the returned stacks
+    are fetched with a single additional query.
+    """
+    db_columns = [c for c in columns if c != 'tags']
+    if 'id' not in db_columns:
+        db_columns.append('id')
+
+    query = _query_stack_get_all(context,
+                                 show_deleted=show_deleted,
+                                 show_nested=show_nested,
+                                 show_hidden=show_hidden, tags=tags,
+                                 tags_any=tags_any, not_tags=not_tags,
+                                 not_tags_any=not_tags_any,
+                                 load_tags=False)
+    query = query.with_entities(*[getattr(models.Stack, c)
+                                  for c in db_columns])
+    query = _filter_and_page_query(context, query, limit, sort_keys,
+                                   marker, sort_dir, filters)
+    stacks = [dict(zip(db_columns, row)) for row in query]
+
+    if 'tags' in columns:
+        stack_tags = collections.defaultdict(list)
+        if stacks:
+            tag_query = context.session.query(
+                models.StackTag.stack_id, models.StackTag.tag).filter(
+                    models.StackTag.stack_id.in_([s['id'] for s in stacks]))
+            for stack_id, tag in tag_query:
+                stack_tags[stack_id].append(tag)
+        for stack in stacks:
+            stack['tags'] = stack_tags[stack['id']]
+
+    return stacks
+
+
 def _filter_and_page_query(context, query, limit=None, sort_keys=None,
                            marker=None, sort_dir=None, filters=None):
     if filters is None:
@@ -605,14 +747,20 @@ def _filter_and_page_query(context, query, limit=None, sort_keys=None,
 def stack_count_all(context, filters=None,
                     show_deleted=False, show_nested=False, show_hidden=False,
                     tags=None, tags_any=None, not_tags=None,
-                    not_tags_any=None):
+                    not_tags_any=None, approximate=False):
     query = _query_stack_get_all(context,
                                  show_deleted=show_deleted,
                                  show_nested=show_nested,
                                  show_hidden=show_hidden, tags=tags,
                                  tags_any=tags_any, not_tags=not_tags,
-                                 not_tags_any=not_tags_any)
+                                 not_tags_any=not_tags_any,
+                                 load_tags=False)
     query = db_filters.exact_filter(query, models.Stack, filters)
+    if approximate:
+        # Stop counting once the limit is reached, so that the cost of the
+        # query does not grow with the number of stacks.
+        query = query.with_entities(models.Stack.id).limit(
+            cfg.CONF.approximate_stack_count_limit)
     return query.count()
 
 
@@ -665,15 +813,25 @@ def stack_delete(context, stack_id):
         delete_softly(context, s)
 
 
+def _lease_expiry(session, lease_duration):
+    """Return when a lease taken now expires, by the database's clock."""
+    if not lease_duration:
+        return None
+    now = session.query(func.now()).scalar()
+    return now + datetime.timedelta(seconds=lease_duration)
+
+
 @oslo_db_api.wrap_db_retry(max_retries=3, retry_on_deadlock=True,
                            retry_interval=0.5, inc_retry_interval=True)
-def stack_lock_create(context, stack_id, engine_id):
+def stack_lock_create(context, stack_id, engine_id, lease_duration=None):
     session = get_session()
     with session.begin():
         lock = session.query(models.StackLock).get(stack_id)
         if lock is not None:
             return lock.engine_id
-        session.add(models.StackLock(stack_id=stack_id, engine_id=engine_id))
+        session.add(models.StackLock(
+            stack_id=stack_id, engine_id=engine_id,
+            expires_at=_lease_expiry(session, lease_duration)))
 
 
 def stack_lock_get_engine_id(context, stack_id):
@@ -684,6 +842,29 @@ def stack_lock_get_engine_id(context, stack_id):
             return lock.engine_id
 
 
+def stack_lock_lease_expired(context, stack_id):
+    """Return whether the lease on a stack lock has expired.
+
+    Returns None if there is no lock on the stack or the lock has no lease.
+    """
+    session = get_session()
+    expired = session.query(
+        (models.StackLock.expires_at < func.now()).label('expired')
+    ).filter(models.StackLock.stack_id == stack_id).scalar()
+    return None if expired is None else bool(expired)
+
+
+def stack_lock_renew(context, engine_id, lease_duration):
+    """Extend the lease of every lock held by the given engine."""
+    session = get_session()
+    with session.begin():
+        expires_at = _lease_expiry(session, lease_duration)
+        return session.query(
+            models.StackLock
+        ).filter_by(engine_id=engine_id).update(
+            {"expires_at": expires_at}, synchronize_session=False)
+
+
 def persist_state_and_release_lock(context, stack_id, engine_id, values):
     session = context.session
     with session.begin():
@@ -700,14 +881,23 @@ def persist_state_and_release_lock(context, stack_id, engine_id, values):
         return True
 
 
-def stack_lock_steal(context, stack_id, old_engine_id, new_engine_id):
+def stack_lock_steal(context, stack_id, old_engine_id, new_engine_id,
+                     lease_duration=None):
     session = get_session()
     with session.begin():
         lock = session.query(models.StackLock).get(stack_id)
-        rows_affected = session.query(
+        query = session.query(
             models.StackLock
-        ).filter_by(stack_id=stack_id, engine_id=old_engine_id
-                    ).update({"engine_id": new_engine_id})
+        ).filter_by(stack_id=stack_id, engine_id=old_engine_id)
+        expires_at = _lease_expiry(session, lease_duration)
+        if expires_at is not None:
+            # Don't steal a lock whose lease was renewed in the meantime
+            query = query.filter(sqlalchemy.or_(
+                models.StackLock.expires_at.is_(None),
+                models.StackLock.expires_at < func.now()))
+        rows_affected = query.update({"engine_id": new_engine_id,
+                                      "expires_at": expires_at},
+                                     synchronize_session=False)
     if not rows_affected:
         return lock.engine_id if lock is not None else True
 
@@ -731,6 +921,37 @@ def stack_get_root_id(context, stack_id):
     return s.id
 
 
+def stack_output_cache_get(context, stack_id):
+    return context.session.query(
+        models.Stack.output_cache
+    ).filter_by(id=stack_id).scalar()
+
+
+def stack_output_cache_set(context, stack_id, values):
+    session = context.session
+    with session.begin(subtransactions=True):
+        session.query(models.Stack).filter_by(id=stack_id).update(
+            {'output_cache': values}, synchronize_session=False)
+
+
+def stack_output_cache_invalidate(context, stack_id):
+    """Clear the output cache of a stack and of all of its ancestors.
+
+    The outputs of a parent stack may depend on those of a nested stack, so
+    a change to the nested stack invalidates them all.
+    """
+    session = context.session
+    with session.begin(subtransactions=True):
+        while stack_id is not None:
+            session.query(models.Stack).filter_by(id=stack_id).filter(
+                models.Stack.output_cache.isnot(None)
+            ).update({'output_cache': sqlalchemy.null()},
+                     synchronize_session=False)
+            stack_id = session.query(
+                models.Stack.owner_id
+            ).filter_by(id=stack_id).scalar()
+
+
 def stack_count_total_resources(context, stack_id):
     # count all resources which belong to the root stack
     results = context.session.query(
@@ -830,15 +1051,42 @@ def _query_all_by_stack(context, stack_id):
 
 
 def event_get_all_by_stack(context, stack_id, limit=None, marker=None,
-                           sort_keys=None, sort_dir=None, filters=None):
+                           sort_keys=None, sort_dir=None, filters=None,
+                           keyset=False):
     query = _query_all_by_stack(context, stack_id)
     return _events_filter_and_page_query(context, query, limit, marker,
-                                         sort_keys, sort_dir, filters).all()
+                                         sort_keys, sort_dir, filters,
+                                         keyset).all()
+
+
+def event_get_all_by_root_stack(context, root_stack_id, limit=None,
+                                marker=None, sort_keys=None, sort_dir=None,
+                                filters=None, nested_depth=None,
+                                keyset=True):
+    """Return the events of a root stack and its nested stacks.
+
+    Events from nested stacks deeper than nested_depth, or from nested stacks
+    that have been deleted, are excluded. By default, results are ordered by
+    event ID only, so that they can be retrieved using the
+    (root_stack_id, id) index.
+    """
+    query = context.session.query(
+        models.Event).filter_by(root_stack_id=root_stack_id)
+    if nested_depth is not None:
+        query = query.join(models.Event.stack).filter(sqlalchemy.or_(
+            models.Stack.id == root_stack_id,
+            and_(models.Stack.nested_depth <= nested_depth,
+                 models.Stack.deleted_at.is_(None))))
+    return _events_filter_and_page_query(context, query, limit, marker,
+                                         sort_keys, sort_dir, filters,
+                                         keyset).all()
 
 
 def _events_paginate_query(context, query, model, limit=None, sort_keys=None,
-                           marker=None, sort_dir=None):
-    default_sort_keys = ['created_at']
+                           marker=None, sort_dir=None, keyset=False):
+    # With keyset pagination and no explicit sort keys, order only by the
+    # (monotonically increasing) ID, so that indexes on it can be used.
+    default_sort_keys = [] if keyset else ['created_at']
     if not sort_keys:
         sort_keys = default_sort_keys
         if not sort_dir:
@@ -867,7 +1115,7 @@ def _events_paginate_query(context, query, model, limit=None, sort_keys=None,
 def _events_filter_and_page_query(context, query,
                                   limit=None, marker=None,
                                   sort_keys=None, sort_dir=None,
-                                  filters=None):
+                                  filters=None, keyset=False):
     if filters is None:
         filters = {}
 
@@ -878,7 +1126,8 @@ def _events_filter_and_page_query(context, query,
     query = db_filters.exact_filter(query, models.Event, filters)
 
     return _events_paginate_query(context, query, models.Event, limit,
-                                  whitelisted_sort_keys, marker, sort_dir)
+                                  whitelisted_sort_keys, marker, sort_dir,
+                                  keyset)
 
 
 def event_count_all_by_stack(context, stack_id):
@@ -914,6 +1163,30 @@ def event_create(context, values):
     return event_ref
 
 
+def event_create_batch(context, values_list):
+    """Insert a number of events in a single statement.
+
+    Unlike event_create(), this does not prune old events; the caller is
+    responsible for calling event_prune_by_stack() as required.
+    """
+    rows = []
+    for values in values_list:
+        row = dict(values)
+        reason = row.get('resource_status_reason')
+        row['resource_status_reason'] = reason and reason[:255] or ''
+        rows.append(row)
+    session = context.session
+    with session.begin(subtransactions=True):
+        session.execute(models.Event.__table__.insert(), rows)
+
+
+def event_prune_by_stack(context, stack_id, limit):
+    """Delete the oldest events of a stack, up to the given number."""
+    session = context.session
+    with session.begin(subtransactions=True):
+        return _delete_event_rows(context, stack_id, limit)
+
+
 def watch_rule_get(context, watch_rule_id):
     result = context.session.query(models.WatchRule).get(watch_rule_id)
     return result
@@ -1167,7 +1440,15 @@ def service_get_all_by_args(context, host, binary, hostname):
             filter_by(hostname=hostname).all())
 
 
-def purge_deleted(age, granularity='days', project_id=None):
+def purge_deleted(age, granularity='days', project_id=None, batch_size=20,
+                  pause=0):
+    """Remove stacks that were soft deleted more than age ago.
+
+    The expired stacks are purged in batches of batch_size, oldest first,
+    with each batch deleted in its own transaction and an optional pause in
+    seconds between batches. Purged stacks are gone once their batch is
+    committed, so an interrupted purge can simply be run again.
+    """
     try:
         age = int(age)
     except ValueError:
@@ -1179,6 +1460,20 @@ def purge_deleted(age, granularity='days', project_id=None):
         raise exception.Error(
             _("granularity should be days, hours, minutes, or seconds"))
 
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        raise exception.Error(_("batch_size should be an integer"))
+    if batch_size <= 0:
+        raise exception.Error(_("batch_size should be a positive integer"))
+
+    try:
+        pause = float(pause)
+    except ValueError:
+        raise exception.Error(_("pause should be a number"))
+    if pause < 0:
+        raise exception.Error(_("pause should not be negative"))
+
     if granularity == 'days':
         age = age * 86400
     elif granularity == 'hours':
@@ -1191,112 +1486,140 @@ def purge_deleted(age, granularity='days', project_id=None):
     meta = sqlalchemy.MetaData()
     meta.bind = engine
 
+    # load the tables that _purge_stacks() needs from meta
+    for table in ('stack_lock', 'stack_tag', 'resource', 'resource_data',
+                  'event', 'raw_template', 'raw_template_files',
+                  'user_creds', 'sync_point', 'stack_trace'):
+        sqlalchemy.Table(table, meta, autoload=True)
     stack = sqlalchemy.Table('stack', meta, autoload=True)
-    stack_lock = sqlalchemy.Table('stack_lock', meta, autoload=True)
-    stack_tag = sqlalchemy.Table('stack_tag', meta, autoload=True)
-    resource = sqlalchemy.Table('resource', meta, autoload=True)
-    resource_data = sqlalchemy.Table('resource_data', meta, autoload=True)
-    event = sqlalchemy.Table('event', meta, autoload=True)
-    raw_template = sqlalchemy.Table('raw_template', meta, autoload=True)
-    raw_template_files = sqlalchemy.Table('raw_template_files', meta,
-                                          autoload=True)
-    user_creds = sqlalchemy.Table('user_creds', meta, autoload=True)
     service = sqlalchemy.Table('service', meta, autoload=True)
-    syncpoint = sqlalchemy.Table('sync_point', meta, autoload=True)
 
-    # find the soft-deleted stacks that are past their expiry
+    # find the soft-deleted stacks that are past their expiry, oldest first.
+    # Each batch is purged before the next is selected, so there is no need
+    # to page through the results.
+    stack_where = sqlalchemy.select([
+        stack.c.id, stack.c.raw_template_id,
+        stack.c.prev_raw_template_id,
+        stack.c.user_creds_id]).where(
+            stack.c.deleted_at < time_line)
     if project_id:
-        stack_where = sqlalchemy.select([
-            stack.c.id, stack.c.raw_template_id,
-            stack.c.prev_raw_template_id,
-            stack.c.user_creds_id]).where(and_(
-                stack.c.tenant == project_id,
-                stack.c.deleted_at < time_line))
-    else:
-        stack_where = sqlalchemy.select([
-            stack.c.id, stack.c.raw_template_id,
-            stack.c.prev_raw_template_id,
-            stack.c.user_creds_id]).where(
-                stack.c.deleted_at < time_line)
-
-    stacks = list(engine.execute(stack_where))
-    if stacks:
-        stack_ids = [i[0] for i in stacks]
-        # delete stack locks (just in case some got stuck)
-        stack_lock_del = stack_lock.delete().where(
-            stack_lock.c.stack_id.in_(stack_ids))
-        engine.execute(stack_lock_del)
-        # delete stack tags
-        stack_tag_del = stack_tag.delete().where(
-            stack_tag.c.stack_id.in_(stack_ids))
-        engine.execute(stack_tag_del)
-        # delete resource_data
-        res_where = sqlalchemy.select([resource.c.id]).where(
-            resource.c.stack_id.in_(stack_ids))
-        res_data_del = resource_data.delete().where(
-            resource_data.c.resource_id.in_(res_where))
-        engine.execute(res_data_del)
-        # delete resources
-        res_del = resource.delete().where(resource.c.stack_id.in_(stack_ids))
-        engine.execute(res_del)
-        # delete events
-        event_del = event.delete().where(event.c.stack_id.in_(stack_ids))
-        engine.execute(event_del)
-        # clean up any sync_points that may have lingered
-        sync_del = syncpoint.delete().where(
-            syncpoint.c.stack_id.in_(stack_ids))
-        engine.execute(sync_del)
-        # delete the stacks
-        stack_del = stack.delete().where(stack.c.id.in_(stack_ids))
-        engine.execute(stack_del)
-        # delete orphaned raw templates
-        raw_template_ids = [i[1] for i in stacks if i[1] is not None]
-        raw_template_ids.extend(i[2] for i in stacks if i[2] is not None)
-        if raw_template_ids:
-            # keep those still referenced
-            raw_tmpl_sel = sqlalchemy.select([stack.c.raw_template_id]).where(
-                stack.c.raw_template_id.in_(raw_template_ids))
-            raw_tmpl = [i[0] for i in engine.execute(raw_tmpl_sel)]
-            raw_template_ids = set(raw_template_ids) - set(raw_tmpl)
-            raw_tmpl_sel = sqlalchemy.select(
-                [stack.c.prev_raw_template_id]).where(
-                stack.c.prev_raw_template_id.in_(raw_template_ids))
-            raw_tmpl = [i[0] for i in engine.execute(raw_tmpl_sel)]
-            raw_template_ids = raw_template_ids - set(raw_tmpl)
-            raw_tmpl_file_sel = sqlalchemy.select(
-                [raw_template.c.files_id]).where(
-                    raw_template.c.id.in_(raw_template_ids))
-            raw_tmpl_file_ids = [i[0] for i in engine.execute(
-                raw_tmpl_file_sel)]
-            raw_templ_del = raw_template.delete().where(
-                raw_template.c.id.in_(raw_template_ids))
-            engine.execute(raw_templ_del)
-            # purge any raw_template_files that are no longer referenced
-            if raw_tmpl_file_ids:
-                raw_tmpl_file_sel = sqlalchemy.select(
-                    [raw_template.c.files_id]).where(
-                        raw_template.c.files_id.in_(raw_tmpl_file_ids))
-                raw_tmpl_files = [i[0] for i in engine.execute(
-                    raw_tmpl_file_sel)]
-                raw_tmpl_file_ids = set(raw_tmpl_file_ids) \
-                    - set(raw_tmpl_files)
-                raw_tmpl_file_del = raw_template_files.delete().where(
-                    raw_template_files.c.id.in_(raw_tmpl_file_ids))
-                engine.execute(raw_tmpl_file_del)
-        # purge any user creds that are no longer referenced
-        user_creds_ids = [i[3] for i in stacks if i[3] is not None]
-        if user_creds_ids:
-            # keep those still referenced
-            user_sel = sqlalchemy.select([stack.c.user_creds_id]).where(
-                stack.c.user_creds_id.in_(user_creds_ids))
-            users = [i[0] for i in engine.execute(user_sel)]
-            user_creds_ids = set(user_creds_ids) - set(users)
-            usr_creds_del = user_creds.delete().where(
-                user_creds.c.id.in_(user_creds_ids))
-            engine.execute(usr_creds_del)
+        stack_where = stack_where.where(stack.c.tenant == project_id)
+    stack_where = stack_where.order_by(
+        stack.c.deleted_at, stack.c.id).limit(batch_size)
+
+    purged = 0
+    while True:
+        with engine.begin() as conn:
+            stacks = list(conn.execute(stack_where))
+            if stacks:
+                _purge_stacks(conn, meta, stacks)
+        if not stacks:
+            break
+        purged += len(stacks)
+        LOG.info(_LI("Purged %(count)d deleted stacks, %(total)d in "
+                     "total."), {'count': len(stacks), 'total': purged})
+        if len(stacks) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
     # Purge deleted services
     srvc_del = service.delete().where(service.c.deleted_at < time_line)
     engine.execute(srvc_del)
+    return purged
+
+
+def _purge_stacks(conn, meta, stacks):
+    """Delete a batch of stacks and everything that belongs only to them."""
+    stack = meta.tables['stack']
+    stack_lock = meta.tables['stack_lock']
+    stack_tag = meta.tables['stack_tag']
+    resource = meta.tables['resource']
+    resource_data = meta.tables['resource_data']
+    event = meta.tables['event']
+    raw_template = meta.tables['raw_template']
+    raw_template_files = meta.tables['raw_template_files']
+    user_creds = meta.tables['user_creds']
+    syncpoint = meta.tables['sync_point']
+    stack_trace = meta.tables['stack_trace']
+
+    stack_ids = [i[0] for i in stacks]
+    # delete stack locks (just in case some got stuck)
+    stack_lock_del = stack_lock.delete().where(
+        stack_lock.c.stack_id.in_(stack_ids))
+    conn.execute(stack_lock_del)
+    # delete stack tags
+    stack_tag_del = stack_tag.delete().where(
+        stack_tag.c.stack_id.in_(stack_ids))
+    conn.execute(stack_tag_del)
+    # delete resource_data
+    res_where = sqlalchemy.select([resource.c.id]).where(
+        resource.c.stack_id.in_(stack_ids))
+    res_data_del = resource_data.delete().where(
+        resource_data.c.resource_id.in_(res_where))
+    conn.execute(res_data_del)
+    # delete resources
+    res_del = resource.delete().where(resource.c.stack_id.in_(stack_ids))
+    conn.execute(res_del)
+    # delete events
+    event_del = event.delete().where(event.c.stack_id.in_(stack_ids))
+    conn.execute(event_del)
+    # clean up any sync_points that may have lingered
+    sync_del = syncpoint.delete().where(
+        syncpoint.c.stack_id.in_(stack_ids))
+    conn.execute(sync_del)
+    # delete traces
+    trace_del = stack_trace.delete().where(
+        stack_trace.c.stack_id.in_(stack_ids))
+    conn.execute(trace_del)
+    # delete the stacks
+    stack_del = stack.delete().where(stack.c.id.in_(stack_ids))
+    conn.execute(stack_del)
+    # delete orphaned raw templates
+    raw_template_ids = [i[1] for i in stacks if i[1] is not None]
+    raw_template_ids.extend(i[2] for i in stacks if i[2] is not None)
+    if raw_template_ids:
+        # keep those still referenced
+        raw_tmpl_sel = sqlalchemy.select([stack.c.raw_template_id]).where(
+            stack.c.raw_template_id.in_(raw_template_ids))
+        raw_tmpl = [i[0] for i in conn.execute(raw_tmpl_sel)]
+        raw_template_ids = set(raw_template_ids) - set(raw_tmpl)
+        raw_tmpl_sel = sqlalchemy.select(
+            [stack.c.prev_raw_template_id]).where(
+            stack.c.prev_raw_template_id.in_(raw_template_ids))
+        raw_tmpl = [i[0] for i in conn.execute(raw_tmpl_sel)]
+        raw_template_ids = raw_template_ids - set(raw_tmpl)
+        raw_tmpl_file_sel = sqlalchemy.select(
+            [raw_template.c.files_id]).where(
+                raw_template.c.id.in_(raw_template_ids))
+        raw_tmpl_file_ids = [i[0] for i in conn.execute(
+            raw_tmpl_file_sel)]
+        raw_templ_del = raw_template.delete().where(
+            raw_template.c.id.in_(raw_template_ids))
+        conn.execute(raw_templ_del)
+        # purge any raw_template_files that are no longer referenced
+        if raw_tmpl_file_ids:
+            raw_tmpl_file_sel = sqlalchemy.select(
+                [raw_template.c.files_id]).where(
+                    raw_template.c.files_id.in_(raw_tmpl_file_ids))
+            raw_tmpl_files = [i[0] for i in conn.execute(
+                raw_tmpl_file_sel)]
+            raw_tmpl_file_ids = set(raw_tmpl_file_ids) \
+                - set(raw_tmpl_files)
+            raw_tmpl_file_del = raw_template_files.delete().where(
+                raw_template_files.c.id.in_(raw_tmpl_file_ids))
+            conn.execute(raw_tmpl_file_del)
+    # purge any user creds that are no longer referenced
+    user_creds_ids = [i[3] for i in stacks if i[3] is not None]
+    if user_creds_ids:
+        # keep those still referenced
+        user_sel = sqlalchemy.select([stack.c.user_creds_id]).where(
+            stack.c.user_creds_id.in_(user_creds_ids))
+        users = [i[0] for i in conn.execute(user_sel)]
+        user_creds_ids = set(user_creds_ids) - set(users)
+        usr_creds_del = user_creds.delete().where(
+            user_creds.c.id.in_(user_creds_ids))
+        conn.execute(usr_creds_del)
 
 
 def sync_point_delete_all_by_stack_and_traversal(context, stack_id,
@@ -1336,6 +1659,61 @@ def sync_point_update_input_data(context, entity_id,
     return rows_updated
 
 
+def _delete_old_traces(context, stack_id, keep):
+    """Delete the traces of all but the latest operations on a stack."""
+    latest = sqlalchemy.func.max(models.StackTrace.id)
+    old = context.session.query(
+        models.StackTrace.operation
+    ).filter_by(stack_id=stack_id).group_by(
+        models.StackTrace.operation
+    ).order_by(latest.desc()).offset(keep).all()
+    if old:
+        context.session.query(models.StackTrace).filter(
+            models.StackTrace.stack_id == stack_id,
+            models.StackTrace.operation.in_([op for op, in old])
+        ).delete(synchronize_session=False)
+
+
+def stack_trace_create(context, values):
+    """Store the spans of an operation on a stack.
+
+    When the first trace of an operation is stored, the traces of the older
+    operations on the stack are pruned, so that at most
+    max_traced_operations_per_stack operations are kept.
+    """
+    session = context.session
+    with session.begin(subtransactions=True):
+        stored = session.query(models.StackTrace.id).filter_by(
+            stack_id=values['stack_id'],
+            operation=values['operation']).first()
+        if stored is None:
+            _delete_old_traces(
+                context, values['stack_id'],
+                cfg.CONF.max_traced_operations_per_stack - 1)
+        trace_ref = models.StackTrace()
+        trace_ref.update(values)
+        session.add(trace_ref)
+    return trace_ref
+
+
+def stack_trace_get_all_by_stack(context, stack_id, operation=None):
+    """Return the stored traces of one operation on a stack.
+
+    If no operation is given, the traces of the most recently traced
+    operation are returned.
+    """
+    query = context.session.query(
+        models.StackTrace).filter_by(stack_id=stack_id)
+    if operation is None:
+        latest = query.order_by(models.StackTrace.created_at.desc(),
+                                models.StackTrace.id.desc()).first()
+        if latest is None:
+            return []
+        operation = latest.operation
+    return query.filter_by(operation=operation).order_by(
+        models.StackTrace.id).all()
+
+
 def db_sync(engine, version=None):
     """Migrate the database to `version` or the most recent version."""
     if version is not None and int(version) < db_version(engine):
@@ -1534,6 +1912,345 @@ def db_decrypt_parameters_and_properties(ctxt, encryption_key, batch_size=50,
         return excs
 
 
+def _crypt_values(args):
+    """Encrypt or decrypt the values of a chunk of rows.
+
+    This may run in a worker process, so it uses nothing but its arguments.
+    Each row is a tuple of its ID and a dict of the values to process, which
+    are strings to encrypt or (method, value) pairs to decrypt.
+
+    :return: list of (ID, processed values, exception) tuples
+    """
+    operation, encryption_key, rows = args
+    results = []
+    for row_id, values in rows:
+        try:
+            if operation == 'encrypt':
+                processed = dict((name, crypt.encrypt(value, encryption_key))
+                                 for name, value in values.items())
+            else:
+                processed = dict((name, crypt.decrypt(value[0], value[1],
+                                                      encryption_key))
+                                 for name, value in values.items())
+        except Exception as exc:
+            results.append((row_id, None, exc))
+        else:
+            results.append((row_id, processed, None))
+    return results
+
+
+def _crypt_template_query(session, operation):
+    return session.query(models.RawTemplate)
+
+
+def _crypt_template_values(ctxt, raw_template, operation):
+    """Return the parameter values of a raw_template to encrypt or decrypt."""
+    env = raw_template.environment
+    if not env or 'parameters' not in env:
+        return {}
+    encrypted_params = env.get('encrypted_param_names', [])
+    if operation == 'decrypt':
+        return dict((name, env['parameters'][name])
+                    for name in encrypted_params)
+
+    from heat.engine import template
+    tmpl = template.Template.load(ctxt, raw_template.id, raw_template)
+    param_schemata = tmpl.param_schemata()
+    return dict((name, six.text_type(value))
+                for name, value in env['parameters'].items()
+                if (name not in encrypted_params and
+                    name in param_schemata and
+                    param_schemata[name].hidden))
+
+
+def _crypt_template_update(raw_template, processed, operation):
+    environment = raw_template.environment.copy()
+    parameters = environment['parameters'].copy()
+    parameters.update(processed)
+    environment['parameters'] = parameters
+    if operation == 'encrypt':
+        environment['encrypted_param_names'] = (
+            list(environment.get('encrypted_param_names', [])) +
+            list(processed))
+    else:
+        environment['encrypted_param_names'] = []
+    return {'id': raw_template.id,
+            'values': {'environment': environment},
+            'updated_at': raw_template.updated_at}
+
+
+def _raw_template_update_batch(context, updates):
+    """Update a number of raw_templates using a multi-row statement.
+
+    Each update is a dict containing the raw_template 'id', the 'values' to
+    write and the 'updated_at' time of the raw_template when it was read. A
+    raw_template that has been updated since then is left alone.
+
+    :returns: the set of IDs of raw_templates that had been updated since
+    """
+    session = context.session
+    with session.begin(subtransactions=True):
+        conditions = [and_(models.RawTemplate.id == u['id'],
+                           models.RawTemplate.updated_at.is_(None)
+                           if u['updated_at'] is None else
+                           models.RawTemplate.updated_at == u['updated_at'])
+                      for u in updates]
+        matched = set(r.id for r in session.query(
+            models.RawTemplate.id).filter(
+                sqlalchemy.or_(*conditions)).with_for_update())
+        group = [u for u in updates if u['id'] in matched]
+        if group:
+            session.query(models.RawTemplate).filter(
+                models.RawTemplate.id.in_([u['id'] for u in group])).update(
+                    _bulk_update_values(models.RawTemplate, group),
+                    synchronize_session='fetch')
+    return set(u['id'] for u in updates) - matched
+
+
+def _crypt_resource_query(session, operation):
+    return session.query(models.Resource).filter(
+        ~models.Resource.properties_data.is_(None),
+        models.Resource.properties_data_encrypted.is_(True)
+        if operation == 'decrypt' else
+        ~models.Resource.properties_data_encrypted.is_(True))
+
+
+def _crypt_resource_values(ctxt, resource, operation):
+    """Return the properties data of a resource to encrypt or decrypt."""
+    if operation == 'decrypt':
+        return resource.properties_data
+    return dict((name, jsonutils.dumps(value))
+                for name, value in resource.properties_data.items())
+
+
+def _crypt_resource_update(resource, processed, operation):
+    if operation == 'encrypt':
+        values = {'properties_data': processed,
+                  'properties_data_encrypted': True}
+    else:
+        values = {'properties_data': dict(
+            (name, jsonutils.loads(value))
+            for name, value in processed.items()),
+            'properties_data_encrypted': False}
+    return {'id': resource.id,
+            'values': values,
+            'atomic_key': resource.atomic_key,
+            'expected_engine_id': resource.engine_id}
+
+
+# For each table: (model, base query, values to process, update to write,
+# batch update function)
+_CRYPT_TABLES = collections.OrderedDict([
+    ('raw_template', (models.RawTemplate, _crypt_template_query,
+                      _crypt_template_values, _crypt_template_update,
+                      _raw_template_update_batch)),
+    ('resource', (models.Resource, _crypt_resource_query,
+                  _crypt_resource_values, _crypt_resource_update,
+                  resource_update_batch)),
+])
+
+
+def _crypt_batches(ctxt, operation, table, batch_size, marker=None):
+    """Read the rows of a table that need processing, in batches.
+
+    Rows are read in order of their ID, starting after the marker, each batch
+    in a session of its own. Each batch is a tuple of the ID of the last row
+    read, the rows to process with their values, the exceptions raised
+    while reading them and the IDs of the rows that raised them.
+    """
+    model, base_query, get_values = _CRYPT_TABLES[table][:3]
+    while True:
+        session = get_session()
+        try:
+            query = base_query(session, operation)
+            if marker is not None:
+                query = query.filter(model.id > marker)
+            rows = query.order_by(model.id).limit(batch_size).all()
+            if not rows:
+                return
+            marker = rows[-1].id
+            work = []
+            excs = []
+            failed = []
+            for row in rows:
+                try:
+                    values = get_values(ctxt, row, operation)
+                except Exception as exc:
+                    LOG.exception(_LE('Failed to %(op)s %(table)s %(id)d'),
+                                  {'op': operation, 'table': table,
+                                   'id': row.id})
+                    excs.append(exc)
+                    failed.append(row.id)
+                    continue
+                if values:
+                    work.append((row, values))
+        finally:
+            session.close()
+        yield marker, work, excs, failed
+
+
+def _crypt_load_checkpoint(checkpoint, operation):
+    if checkpoint is None or not os.path.exists(checkpoint):
+        return {}
+    with open(checkpoint) as f:
+        data = jsonutils.loads(f.read())
+    if data.get('operation') != operation:
+        raise exception.Error(
+            _("Checkpoint %(file)s is for a %(op)s operation, not "
+              "%(expected)s") % {'file': checkpoint,
+                                 'op': data.get('operation'),
+                                 'expected': operation})
+    return data.get('markers', {})
+
+
+def _crypt_save_checkpoint(checkpoint, operation, markers):
+    # Replace the checkpoint atomically, so that it is never left truncated
+    tmp_file = checkpoint + '.tmp'
+    with open(tmp_file, 'w') as f:
+        f.write(jsonutils.dumps({'operation': operation,
+                                 'markers': markers}))
+    os.rename(tmp_file, checkpoint)
+
+
+def db_crypt_parameters_and_properties(ctxt, operation, encryption_key,
+                                       batch_size=50, workers=1,
+                                       checkpoint=None, verbose=False):
+    """Encrypt or decrypt parameters and properties using parallel workers.
+
+    Raw templates and resources are read in batches in order of their ID,
+    and the encryption or decryption of each batch is shared between a pool
+    of worker processes. The results are written back using one multi-row
+    update per batch, which skips any row that has been modified since it was
+    read; such rows are reported as errors and processed again by the next
+    run.
+
+    :param ctxt: RPC context
+    :param operation: 'encrypt' or 'decrypt'
+    :param encryption_key: key that will be used for parameter and property
+                           encryption or decryption
+    :param batch_size: number of rows requested from db in each iteration
+    :param workers: number of worker processes; 1 means that the work is done
+                    in this process
+    :param checkpoint: path of a file that records the progress after each
+                       batch. If it exists, processing resumes from where it
+                       left off, which is no later than the first row that
+                       failed. It is removed when there are no errors.
+    :param verbose: log an INFO message when each batch has been processed
+    :return: list of exceptions encountered during processing
+    """
+    if operation not in ('encrypt', 'decrypt'):
+        raise exception.Error(_("operation should be encrypt or decrypt"))
+
+    markers = _crypt_load_checkpoint(checkpoint, operation)
+    # For each table, the marker to resume from that keeps the first row
+    # that failed in this run, so that the next run processes it again
+    retry_markers = {}
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    excs = []
+    try:
+        for table in _CRYPT_TABLES:
+            get_update, update_batch = _CRYPT_TABLES[table][3:]
+            batches = _crypt_batches(ctxt, operation, table, batch_size,
+                                     markers.get(table))
+            for marker, work, batch_excs, failed in batches:
+                excs.extend(batch_excs)
+                rows = dict((row.id, row) for row, values in work)
+                num_chunks = workers if pool is not None else 1
+                chunks = [(operation, encryption_key,
+                           [(row.id, values)
+                            for row, values in work[i::num_chunks]])
+                          for i in range(num_chunks)]
+                if pool is not None:
+                    results = pool.map(_crypt_values, chunks)
+                else:
+                    results = [_crypt_values(chunk) for chunk in chunks]
+
+                updates = []
+                for row_id, processed, exc in itertools.chain(*results):
+                    if exc is None:
+                        try:
+                            updates.append(get_update(rows[row_id],
+                                                      processed, operation))
+                            continue
+                        except Exception as ex:
+                            exc = ex
+                    LOG.error(_LE('Failed to %(op)s %(table)s %(id)d: '
+                                  '%(exc)s'),
+                              {'op': operation, 'table': table,
+                               'id': row_id, 'exc': exc})
+                    excs.append(exc)
+                    failed.append(row_id)
+                if updates:
+                    for row_id in update_batch(ctxt, updates):
+                        msg = (_('%(table)s %(id)d was modified while it '
+                                 'was being processed') %
+                               {'table': table, 'id': row_id})
+                        LOG.warning(msg)
+                        excs.append(exception.Error(msg))
+                        failed.append(row_id)
+
+                if failed and table not in retry_markers:
+                    retry_markers[table] = min(failed) - 1
+                markers[table] = retry_markers.get(table, marker)
+                if checkpoint is not None:
+                    _crypt_save_checkpoint(checkpoint, operation, markers)
+                if verbose:
+                    LOG.info(_LI("Processed %(table)s rows up to %(id)d."),
+                             {'table': table, 'id': marker})
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if checkpoint is not None and not excs and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return excs
+
+
+def db_estimate_crypt_parameters_and_properties(ctxt, operation,
+                                                encryption_key,
+                                                batch_size=50, workers=1):
+    """Estimate the work of encrypting or decrypting, without doing it.
+
+    The rows that may need processing are counted, and the first batch of
+    each table is processed (but not written back) to time it.
+
+    :return: a dict containing for each table the number of 'rows', the
+             number of rows 'sampled' and the 'estimated_seconds' that
+             processing all of them would take with the given workers
+    """
+    if operation not in ('encrypt', 'decrypt'):
+        raise exception.Error(_("operation should be encrypt or decrypt"))
+
+    estimates = {}
+    for table in _CRYPT_TABLES:
+        model, base_query = _CRYPT_TABLES[table][:2]
+        session = get_session()
+        try:
+            rows = base_query(session, operation).with_entities(
+                func.count(model.id)).scalar()
+        finally:
+            session.close()
+
+        # The first batch is the same rows that were counted, up to its size
+        sampled = min(rows, batch_size)
+        start = time.time()
+        for marker, work, excs, failed in _crypt_batches(ctxt, operation,
+                                                         table, batch_size):
+            _crypt_values((operation, encryption_key,
+                           [(row.id, values) for row, values in work]))
+            break
+        elapsed = time.time() - start
+
+        estimates[table] = {
+            'rows': rows,
+            'sampled': sampled,
+            'estimated_seconds': (elapsed / sampled * rows / max(workers, 1)
+                                  if sampled else 0),
+        }
+    return estimates
+
+
 def _get_batch(session, ctxt, query, model, batch_size=50):
     last_batch_marker = None
     while True:
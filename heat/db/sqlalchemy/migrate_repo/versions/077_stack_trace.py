@@ -0,0 +1,42 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sqlalchemy
+
+from heat.db.sqlalchemy import types
+
+
+def upgrade(migrate_engine):
+    meta = sqlalchemy.MetaData(bind=migrate_engine)
+
+    sqlalchemy.Table('stack', meta, autoload=True)
+    stack_trace = sqlalchemy.Table(
+        'stack_trace', meta,
+        sqlalchemy.Column('id', sqlalchemy.Integer,
+                          primary_key=True,
+                          nullable=False),
+        sqlalchemy.Column('stack_id', sqlalchemy.String(36),
+                          sqlalchemy.ForeignKey('stack.id'),
+                          nullable=False),
+        sqlalchemy.Column('operation', sqlalchemy.String(36),
+                          nullable=False),
+        sqlalchemy.Column('action', sqlalchemy.String(255)),
+        sqlalchemy.Column('spans', types.Json),
+        sqlalchemy.Column('created_at', sqlalchemy.DateTime),
+        sqlalchemy.Column('updated_at', sqlalchemy.DateTime),
+        sqlalchemy.Index('ix_stack_trace_stack_id_operation',
+                         'stack_id', 'operation'),
+        mysql_engine='InnoDB',
+        mysql_charset='utf8'
+    )
+    stack_trace.create()
@@ -19,6 +19,7 @@ from oslo_db.sqlalchemy import models
 from oslo_utils import timeutils
 import sqlalchemy
 from sqlalchemy.ext import declarative
+from sqlalchemy import orm
 from sqlalchemy.orm import backref
 from sqlalchemy.orm import relationship
 
@@ -143,6 +144,9 @@ class Stack(BASE, HeatBase, SoftDelete, StateAware):
     current_traversal = sqlalchemy.Column('current_traversal',
                                           sqlalchemy.String(36))
     current_deps = sqlalchemy.Column('current_deps', types.Json)
+    # Resolved output values; only loaded on request, as they may be large
+    output_cache = orm.deferred(sqlalchemy.Column('output_cache',
+                                                  types.Json))
 
     # Override timestamp column to store the correct value: it should be the
     # time the create/update call was issued, not the time the DB entry is
@@ -159,6 +163,30 @@ class StackLock(BASE, HeatBase):
                                  sqlalchemy.ForeignKey('stack.id'),
                                  primary_key=True)
     engine_id = sqlalchemy.Column(sqlalchemy.String(36))
+    # End of the lease on the lock; None if the lock is not leased
+    expires_at = sqlalchemy.Column(sqlalchemy.DateTime)
+
+
+class StackTrace(BASE, HeatBase):
+    """Timing spans recorded during a stack operation.
+
+    A single operation may be stored in several rows, e.g. one for each
+    resource checked by a convergence worker.
+    """
+
+    __tablename__ = 'stack_trace'
+    __table_args__ = (
+        sqlalchemy.Index('ix_stack_trace_stack_id_operation',
+                         'stack_id', 'operation'),
+    )
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    stack_id = sqlalchemy.Column(sqlalchemy.String(36),
+                                 sqlalchemy.ForeignKey('stack.id'),
+                                 nullable=False)
+    operation = sqlalchemy.Column(sqlalchemy.String(36), nullable=False)
+    action = sqlalchemy.Column(sqlalchemy.String(255))
+    spans = sqlalchemy.Column(types.Json)
 
 
 class UserCreds(BASE, HeatBase):
@@ -187,12 +215,16 @@ class Event(BASE, HeatBase):
     """Represents an event generated by the heat engine."""
 
     __tablename__ = 'event'
+    __table_args__ = (
+        sqlalchemy.Index('ix_event_root_stack_id', 'root_stack_id', 'id'),
+    )
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     stack_id = sqlalchemy.Column(sqlalchemy.String(36),
                                  sqlalchemy.ForeignKey('stack.id'),
                                  nullable=False)
     stack = relationship(Stack, backref=backref('events'))
+    root_stack_id = sqlalchemy.Column(sqlalchemy.String(36))
 
     uuid = sqlalchemy.Column(sqlalchemy.String(36),
                              default=lambda: str(uuid.uuid4()),
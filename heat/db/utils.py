@@ -43,8 +43,10 @@ IMPL = LazyPluggable('backend',
                      sqlalchemy='heat.db.sqlalchemy.api')
 
 
-def purge_deleted(age, granularity='days', project_id=None):
-    IMPL.purge_deleted(age, granularity, project_id)
+def purge_deleted(age, granularity='days', project_id=None, batch_size=20,
+                  pause=0):
+    return IMPL.purge_deleted(age, granularity, project_id,
+                              batch_size=batch_size, pause=pause)
 
 
 def encrypt_parameters_and_properties(ctxt, encryption_key, verbose):
@@ -55,3 +57,18 @@ def encrypt_parameters_and_properties(ctxt, encryption_key, verbose):
 def decrypt_parameters_and_properties(ctxt, encryption_key, verbose):
     IMPL.db_decrypt_parameters_and_properties(ctxt, encryption_key,
                                               verbose=verbose)
+
+
+def crypt_parameters_and_properties(ctxt, operation, encryption_key, verbose,
+                                    batch_size=50, workers=1,
+                                    checkpoint=None):
+    return IMPL.db_crypt_parameters_and_properties(
+        ctxt, operation, encryption_key, batch_size=batch_size,
+        workers=workers, checkpoint=checkpoint, verbose=verbose)
+
+
+def estimate_crypt_parameters_and_properties(ctxt, operation, encryption_key,
+                                             batch_size=50, workers=1):
+    return IMPL.db_estimate_crypt_parameters_and_properties(
+        ctxt, operation, encryption_key, batch_size=batch_size,
+        workers=workers)
@@ -19,6 +19,7 @@ import six
 
 from heat.common.i18n import _
 from heat.common.i18n import _LE
+from heat.common import identifier
 from heat.common import param_utils
 from heat.common import template_format
 from heat.common import timeutils as heat_timeutils
@@ -171,23 +172,29 @@ def translate_filters(params):
     return params
 
 
-def format_stack_outputs(outputs, resolve_value=False):
+def format_stack_outputs(outputs, resolve_value=False, resolved=None):
     """Return a representation of the given output template.
 
     Return a representation of the given output template for the given stack
-    that matches the API output expectations.
+    that matches the API output expectations. If resolved values, as returned
+    by Stack.resolved_outputs(), are supplied then they are used instead of
+    resolving the outputs.
     """
-    return [format_stack_output(outputs[key], resolve_value=resolve_value)
+    resolved = resolved or {}
+    return [format_stack_output(outputs[key], resolve_value=resolve_value,
+                                resolved=resolved.get(key))
             for key in outputs]
 
 
-def format_stack_output(output_defn, resolve_value=True):
+def format_stack_output(output_defn, resolve_value=True, resolved=None):
     result = {
         rpc_api.OUTPUT_KEY: output_defn.name,
         rpc_api.OUTPUT_DESCRIPTION: output_defn.description(),
     }
 
-    if resolve_value:
+    if resolve_value and resolved is not None:
+        result.update(resolved)
+    elif resolve_value:
         value = None
         try:
             value = output_defn.get_value()
@@ -201,11 +208,13 @@ def format_stack_output(output_defn, resolve_value=True):
     return result
 
 
-def format_stack(stack, preview=False, resolve_outputs=True):
+def format_stack(stack, preview=False, resolve_outputs=True,
+                 live_outputs=False):
     """Return a representation of the given stack.
 
     Return a representation of the given stack that matches the API output
-    expectations.
+    expectations. Output values stored with the stack are used unless
+    live_outputs is True.
     """
     updated_time = heat_timeutils.isotime(stack.updated_time)
     created_time = heat_timeutils.isotime(stack.created_time or
@@ -240,8 +249,9 @@ def format_stack(stack, preview=False, resolve_outputs=True):
 
     # allow users to view the outputs of stacks
     if stack.action != stack.DELETE and resolve_outputs:
-        info[rpc_api.STACK_OUTPUTS] = format_stack_outputs(stack.outputs,
-                                                           resolve_value=True)
+        info[rpc_api.STACK_OUTPUTS] = format_stack_outputs(
+            stack.outputs, resolve_value=True,
+            resolved=stack.resolved_outputs(live=live_outputs))
 
     return info
 
@@ -278,6 +288,75 @@ def format_stack_db_object(stack):
     return info
 
 
+# The stack table columns needed to format each key of a stack summary. The
+# 'tags' pseudo-column is a list of the tag names of the stack.
+STACK_SUMMARY_COLUMNS = {
+    rpc_api.STACK_ID: ('id', 'name', 'tenant'),
+    rpc_api.STACK_NAME: ('name',),
+    rpc_api.STACK_DESCRIPTION: (),
+    rpc_api.STACK_ACTION: ('action',),
+    rpc_api.STACK_STATUS: ('action', 'status'),
+    rpc_api.STACK_STATUS_DATA: ('status_reason',),
+    rpc_api.STACK_CREATION_TIME: ('created_at',),
+    rpc_api.STACK_UPDATED_TIME: ('updated_at',),
+    rpc_api.STACK_DELETION_TIME: ('deleted_at',),
+    rpc_api.STACK_OWNER: ('username',),
+    rpc_api.STACK_PARENT: ('owner_id',),
+    rpc_api.STACK_USER_PROJECT_ID: ('stack_user_project_id',),
+    rpc_api.STACK_TAGS: ('tags',),
+}
+
+
+def stack_summary_keys(fields):
+    """Return the stack summary keys needed to show the given fields.
+
+    The stack identity is always included, as is the action when the status
+    is requested.
+    """
+    keys = set(fields)
+    keys.add(rpc_api.STACK_ID)
+    if rpc_api.STACK_STATUS in keys:
+        keys.add(rpc_api.STACK_ACTION)
+    return keys
+
+
+def stack_summary_columns(fields):
+    """Return the stack table columns needed to show the given fields."""
+    columns = set()
+    for key in stack_summary_keys(fields):
+        columns.update(STACK_SUMMARY_COLUMNS[key])
+    return sorted(columns)
+
+
+def format_stack_summary(stack, fields):
+    """Return a partial summary representation of the given stack.
+
+    Given a dict of the stack columns returned by stack_summary_columns(),
+    return the keys of the representation returned by
+    format_stack_db_object() that are needed to show the given fields.
+    """
+    info = {}
+    for key in stack_summary_keys(fields):
+        if key == rpc_api.STACK_ID:
+            value = dict(identifier.HeatIdentifier(stack['tenant'],
+                                                   stack['name'],
+                                                   stack['id']))
+        elif key == rpc_api.STACK_DESCRIPTION:
+            value = ''
+        elif key == rpc_api.STACK_TAGS:
+            value = stack['tags'] or None
+        elif key in (rpc_api.STACK_CREATION_TIME,
+                     rpc_api.STACK_UPDATED_TIME,
+                     rpc_api.STACK_DELETION_TIME):
+            value = heat_timeutils.isotime(
+                stack[STACK_SUMMARY_COLUMNS[key][0]])
+        else:
+            value = stack[STACK_SUMMARY_COLUMNS[key][-1]]
+        info[key] = value
+
+    return info
+
+
 def format_resource_attributes(resource, with_attr=None):
     resolver = resource.attributes
     if not with_attr:
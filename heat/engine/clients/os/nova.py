@@ -12,18 +12,22 @@
 #    under the License.
 
 import collections
+import datetime
 import email
 from email.mime import multipart
 from email.mime import text
 import os
 import pkgutil
 import string
+import threading
 
+from eventlet import event
 from novaclient import client as nc
 from novaclient import exceptions
 from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
+from oslo_utils import timeutils as oslo_timeutils
 from oslo_utils import uuidutils
 from retrying import retry
 import six
@@ -33,6 +37,7 @@ from heat.common import exception
 from heat.common.i18n import _
 from heat.common.i18n import _LI
 from heat.common.i18n import _LW
+from heat.common import timeutils
 from heat.engine.clients import client_plugin
 from heat.engine.clients import os as os_client
 from heat.engine import constraints
@@ -44,6 +49,127 @@ NOVA_API_VERSION = "2.1"
 CLIENT_NAME = 'nova'
 
 
+class ServerStatusPoller(object):
+    """Batched refresh of the servers that resources are waiting on.
+
+    Resources in the same project and region share a poller in each engine.
+    Instead of fetching each server on every poll, the poller lists the
+    servers that have changed since its previous refresh (at most once every
+    interval seconds) and answers lookups from its local copy. A server that
+    the poller has not seen before is fetched individually once.
+
+    The lock only guards the local copy, never a request to Nova. A single
+    caller does each refresh, and any others wait for it to finish.
+    """
+
+    # Allowance for clock skew between the engine and the Nova database
+    CHANGES_SINCE_MARGIN = 60
+
+    # Servers not looked up for this many seconds are forgotten
+    MAX_IDLE = 600
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._servers = {}
+        self._last_refresh = None
+        self._last_used = oslo_timeutils.utcnow()
+        self._refreshing = None
+        self._lock = threading.Lock()
+
+    def idle(self, now):
+        """Return True if no server has been looked up for MAX_IDLE."""
+        idle = now - datetime.timedelta(seconds=self.MAX_IDLE)
+        with self._lock:
+            return self._refreshing is None and self._last_used < idle
+
+    def get(self, client, server_id):
+        """Return the latest known state of a server.
+
+        Exceptions raised by Nova when fetching the server are propagated.
+        """
+        now = oslo_timeutils.utcnow()
+        self._wait_for_refresh(client, now)
+
+        with self._lock:
+            self._last_used = now
+            entry = self._servers.get(server_id)
+            if entry is not None:
+                entry[1] = now
+                return entry[0]
+
+        server = client.servers.get(server_id)
+        with self._lock:
+            self._servers[server_id] = [server, now]
+        return server
+
+    def _wait_for_refresh(self, client, now):
+        """Refresh the local copy if it is due, or wait for a refresh."""
+        with self._lock:
+            refreshing = self._refreshing
+            if refreshing is None:
+                if (self._last_refresh is not None and
+                        oslo_timeutils.delta_seconds(
+                            self._last_refresh, now) < self.interval):
+                    return
+                self._refreshing = event.Event()
+
+        if refreshing is not None:
+            refreshing.wait()
+            return
+
+        try:
+            self._refresh(client, now)
+        finally:
+            with self._lock:
+                refreshing, self._refreshing = self._refreshing, None
+            refreshing.send()
+
+    def _refresh(self, client, now):
+        idle = now - datetime.timedelta(seconds=self.MAX_IDLE)
+        with self._lock:
+            for server_id, (server, last_used) in list(self._servers.items()):
+                if last_used < idle:
+                    del self._servers[server_id]
+            count = len(self._servers)
+            last_refresh = self._last_refresh
+
+        if count and last_refresh is not None:
+            since = last_refresh - datetime.timedelta(
+                seconds=self.CHANGES_SINCE_MARGIN)
+            changed = self._list_changed(client, since)
+            with self._lock:
+                for server in changed:
+                    entry = self._servers.get(server.id)
+                    if entry is not None:
+                        entry[0] = server
+            LOG.debug('Refreshed %(count)d servers, %(changed)d changed',
+                      {'count': count, 'changed': len(changed)})
+
+        with self._lock:
+            self._last_refresh = now
+
+    @staticmethod
+    def _list_changed(client, since):
+        """Return every server changed since a time, following all pages.
+
+        Nova returns at most osapi_max_limit servers per request, so the
+        list is read page by page until a page comes back empty.
+        """
+        search_opts = {'changes-since': timeutils.isotime(since)}
+        changed = []
+        marker = None
+        while True:
+            page = client.servers.list(search_opts=search_opts,
+                                       marker=marker)
+            if not page:
+                return changed
+            changed.extend(page)
+            marker = page[-1].id
+
+
+_status_pollers = {}
+
+
 class NovaClientPlugin(client_plugin.ClientPlugin):
 
     deferred_server_statuses = ['BUILD',
@@ -109,16 +235,40 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         except exceptions.NotFound:
             raise exception.EntityNotFound(entity='Server', name=server)
 
-    def fetch_server(self, server_id):
+    def _status_poller(self):
+        interval = cfg.CONF.clients_nova.server_status_batch_interval
+        if interval <= 0:
+            return None
+
+        key = (self.context.tenant_id, self._get_region_name())
+        now = oslo_timeutils.utcnow()
+        for other_key, other in list(_status_pollers.items()):
+            if other_key != key and other.idle(now):
+                del _status_pollers[other_key]
+
+        poller = _status_pollers.get(key)
+        if poller is None:
+            poller = _status_pollers[key] = ServerStatusPoller(interval)
+        return poller
+
+    def fetch_server(self, server_id, batched=False):
         """Fetch fresh server object from Nova.
 
         Log warnings and return None for non-critical API errors.
         Use this method in various ``check_*_complete`` resource methods,
         where intermittent errors can be tolerated.
+
+        If batched is True and server_status_batch_interval is set, the
+        server is looked up in the engine's ServerStatusPoller, which may
+        return a copy up to that many seconds old.
         """
         server = None
         try:
-            server = self.client().servers.get(server_id)
+            poller = self._status_poller() if batched else None
+            if poller is not None:
+                server = poller.get(self.client(), server_id)
+            else:
+                server = self.client().servers.get(server_id)
         except exceptions.OverLimit as exc:
             LOG.warning(_LW("Received an OverLimit response when "
                             "fetching server (%(id)s) : %(exception)s"),
@@ -189,7 +339,7 @@ class NovaClientPlugin(client_plugin.ClientPlugin):
         """
         # not checking with is_uuid_like as most tests use strings e.g. '1234'
         if isinstance(server, six.string_types):
-            server = self.fetch_server(server)
+            server = self.fetch_server(server, batched=True)
             if server is None:
                 return False
             else:
@@ -401,7 +551,7 @@ echo -e '%s\tALL=(ALL)\tNOPASSWD: ALL' >> /etc/sudoers
     def check_delete_server_complete(self, server_id):
         """Wait for server to disappear from Nova."""
         try:
-            server = self.fetch_server(server_id)
+            server = self.fetch_server(server_id, batched=True)
         except Exception as exc:
             self.ignore_not_found(exc)
             return True
@@ -171,7 +171,11 @@ class Graph(collections.defaultdict):
 @repr_wrapper
 @six.python_2_unicode_compatible
 class Dependencies(object):
-    """Helper class for calculating a dependency graph."""
+    """Helper class for calculating a dependency graph.
+
+    The topological orderings of the graph are calculated only once, and are
+    kept up to date where possible as edges are added.
+    """
 
     def __init__(self, edges=None):
         """Initialise, optionally with a list of edges.
@@ -180,6 +184,8 @@ class Dependencies(object):
         """
         edges = edges or []
         self._graph = Graph()
+        self._order = None
+        self._reverse_order = None
         for e in edges:
             self += e
 
@@ -188,14 +194,139 @@ class Dependencies(object):
         requirer, required = edge
 
         if required is None:
-            # Just ensure the node is created by accessing the defaultdict
-            self._graph[requirer]
+            if requirer not in self._graph:
+                # Just ensure the node is created by accessing the defaultdict
+                self._graph[requirer]
+                self._order_append(requirer)
         else:
+            if (requirer in self._graph and
+                    required in self._graph[requirer].require):
+                return self
+            self._order_add_edge(requirer, required)
             self._graph[required].required_by(requirer)
             self._graph[requirer].requires(required)
 
         return self
 
+    @staticmethod
+    def _append(order, key):
+        if order is not None:
+            order[key] = len(order)
+
+    def _order_append(self, key):
+        """Add a disjoint node to the cached orderings."""
+        self._append(self._order, key)
+        self._append(self._reverse_order, key)
+
+    def _order_add_edge(self, requirer, required):
+        """Update the cached orderings for a new edge, if still possible.
+
+        This must be called before the edge is added to the graph.
+        """
+        if requirer == required:
+            self._order = self._reverse_order = None
+            return
+
+        rqr_new = requirer not in self._graph
+        rqd_new = required not in self._graph
+
+        if self._order is not None:
+            if rqd_new:
+                if rqr_new:
+                    self._append(self._order, required)
+                    self._append(self._order, requirer)
+                else:
+                    self._order = None
+            elif rqr_new:
+                self._append(self._order, requirer)
+            elif self._order[required] > self._order[requirer]:
+                self._order = None
+
+        if self._reverse_order is not None:
+            if rqr_new:
+                if rqd_new:
+                    self._append(self._reverse_order, requirer)
+                    self._append(self._reverse_order, required)
+                else:
+                    self._reverse_order = None
+            elif rqd_new:
+                self._append(self._reverse_order, required)
+            elif (self._reverse_order[requirer] >
+                    self._reverse_order[required]):
+                self._reverse_order = None
+
+    def _toposort(self, reverse=False):
+        """Return an ordering of the graph's nodes as a dict of positions.
+
+        This is an O(V+E) topological sort (Kahn's algorithm). If reverse is
+        True, nodes are ordered before the nodes that they require. Nodes
+        that are part of, or depend on, a cycle are omitted.
+        """
+        if reverse:
+            def incoming(node):
+                return node.satisfy
+
+            def outgoing(node):
+                return node.require
+        else:
+            def incoming(node):
+                return node.require
+
+            def outgoing(node):
+                return node.satisfy
+
+        remaining = dict((k, len(incoming(n)))
+                         for k, n in six.iteritems(self._graph))
+        ready = collections.deque(k for k, n in six.iteritems(self._graph)
+                                  if not remaining[k])
+        order = collections.OrderedDict()
+        while ready:
+            key = ready.popleft()
+            self._append(order, key)
+            for k in outgoing(self._graph[key]):
+                remaining[k] -= 1
+                if not remaining[k]:
+                    ready.append(k)
+        return order
+
+    def find_cycle(self):
+        """Return a list of nodes forming a circular dependency, if any.
+
+        The first node in the list is repeated at the end. If the graph has
+        no cycles, None is returned. This takes O(V+E) time.
+        """
+        order = self._toposort()
+        if len(order) == len(self._graph):
+            return None
+
+        # Each node left over by the sort requires at least one other such
+        # node, so following those requirements from any of them must
+        # eventually arrive back at a node already on the path.
+        candidates = set(k for k in self._graph if k not in order)
+        path = []
+        position = {}
+        key = next(k for k in self._graph if k in candidates)
+        while key not in position:
+            position[key] = len(path)
+            path.append(key)
+            key = next(k for k in self._graph[key] if k in candidates)
+        return path[position[key]:] + [key]
+
+    def _sorted(self, reverse=False):
+        """Return the cached ordering of the graph's nodes."""
+        order = self._reverse_order if reverse else self._order
+        if order is None:
+            order = self._toposort(reverse)
+            if len(order) < len(self._graph):
+                cycle = self.find_cycle()
+                raise CircularDependencyException(
+                    cycle=' -> '.join(six.text_type(k) for k in cycle))
+            if reverse:
+                self._reverse_order = order
+            else:
+                self._order = order
+        return order
+
     def required_by(self, last):
         """List the keys that require the specified node."""
         if last not in self._graph:
@@ -219,23 +350,25 @@ class Dependencies(object):
         if last not in self._graph:
             raise KeyError
 
-        def get_edges(key):
-            def requirer_edges(rqr):
-                # Concatenate the dependency on the current node with the
-                # recursive generated list
-                return itertools.chain([(rqr, key)], get_edges(rqr))
-
-            # Get the edge list for each node that requires the current node
-            edge_lists = six.moves.map(requirer_edges,
-                                       self._graph[key].required_by())
-            # Combine the lists into one long list
-            return itertools.chain.from_iterable(edge_lists)
-
         if self._graph[last].stem():
             # Nothing requires this, so just add the node itself
-            edges = [(last, None)]
-        else:
-            edges = get_edges(last)
+            return Dependencies([(last, None)])
+
+        # Walk the nodes that require the current node depth-first, visiting
+        # each node only once.
+        edges = []
+        visited = {last}
+        stack = [(last, self._graph[last].required_by())]
+        while stack:
+            key, requirers = stack[-1]
+            for rqr in requirers:
+                edges.append((rqr, key))
+                if rqr not in visited:
+                    visited.add(rqr)
+                    stack.append((rqr, self._graph[rqr].required_by()))
+                break
+            else:
+                stack.pop()
 
         return Dependencies(edges)
 
@@ -246,8 +379,8 @@ class Dependencies(object):
 
     def roots(self):
         """Return an iterator over all of the root nodes in the graph."""
-        return (requirer for requirer, required in self.graph(
-            reverse=True).items() if not required)
+        return (requirer for requirer, required in self._graph.items()
+                if required.stem())
 
     def translate(self, transform):
         """Translate all of the nodes using a transform function.
@@ -280,8 +413,11 @@ class Dependencies(object):
 
     def __iter__(self):
         """Return a topologically sorted iterator."""
-        return Graph.toposort(self.graph())
+        # Sort lazily, so that errors are raised on iteration
+        for key in list(self._sorted()):
+            yield key
 
     def __reversed__(self):
         """Return a reverse topologically sorted iterator."""
-        return Graph.toposort(self.graph(reverse=True))
+        for key in list(self._sorted(reverse=True)):
+            yield key
@@ -270,6 +270,36 @@ class ResourceRegistry(object):
         self._registry = {'resources': {}}
         self.global_registry = global_registry
         self.param_defaults = param_defaults
+        # Incremented on every change to the registry, so that the lookup
+        # index and cached results can be discarded when they are stale.
+        self._generation = 0
+        self._index_generation = None
+        self._glob_index = {}
+        self._info_cache = {}
+
+    def _changed(self):
+        self._generation += 1
+
+    def _cache_generation(self):
+        if self.global_registry is None:
+            return self._generation, None
+        return self._generation, self.global_registry._generation
+
+    def _get_glob_index(self):
+        """Return the glob mappings in the registry, indexed by prefix.
+
+        The index is rebuilt only when the registry has changed, so that the
+        glob mappings matching a type can be found without scanning the
+        whole registry.
+        """
+        if self._index_generation != self._generation:
+            index = collections.defaultdict(list)
+            for name, info in six.iteritems(self._registry):
+                if name.endswith('*') and isinstance(info, ResourceInfo):
+                    index[name[:-1]].append(info)
+            self._glob_index = dict(index)
+            self._index_generation = self._generation
+        return self._glob_index
 
     def load(self, json_snippet):
         self._load_registry([], json_snippet)
@@ -300,6 +330,7 @@ class ResourceRegistry(object):
                 registry[key] = {}
             registry = registry[key]
         registry[name] = item
+        self._changed()
 
     def _register_info(self, path, info):
         """Place the new info in the correct location in the registry.
@@ -316,6 +347,7 @@ class ResourceRegistry(object):
             registry = registry[key]
 
         if info is None:
+            self._changed()
             if name.endswith('*'):
                 # delete all matching entries.
                 for res_name, reg_info in list(registry.items()):
@@ -358,6 +390,7 @@ class ResourceRegistry(object):
 
         info.user_resource = (self.global_registry is not None)
         registry[name] = info
+        self._changed()
 
     def log_resource_info(self, show_all=False, prefix=None):
         registry = self._registry
@@ -380,6 +413,7 @@ class ResourceRegistry(object):
             registry = registry[key]
         if info.path[-1] in registry:
             registry.pop(info.path[-1])
+            self._changed()
 
     def get_rsrc_restricted_actions(self, resource_name):
         """Returns a set of restricted actions.
@@ -454,6 +488,7 @@ class ResourceRegistry(object):
         if resource_name in ress:
             new_resources.update(ress[resource_name])
         self._registry['resources'] = new_resources
+        self._changed()
 
     def iterable_by(self, resource_type, resource_name=None):
         is_templ_type = resource_type.endswith(('.yaml', '.template'))
@@ -479,20 +514,51 @@ class ResourceRegistry(object):
             yield impl
 
         # handle: "OS::*" -> "Dreamhost::*"
-        def is_a_glob(resource_type):
-            return resource_type.endswith('*')
-        globs = six.moves.filter(is_a_glob, iter(self._registry))
-        for pattern in globs:
-            if self._registry[pattern].matches(resource_type):
-                yield self._registry[pattern]
+        glob_index = self._get_glob_index()
+        if glob_index:
+            for length in range(len(resource_type) + 1):
+                for info in glob_index.get(resource_type[:length], []):
+                    if info.matches(resource_type):
+                        yield info
+
+    def _has_resource_mappings(self, resource_name):
+        """Return whether there are mappings specific to a resource name."""
+        if resource_name in self._registry['resources']:
+            return True
+        return (self.global_registry is not None and
+                self.global_registry._has_resource_mappings(resource_name))
 
     def get_resource_info(self, resource_type, resource_name=None,
                           registry_type=None, ignore=None):
         """Find possible matches to the resource type and name.
 
         Chain the results from the global and user registry to find
-        a match.
+        a match. Matches are cached until either registry changes.
         """
+        if ignore is not None:
+            return self._find_resource_info(resource_type, resource_name,
+                                            registry_type, ignore)
+
+        # Most resources have no mappings of their own, so the result for
+        # their type can be shared with other resources of the same type.
+        if resource_name and self._has_resource_mappings(resource_name):
+            key = (resource_type, resource_name, registry_type)
+        else:
+            key = (resource_type, None, registry_type)
+
+        generation = self._cache_generation()
+        cached = self._info_cache.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        match = self._find_resource_info(resource_type, resource_name,
+                                         registry_type)
+        # Finding the match may have changed the registry
+        self._info_cache[key] = (self._cache_generation(), match)
+        return match
+
+    def _find_resource_info(self, resource_type, resource_name=None,
+                            registry_type=None, ignore=None):
         # use cases
         # 1) get the impl.
         #    - filter_by(res_type=X), sort_by(res_name=W, is_user=True)
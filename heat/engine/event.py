@@ -11,20 +11,42 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+
+import eventlet
 import six
 
 from sqlalchemy.util.compat import pickle
 
+from oslo_config import cfg
 import oslo_db.exception
 from oslo_log import log as logging
+from oslo_utils import timeutils
+from oslo_utils import uuidutils
 
+from heat.common import context as common_context
+from heat.common.i18n import _LE
 from heat.common import identifier
 from heat.objects import event as event_object
 
+cfg.CONF.import_opt('event_purge_batch_size', 'heat.common.config')
+cfg.CONF.import_opt('max_events_per_stack', 'heat.common.config')
+
 LOG = logging.getLogger(__name__)
 
 MAX_EVENT_RESOURCE_PROPERTIES_SIZE = (1 << 16) - 1
 
+# The maximum number of events held in an EventBuffer before it is flushed
+MAX_BUFFERED_EVENTS = 100
+
+# The approximate number of events stored for each stack, as counted by this
+# process, for the stacks that have most recently had events stored.
+_event_counts = collections.OrderedDict()
+_MAX_COUNTED_STACKS = 1000
+
+# The stacks for which old events are currently being pruned
+_pruning = set()
+
 
 class Event(object):
     """Class representing a Resource state change."""
@@ -39,6 +61,7 @@ class Event(object):
         """
         self.context = context
         self._stack_identifier = stack.identifier()
+        self._root_stack_id = stack.root_stack_id()
         self.action = action
         self.status = status
         self.reason = reason
@@ -53,12 +76,13 @@ class Event(object):
         self.timestamp = timestamp
         self.id = id
 
-    def store(self):
-        """Store the Event in the database."""
+    def _db_values(self):
+        """Return the values to store in the database for the Event."""
         ev = {
             'resource_name': self.resource_name,
             'physical_resource_id': self.physical_resource_id,
             'stack_id': self._stack_identifier.stack_id,
+            'root_stack_id': self._root_stack_id,
             'resource_action': self.action,
             'resource_status': self.status,
             'resource_status_reason': self.reason,
@@ -76,6 +100,8 @@ class Event(object):
         # event.resource_properties column if the data is too large
         # (greater than permitted by BLOB). Otherwise, we end up with
         # an unsightly log message.
+        if not ev['resource_properties']:
+            return ev
         rp_size = len(pickle.dumps(ev['resource_properties'],
                                    pickle.HIGHEST_PROTOCOL))
         if rp_size > MAX_EVENT_RESOURCE_PROPERTIES_SIZE:
@@ -95,6 +121,11 @@ class Event(object):
                           'after truncating largest key at %d bytes', rp_size)
                 err = 'Resource properties are too large to attempt to store'
                 ev['resource_properties'] = {'Error': err}
+        return ev
+
+    def store(self):
+        """Store the Event in the database."""
+        ev = self._db_values()
 
         # We should have worked around the issue, but let's be extra
         # careful.
@@ -139,3 +170,86 @@ class Event(object):
                 'version': '0.1'
             }
         }
+
+
+class EventBuffer(object):
+    """Collect the events of a stack to write them to the database in bulk.
+
+    Buffered events are assigned their UUID and timestamp when they are added,
+    but do not get a database ID. They are written when flush() is called or
+    when MAX_BUFFERED_EVENTS are waiting.
+
+    Rather than counting the events in the database each time one is stored,
+    the number of events for the stack is tracked in memory. Once it passes
+    max_events_per_stack, the oldest events are pruned in a separate thread.
+    """
+
+    def __init__(self, context, stack_id):
+        self.context = context
+        self.stack_id = stack_id
+        self._events = []
+
+    def __len__(self):
+        return len(self._events)
+
+    def add(self, ev):
+        if ev.uuid is None:
+            ev.uuid = uuidutils.generate_uuid()
+        if ev.timestamp is None:
+            ev.timestamp = timeutils.utcnow()
+        self._events.append(ev)
+
+        if len(self._events) >= MAX_BUFFERED_EVENTS:
+            self.flush()
+
+    def flush(self):
+        """Write all of the buffered events to the database."""
+        events, self._events = self._events, []
+        if not events:
+            return
+
+        try:
+            event_object.Event.create_batch(self.context,
+                                            [ev._db_values() for ev in events])
+        except oslo_db.exception.DBError:
+            # Store the events one at a time, which handles any problem with
+            # storing their properties.
+            for ev in events:
+                ev.store()
+        else:
+            _events_stored(self.context, self.stack_id, len(events))
+
+
+def _events_stored(context, stack_id, num_events):
+    """Update the event count for a stack, pruning old events if needed."""
+    max_events = cfg.CONF.max_events_per_stack
+    if not max_events:
+        return
+
+    count = _event_counts.pop(stack_id, None)
+    if count is None:
+        count = event_object.Event.count_all_by_stack(context, stack_id)
+    else:
+        count += num_events
+
+    if count > max_events and stack_id not in _pruning:
+        limit = count - max_events + cfg.CONF.event_purge_batch_size
+        _pruning.add(stack_id)
+        eventlet.spawn_n(_prune_events, stack_id, limit)
+        count -= limit
+
+    _event_counts[stack_id] = count
+    while len(_event_counts) > _MAX_COUNTED_STACKS:
+        _event_counts.popitem(last=False)
+
+
+def _prune_events(stack_id, limit):
+    try:
+        ctx = common_context.get_admin_context()
+        event_object.Event.prune_by_stack(ctx, stack_id, limit)
+    except Exception as ex:
+        LOG.error(_LE('Failed to prune events of stack %(stack)s: %(err)s'),
+                  {'stack': stack_id, 'err': ex})
+        _event_counts.pop(stack_id, None)
+    finally:
+        _pruning.discard(stack_id)
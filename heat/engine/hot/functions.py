@@ -12,8 +12,10 @@
 #    under the License.
 
 import collections
+import functools
 import hashlib
 import itertools
+import re
 
 from oslo_config import cfg
 from oslo_serialization import jsonutils
@@ -23,6 +25,7 @@ from yaql.language import exceptions
 
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common import lru
 from heat.engine import attributes
 from heat.engine import function
 
@@ -34,9 +37,42 @@ opts = [
     cfg.IntOpt('memory_quota',
                default=10000,
                help=_('The maximum size of memory in bytes that '
-                      'expression can take for its evaluation.'))
+                      'expression can take for its evaluation.')),
+    cfg.IntOpt('expression_cache_size',
+               default=1000,
+               help=_('The maximum number of parsed expressions to keep in '
+                      'memory, shared by all stacks. Set to 0 to disable '
+                      'the cache.'))
 ]
 cfg.CONF.register_opts(opts, group='yaql')
+cfg.CONF.import_opt('max_repeat_size', 'heat.common.config')
+
+YAQL_CACHE_STATS = (
+    YAQL_CACHE_HITS, YAQL_CACHE_MISSES,
+) = (
+    'hits', 'misses',
+)
+
+# Parsed yaql expressions shared by all stacks in this process, keyed by the
+# expression string.
+_yaql_cache = lru.LRUCache(lambda: cfg.CONF.yaql.expression_cache_size)
+_yaql_cache_stats = collections.Counter()
+
+
+def yaql_cache_stats():
+    """Return the counters of the yaql expression cache for this process.
+
+    The counters are the number of expressions found in the cache and the
+    number that had to be parsed, along with the current size of the cache.
+    """
+    stats = dict((k, _yaql_cache_stats[k]) for k in YAQL_CACHE_STATS)
+    stats['size'] = len(_yaql_cache)
+    return stats
+
+
+def reset_yaql_cache():
+    _yaql_cache.clear()
+    _yaql_cache_stats.clear()
 
 
 class GetParam(function.Function):
@@ -335,6 +371,113 @@ class GetAttAllAttributes(GetAtt):
         return True
 
 
+# The maximum number of compiled str_replace matchers to keep in memory
+MAX_REPLACE_MATCHERS = 256
+
+# Compiled str_replace matchers shared by all stacks in this process, keyed
+# by the set of placeholders.
+_replace_matchers = lru.LRUCache(lambda: MAX_REPLACE_MATCHERS)
+
+
+class _ReplaceMatcher(object):
+    """A compiled matcher for the placeholders of a string substitution.
+
+    Placeholders are preferred in order of length, longest first, then
+    lexicographically. Replacing each placeholder in turn in that order means
+    scanning and copying the string once for each placeholder. Instead, all
+    of the placeholders are found in a single pass with a regular expression
+    that, at each position, matches the most preferred placeholder.
+
+    The two approaches give different results only where an occurrence of a
+    more preferred placeholder overlaps one that was matched. Such overlaps
+    are rare, and are checked for at each match; when one is found, the
+    placeholders are replaced one at a time instead.
+    """
+
+    def __init__(self, placeholders):
+        self.placeholders = sorted(sorted(placeholders), key=len,
+                                   reverse=True)
+        self._rank = dict((p, i) for i, p in enumerate(self.placeholders))
+        self._conflicts = {}
+        if self.placeholders and '' not in self._rank:
+            self._pattern = re.compile('|'.join(re.escape(p) for p in
+                                                self.placeholders))
+        else:
+            self._pattern = None
+
+    def _conflicting(self, placeholder):
+        """Return the occurrences that would take precedence over a match.
+
+        The result is a list of (placeholder, offset) pairs, one for each
+        occurrence relative to the start of a match that would overlap it and
+        that, replacing one placeholder at a time, would be replaced first.
+        """
+        try:
+            return self._conflicts[placeholder]
+        except KeyError:
+            pass
+
+        conflicts = []
+        for other in self.placeholders:
+            if other == placeholder:
+                offsets = range(1 - len(other), 0)
+            elif self._rank[other] < self._rank[placeholder]:
+                offsets = range(1 - len(other), len(placeholder))
+            else:
+                break
+            for offset in offsets:
+                start = max(0, offset)
+                end = min(len(placeholder), offset + len(other))
+                if (placeholder[start:end] ==
+                        other[start - offset:end - offset]):
+                    conflicts.append((other, offset))
+
+        self._conflicts[placeholder] = conflicts
+        return conflicts
+
+    def _replace_each(self, template, values):
+        def replace(strings, placeholders):
+            if not placeholders:
+                return strings
+
+            placeholder = placeholders[0]
+            value = values[placeholder]
+            return [value.join(replace(s.split(placeholder),
+                                       placeholders[1:])) for s in strings]
+
+        return replace([template], self.placeholders)[0]
+
+    def replace(self, template, values):
+        """Return the template with the placeholders replaced by values."""
+        if self._pattern is None:
+            return self._replace_each(template, values)
+
+        pieces = []
+        pos = 0
+        for match in self._pattern.finditer(template):
+            start = match.start()
+            placeholder = match.group()
+            for other, offset in self._conflicting(placeholder):
+                if (start + offset >= 0 and
+                        template.startswith(other, start + offset)):
+                    return self._replace_each(template, values)
+            pieces.append(template[pos:start])
+            pieces.append(values[placeholder])
+            pos = match.end()
+        pieces.append(template[pos:])
+        return ''.join(pieces)
+
+
+def _replace_matcher(placeholders):
+    """Return a compiled matcher for a set of placeholders."""
+    key = frozenset(placeholders)
+    matcher = _replace_matchers.get(key)
+    if matcher is None:
+        matcher = _ReplaceMatcher(key)
+        _replace_matchers.put(key, matcher)
+    return matcher
+
+
 class Replace(function.Function):
     """A function for performing string substitutions.
 
@@ -405,22 +548,14 @@ class Replace(function.Function):
         if not isinstance(mapping, collections.Mapping):
             raise TypeError(_('"%s" params must be a map') % self.fn_name)
 
-        def replace(strings, keys):
-            if not keys:
-                return strings
-
-            placeholder = keys[0]
+        values = {}
+        for placeholder, value in six.iteritems(mapping):
             if not isinstance(placeholder, six.string_types):
                 raise TypeError(_('"%s" param placeholders must be strings') %
                                 self.fn_name)
+            values[placeholder] = self._validate_replacement(value)
 
-            remaining_keys = keys[1:]
-            value = self._validate_replacement(mapping[placeholder])
-            return [value.join(replace(s.split(placeholder),
-                                       remaining_keys)) for s in strings]
-
-        return replace([template], sorted(sorted(mapping),
-                                          key=len, reverse=True))[0]
+        return _replace_matcher(values).replace(template, values)
 
 
 class ReplaceJson(Replace):
@@ -827,6 +962,10 @@ class Repeat(function.Function):
     The result is a new list of the same size as <list>, where each element
     is a copy of <body> with any occurrences of <var> replaced with the
     corresponding item of <list>.
+
+    The parts of <body> that contain no <var> are shared by all of the
+    elements, and the result is reused for as long as the resolved arguments
+    are unchanged, so the result must not be modified.
     """
     def __init__(self, stack, fn_name, args):
         super(Repeat, self).__init__(stack, fn_name, args)
@@ -847,6 +986,8 @@ class Repeat(function.Function):
                 %var%: ['a', 'b', 'c']''')
             raise KeyError(_('"repeat" syntax should be %s') % example)
 
+        self._last_result = None
+
     def validate(self):
         super(Repeat, self).validate()
 
@@ -876,6 +1017,55 @@ class Repeat(function.Function):
         else:
             return template
 
+    def _compile(self, keys, template):
+        """Return a function that substitutes replacements into the template.
+
+        Only the strings that contain at least one of the keys need to be
+        substituted into, so None is returned for a template that contains
+        none of them; it can be used unchanged in every element.
+        """
+        if isinstance(template, six.string_types):
+            if not any(key in template for key in keys):
+                return None
+            return functools.partial(self._do_replacement, keys,
+                                     template=template)
+        elif isinstance(template, collections.Sequence):
+            elems = [(elem, self._compile(keys, elem)) for elem in template]
+            if all(sub is None for elem, sub in elems):
+                return None
+
+            def substitute(values):
+                return [elem if sub is None else sub(values)
+                        for elem, sub in elems]
+            return substitute
+        elif isinstance(template, collections.Mapping):
+            items = [(k, self._compile(keys, k), v, self._compile(keys, v))
+                     for (k, v) in template.items()]
+            if all(k_sub is None and v_sub is None
+                   for k, k_sub, v, v_sub in items):
+                return None
+
+            def substitute(values):
+                return dict((k if k_sub is None else k_sub(values),
+                             v if v_sub is None else v_sub(values))
+                            for k, k_sub, v, v_sub in items)
+            return substitute
+        else:
+            return None
+
+    def _size(self, values):
+        """Return the number of items to generate, if within the limit."""
+        size = 1
+        for value in values:
+            size *= len(value)
+        if size > cfg.CONF.max_repeat_size:
+            raise ValueError(_('The "for_each" argument to "%(fn_name)s" '
+                               'would produce %(size)d items, which exceeds '
+                               'the maximum of %(max)d.') %
+                             {'fn_name': self.fn_name, 'size': size,
+                              'max': cfg.CONF.max_repeat_size})
+        return size
+
     def result(self):
         for_each = function.resolve(self._for_each)
         keys, lists = six.moves.zip(*for_each.items())
@@ -889,8 +1079,26 @@ class Repeat(function.Function):
 
         template = function.resolve(self._template)
 
-        return [self._do_replacement(keys, replacements, template)
-                for replacements in itertools.product(*values)]
+        # Compare the inputs as JSON, since values such as 1, 1.0 and True
+        # are equal but would not produce the same result
+        try:
+            inputs = jsonutils.dumps((keys, values, template), sort_keys=True)
+        except (TypeError, ValueError):
+            inputs = None
+        if (inputs is not None and self._last_result is not None and
+                self._last_result[0] == inputs):
+            return self._last_result[1]
+
+        size = self._size(values)
+        substitute = self._compile(keys, template)
+        if substitute is None:
+            result = [template] * size
+        else:
+            result = [substitute(replacements)
+                      for replacements in itertools.product(*values)]
+
+        self._last_result = (inputs, result)
+        return result
 
 
 class RepeatWithMap(Repeat):
@@ -1042,8 +1250,29 @@ class Yaql(function.Function):
             }
             cls._parser = yaql.YaqlFactory().create(global_options)
             cls._context = yaql.create_context()
+            # Statements are bound to the options of the parser that
+            # created them
+            _yaql_cache.clear()
         return cls._parser
 
+    @classmethod
+    def _compile(cls, expression):
+        """Return the parsed statement for an expression.
+
+        Parsed statements are immutable, so they are kept in a cache shared
+        by all stacks. The limits on evaluation are applied by the parser's
+        options when the statement is evaluated, so they are unaffected.
+        """
+        parse = cls.get_yaql_parser()
+        statement = _yaql_cache.get(expression)
+        if statement is None:
+            _yaql_cache_stats[YAQL_CACHE_MISSES] += 1
+            statement = parse(expression)
+            _yaql_cache.put(expression, statement)
+        else:
+            _yaql_cache_stats[YAQL_CACHE_HITS] += 1
+        return statement
+
     def __init__(self, stack, fn_name, args):
         super(Yaql, self).__init__(stack, fn_name, args)
 
@@ -1074,9 +1303,8 @@ class Yaql(function.Function):
             raise TypeError(_('The "expression" argument to %s must '
                               'contain a string.') % self.fn_name)
 
-        parse = self.get_yaql_parser()
         try:
-            return parse(expression)
+            return self._compile(expression)
         except exceptions.YaqlException as yex:
             raise ValueError(_('Bad expression %s.') % yex)
 
@@ -43,6 +43,7 @@ from heat.engine import resources
 from heat.engine import rsrc_defn
 from heat.engine import scheduler
 from heat.engine import support
+from heat.engine import trace
 from heat.objects import resource as resource_objects
 from heat.objects import resource_data as resource_data_objects
 from heat.objects import stack as stack_objects
@@ -154,6 +155,10 @@ class Resource(object):
     # a signal to this resource
     signal_needs_metadata_updates = True
 
+    # Policy for polling check_<ACTION>_complete(), e.g. a
+    # scheduler.ExponentialBackoff. If None, poll on every step.
+    poll_policy = None
+
     def __new__(cls, name, definition, stack):
         """Create a new Resource of the appropriate class for its type."""
 
@@ -313,13 +318,19 @@ class Resource(object):
     def load(cls, context, resource_id, is_update, data):
         from heat.engine import stack as stack_mod
         db_res = resource_objects.Resource.get_obj(context, resource_id)
+        # Don't load the template with the stack, so that a cached copy of
+        # the parsed template can be used if one is available.
+        db_stack = stack_objects.Stack.get_by_id(context, db_res.stack_id,
+                                                 show_deleted=True,
+                                                 eager_load=False)
         curr_stack = stack_mod.Stack.load(context, stack_id=db_res.stack_id,
-                                          cache_data=data)
+                                          stack=db_stack, cache_data=data)
 
         resource_owning_stack = curr_stack
         if db_res.current_template_id != curr_stack.t.id:
             # load stack with template owning the resource
-            db_stack = stack_objects.Stack.get_by_id(context, db_res.stack_id)
+            db_stack = stack_objects.Stack.get_by_id(context, db_res.stack_id,
+                                                     eager_load=False)
             db_stack.raw_template = None
             db_stack.raw_template_id = db_res.current_template_id
             resource_owning_stack = stack_mod.Stack.load(context,
@@ -423,6 +434,9 @@ class Resource(object):
         if self.id is None or self.action == self.INIT:
             raise exception.ResourceNotAvailable(resource_name=self.name)
         LOG.debug('Setting metadata for %s', six.text_type(self))
+        # Write any batched update first so that it does not later overwrite
+        # the metadata with an earlier value.
+        self.stack.flush_resource_updates()
         refresh = merge_metadata is not None
         db_res = resource_objects.Resource.get_obj(self.stack.context, self.id,
                                                    refresh=refresh)
@@ -748,33 +762,34 @@ class Resource(object):
         Expected exceptions are re-raised, with the Resource moved to the
         COMPLETE state.
         """
-        try:
-            self.state_set(action, self.IN_PROGRESS)
-            yield
-        except expected_exceptions as ex:
-            with excutils.save_and_reraise_exception():
-                self.state_set(action, self.COMPLETE, six.text_type(ex))
-                LOG.debug('%s', six.text_type(ex))
-        except Exception as ex:
-            LOG.info(_LI('%(action)s: %(info)s'),
-                     {"action": action,
-                      "info": six.text_type(self)},
-                     exc_info=True)
-            failure = exception.ResourceFailure(ex, self, action)
-            self.state_set(action, self.FAILED, six.text_type(failure))
-            raise failure
-        except BaseException as exc:
-            with excutils.save_and_reraise_exception():
-                try:
-                    reason = six.text_type(exc)
-                    msg = '%s aborted' % action
-                    if reason:
-                        msg += ' (%s)' % reason
-                    self.state_set(action, self.FAILED, msg)
-                except Exception:
-                    LOG.exception(_LE('Error marking resource as failed'))
-        else:
-            self.state_set(action, self.COMPLETE)
+        with self.stack.tracer.span(trace.ACTION, self.name, action=action):
+            try:
+                self.state_set(action, self.IN_PROGRESS)
+                yield
+            except expected_exceptions as ex:
+                with excutils.save_and_reraise_exception():
+                    self.state_set(action, self.COMPLETE, six.text_type(ex))
+                    LOG.debug('%s', six.text_type(ex))
+            except Exception as ex:
+                LOG.info(_LI('%(action)s: %(info)s'),
+                         {"action": action,
+                          "info": six.text_type(self)},
+                         exc_info=True)
+                failure = exception.ResourceFailure(ex, self, action)
+                self.state_set(action, self.FAILED, six.text_type(failure))
+                raise failure
+            except BaseException as exc:
+                with excutils.save_and_reraise_exception():
+                    try:
+                        reason = six.text_type(exc)
+                        msg = '%s aborted' % action
+                        if reason:
+                            msg += ' (%s)' % reason
+                        self.state_set(action, self.FAILED, msg)
+                    except Exception:
+                        LOG.exception(_LE('Error marking resource as failed'))
+            else:
+                self.state_set(action, self.COMPLETE)
 
     def action_handler_task(self, action, args=None, action_prefix=None):
         """A task to call the Resource subclass's handler methods for action.
@@ -790,27 +805,48 @@ class Resource(object):
         """
         args = args or []
         handler_action = action.lower()
-        check = getattr(self, 'check_%s_complete' % handler_action, None)
+        check_method = 'check_%s_complete' % handler_action
+        check = getattr(self, check_method, None)
 
         if action_prefix:
             handler_action = '%s_%s' % (action_prefix.lower(), handler_action)
         handler = getattr(self, 'handle_%s' % handler_action, None)
 
+        policy = self.poll_policy
+        tracer = self.stack.tracer
         if callable(handler):
-            handler_data = handler(*args)
-            yield
+            started = timeutils.wallclock()
+            with tracer.span(trace.HANDLE, self.name,
+                             method='handle_%s' % handler_action):
+                handler_data = handler(*args)
+            if policy is None or not policy.fast_path or not callable(check):
+                yield
             if callable(check):
+                periods = iter(policy) if policy is not None else None
+                polls = 0
                 try:
                     while True:
+                        polls += 1
                         try:
-                            done = check(handler_data)
+                            with tracer.span(trace.CHECK, self.name,
+                                             method=check_method):
+                                done = check(handler_data)
                         except PollDelay as delay:
                             yield delay.period
                         else:
                             if done:
                                 break
+                            elif periods is not None:
+                                yield next(periods)
                             else:
                                 yield
+                    elapsed = timeutils.wallclock() - started
+                    scheduler.poll_stats.record(self.type(), polls, elapsed)
+                    LOG.debug('%(res)s %(action)s complete after %(polls)d '
+                              'polls in %(elapsed).1fs',
+                              {'res': six.text_type(self),
+                               'action': handler_action,
+                               'polls': polls, 'elapsed': elapsed})
                 except Exception:
                     raise
                 except:  # noqa
@@ -849,7 +885,8 @@ class Resource(object):
 
         with self._action_recorder(action):
             if callable(pre_func):
-                pre_func()
+                with self.stack.tracer.span(trace.PROPERTIES, self.name):
+                    pre_func()
 
             handler_args = [resource_data] if resource_data is not None else []
             yield self.action_handler_task(action, args=handler_args)
@@ -936,8 +973,9 @@ class Resource(object):
         # are __init__'d, but before they are create()'d). We also
         # do client lookups for RESOLVE translation rules here.
 
-        self.reparse()
-        self._update_stored_properties()
+        with self.stack.tracer.span(trace.PROPERTIES, self.name):
+            self.reparse()
+            self._update_stored_properties()
 
         count = {self.CREATE: 0, self.DELETE: 0}
 
@@ -1289,7 +1327,9 @@ class Resource(object):
             LOG.debug("Skip update on external resource.")
             return
 
-        after_props, before_props = self._prepare_update_props(after, before)
+        with self.stack.tracer.span(trace.PROPERTIES, self.name):
+            after_props, before_props = self._prepare_update_props(after,
+                                                                   before)
 
         yield self._break_if_required(
             self.UPDATE, environment.HOOK_PRE_UPDATE)
@@ -1323,7 +1363,8 @@ class Resource(object):
             self.updated_time = datetime.utcnow()
 
             with self._action_recorder(action, UpdateReplace):
-                after_props.validate()
+                with self.stack.tracer.span(trace.PROPERTIES, self.name):
+                    after_props.validate()
 
                 tmpl_diff = self.update_template_diff(after.freeze(), before)
                 if tmpl_diff and self.needs_replace_with_tmpl_diff(tmpl_diff):
@@ -1337,8 +1378,9 @@ class Resource(object):
                                                args=[after, tmpl_diff,
                                                      prop_diff])
                 self.t = after
-                self.reparse()
-                self._update_stored_properties()
+                with self.stack.tracer.span(trace.PROPERTIES, self.name):
+                    self.reparse()
+                    self._update_stored_properties()
 
         except exception.ResourceActionRestricted as ae:
             # catch all ResourceActionRestricted exceptions
@@ -1704,13 +1746,23 @@ class Resource(object):
         self.resource_id = inst
         if self.id is not None:
             try:
-                resource_objects.Resource.update_by_id(
-                    self.context,
-                    self.id,
-                    {'physical_resource_id': self.resource_id})
+                self._update_by_id({'physical_resource_id': self.resource_id})
             except Exception as ex:
                 LOG.warning(_LW('db error %s'), ex)
 
+    def _update_by_id(self, values):
+        """Write values to the resource in the database.
+
+        If the stack is batching resource updates, the update is added to the
+        batch rather than written immediately.
+        """
+        batch = self.stack.resource_update_batch
+        if batch is not None:
+            batch.add(self.id, values)
+        else:
+            resource_objects.Resource.update_by_id(self.context, self.id,
+                                                   values)
+
     def _store(self, metadata=None):
         """Create the resource in the database."""
 
@@ -1752,7 +1804,7 @@ class Resource(object):
                          physical_res_id, self.properties,
                          self.name, self.type())
 
-        ev.store()
+        self.stack.store_event(ev)
         self.stack.dispatch_event(ev)
 
     def _store_or_update(self, action, status, reason):
@@ -1786,18 +1838,19 @@ class Resource(object):
         else:
             metadata = self._rsrc_metadata
 
-        if self.id is not None:
-            try:
-                resource_objects.Resource.update_by_id(self.context, self.id,
-                                                       data)
-            except Exception as ex:
-                LOG.error(_LE('DB error %s'), ex)
+        with self.stack.tracer.span(trace.DB_WRITE, self.name,
+                                    action=action, status=status):
+            if self.id is not None:
+                try:
+                    self._update_by_id(data)
+                except Exception as ex:
+                    LOG.error(_LE('DB error %s'), ex)
+                else:
+                    self._rsrc_metadata = metadata
             else:
-                self._rsrc_metadata = metadata
-        else:
-            # This should only happen in unit tests
-            LOG.warning(_LW('Resource "%s" not pre-stored in DB'), self)
-            self._store(metadata)
+                # This should only happen in unit tests
+                LOG.warning(_LW('Resource "%s" not pre-stored in DB'), self)
+                self._store(metadata)
 
     @contextlib.contextmanager
     def lock(self, engine_id):
@@ -1813,11 +1866,12 @@ class Resource(object):
     def _acquire(self, engine_id):
         updated_ok = False
         try:
-            rs = resource_objects.Resource.get_obj(self.context, self.id)
-            updated_ok = rs.select_and_update(
-                {'engine_id': engine_id},
-                atomic_key=rs.atomic_key,
-                expected_engine_id=None)
+            with self.stack.tracer.span(trace.LOCK_WAIT, self.name):
+                rs = resource_objects.Resource.get_obj(self.context, self.id)
+                updated_ok = rs.select_and_update(
+                    {'engine_id': engine_id},
+                    atomic_key=rs.atomic_key,
+                    expected_engine_id=None)
         except Exception as ex:
             LOG.error(_LE('DB error %s'), ex)
             raise
@@ -1998,6 +2052,10 @@ class Resource(object):
             self._add_event(action, status, reason)
 
         self.stack.reset_resource_attributes()
+        # Output values stored during a stack action are discarded when it
+        # starts, so only changes outside of one need to discard them.
+        if self.stack.status != self.stack.IN_PROGRESS:
+            self.stack.invalidate_output_cache()
 
     @property
     def state(self):
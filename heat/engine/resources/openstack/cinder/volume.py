@@ -24,6 +24,7 @@ from heat.engine import constraints
 from heat.engine import properties
 from heat.engine.resources import scheduler_hints as sh
 from heat.engine.resources import volume_base as vb
+from heat.engine import scheduler
 from heat.engine import support
 from heat.engine import translation
 
@@ -235,6 +236,8 @@ class CinderVolume(vb.BaseVolume, sh.SchedulerHintsMixin):
 
     entity = 'volumes'
 
+    poll_policy = scheduler.ExponentialBackoff()
+
     def translation_rules(self, props):
         return [
             translation.TranslationRule(
@@ -146,21 +146,21 @@ class ResourceChain(stack_resource.StackResource):
         if key.startswith('resource.'):
             return grouputils.get_nested_attrs(self, key, False, *path)
 
+        inspector = grouputils.GroupInspector(self)
         resource_types = self.properties[self.RESOURCES]
         names = self._resource_names(resource_types)
         if key == self.REFS:
-            vals = [grouputils.get_rsrc_id(self, key, False, n) for n in names]
+            vals = [inspector.rsrc_id(key, False, n) for n in names]
             return attributes.select_from_attribute(vals, path)
         if key == self.ATTR_ATTRIBUTES:
             if not path:
                 raise exception.InvalidTemplateAttribute(
                     resource=self.name, key=key)
-            return dict((n, grouputils.get_rsrc_attr(
-                self, key, False, n, *path)) for n in names)
+            return dict((n, inspector.rsrc_attr(key, False, n, *path))
+                        for n in names)
 
         path = [key] + list(path)
-        return [grouputils.get_rsrc_attr(self, key, False, n, *path)
-                for n in names]
+        return [inspector.rsrc_attr(key, False, n, *path) for n in names]
 
     @staticmethod
     def _resource_names(resource_types):
@@ -430,12 +430,13 @@ class ResourceGroup(stack_resource.StackResource):
         if key.startswith("resource."):
             return grouputils.get_nested_attrs(self, key, False, *path)
 
+        inspector = grouputils.GroupInspector(self)
         names = self._resource_names()
         if key == self.REFS:
-            vals = [grouputils.get_rsrc_id(self, key, False, n) for n in names]
+            vals = [inspector.rsrc_id(key, False, n) for n in names]
             return attributes.select_from_attribute(vals, path)
         if key == self.REFS_MAP:
-            refs_map = {n: grouputils.get_rsrc_id(self, key, False, n)
+            refs_map = {n: inspector.rsrc_id(key, False, n)
                         for n in names}
             return refs_map
         if key == self.REMOVED_RSRC_LIST:
@@ -444,12 +445,11 @@ class ResourceGroup(stack_resource.StackResource):
             if not path:
                 raise exception.InvalidTemplateAttribute(
                     resource=self.name, key=key)
-            return dict((n, grouputils.get_rsrc_attr(
-                self, key, False, n, *path)) for n in names)
+            return dict((n, inspector.rsrc_attr(key, False, n, *path))
+                        for n in names)
 
         path = [key] + list(path)
-        return [grouputils.get_rsrc_attr(self, key, False, n, *path)
-                for n in names]
+        return [inspector.rsrc_attr(key, False, n, *path) for n in names]
 
     def build_resource_definition(self, res_name, res_defn):
         res_def = copy.deepcopy(res_defn)
@@ -33,6 +33,7 @@ from heat.engine.resources.openstack.neutron import subnet
 from heat.engine.resources.openstack.nova import server_network_mixin
 from heat.engine.resources import scheduler_hints as sh
 from heat.engine.resources import stack_user
+from heat.engine import scheduler
 from heat.engine import support
 from heat.engine import translation
 from heat.rpc import api as rpc_api
@@ -585,6 +586,8 @@ class Server(stack_user.StackUser, sh.SchedulerHintsMixin,
 
     entity = 'servers'
 
+    poll_policy = scheduler.ExponentialBackoff()
+
     def translation_rules(self, props):
         rules = [
             translation.TranslationRule(
@@ -11,11 +11,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import functools
+import itertools
 import sys
 import types
 
 import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import encodeutils
 from oslo_utils import excutils
@@ -25,6 +28,7 @@ from heat.common.i18n import _
 from heat.common.i18n import _LI
 from heat.common.i18n import repr_wrapper
 from heat.common import timeutils
+from heat.engine import trace
 
 LOG = logging.getLogger(__name__)
 
@@ -117,6 +121,80 @@ class ExceptionGroup(Exception):
         return str([str(ex) for ex in self.exceptions])
 
 
+class PollingPolicy(object):
+    """Policy determining how often a task polls for completion.
+
+    Iterating over a policy yields the number of TaskRunner steps to wait
+    before each successive poll, which a task may in turn yield. The default
+    policy polls on every step.
+
+    If fast_path is True, the task checks for completion immediately after
+    starting an operation, so that operations that complete immediately do
+    not wait for a step.
+    """
+
+    fast_path = False
+
+    def __iter__(self):
+        return itertools.repeat(1)
+
+
+class ExponentialBackoff(PollingPolicy):
+    """Polling policy that backs off exponentially, with jitter.
+
+    The period between polls starts at initial steps and is multiplied by
+    factor after each poll, up to max_period steps (by default, the
+    max_poll_interval config option). Up to jitter times the period is added
+    at random, so that tasks started together do not poll in lockstep.
+    """
+
+    fast_path = True
+
+    def __init__(self, initial=1, factor=2, max_period=None, jitter=0.5):
+        self.initial = initial
+        self.factor = factor
+        self.max_period = max_period
+        self.jitter = jitter
+
+    def __iter__(self):
+        max_period = self.max_period or cfg.CONF.max_poll_interval
+        for attempt in itertools.count():
+            period = min(self.initial * self.factor ** attempt, max_period)
+            period = timeutils.retry_backoff_delay(0, period,
+                                                   period * self.jitter)
+            yield max(1, min(int(round(period)), max_period))
+
+
+class PollStats(object):
+    """Counts of the polls made by tasks, keyed by a name.
+
+    For each name, the number of tasks completed, the number of polls they
+    made and the total (wallclock) time the tasks took are recorded.
+    """
+
+    def __init__(self):
+        self._stats = collections.defaultdict(lambda: [0, 0, 0.0])
+
+    def record(self, name, polls, elapsed):
+        stats = self._stats[name]
+        stats[0] += 1
+        stats[1] += polls
+        stats[2] += elapsed
+
+    def get(self):
+        """Return a dict of the current statistics for each name."""
+        return dict((name, {'tasks': tasks, 'polls': polls,
+                            'elapsed': elapsed})
+                    for name, (tasks, polls, elapsed)
+                    in six.iteritems(self._stats))
+
+    def reset(self):
+        self._stats.clear()
+
+
+poll_stats = PollStats()
+
+
 @six.python_2_unicode_compatible
 class TaskRunner(object):
     """Wrapper for a resumable task (co-routine)."""
@@ -371,13 +449,40 @@ def wrappertask(task):
     return wrapper
 
 
+def critical_path_lengths(dependencies, reverse=False):
+    """Return the length of the longest chain of tasks blocked on each task.
+
+    The result is a dict mapping each key in the dependencies to the number
+    of tasks on the longest path through the tasks that (transitively) wait
+    for it, including the task itself. Starting the tasks with the longest
+    critical path first minimises the total time taken by a
+    DependencyTaskGroup whose concurrency is limited.
+    """
+    graph = dependencies.graph(reverse=reverse)
+    order = list(dependencies)
+    if not reverse:
+        order.reverse()
+
+    lengths = {}
+    for key in order:
+        lengths[key] = 1 + max([lengths[r] for r in
+                                graph[key].required_by()] or [0])
+    return lengths
+
+
+def _trace_name(key):
+    return getattr(key, 'name', six.text_type(key))
+
+
 @repr_wrapper
 class DependencyTaskGroup(object):
     """Task which manages group of subtasks that have ordering dependencies."""
 
     def __init__(self, dependencies, task=lambda o: o(),
                  reverse=False, name=None, error_wait_time=None,
-                 aggregate_exceptions=False):
+                 aggregate_exceptions=False, max_concurrency=None,
+                 concurrency_limits=None, bucket=None, priority=None,
+                 tracer=None):
         """Initialise with the task dependencies.
 
         A task to run on each dependency may optionally be specified.  If no
@@ -397,12 +502,46 @@ class DependencyTaskGroup(object):
         will not be cancelled in the event of an error (operations downstream
         of the error will be cancelled). Once all chains are complete, any
         errors will be rolled up into an ExceptionGroup exception.
+
+        If max_concurrency is specified, no more than that number of tasks
+        will be running at any one time. Finer-grained limits may be given in
+        concurrency_limits, a dict mapping a bucket name to the maximum number
+        of running tasks in that bucket; the bucket of each task is obtained
+        by calling bucket with the dependency key. Tasks that are ready but
+        would exceed a limit are started once a running task completes.
+
+        If a priority function is specified, it is called with the dependency
+        key and ready tasks are started in descending order of the result
+        (e.g. the lengths returned by critical_path_lengths()). Otherwise they
+        are started in dependency order.
+
+        If a tracer is specified, the time for which each task waits between
+        its dependencies completing and being started is recorded as a span,
+        along with the names of the dependencies.
         """
         self._keys = list(dependencies)
         self._runners = dict((o, TaskRunner(task, o)) for o in self._keys)
         self._graph = dependencies.graph(reverse=reverse)
         self.error_wait_time = error_wait_time
         self.aggregate_exceptions = aggregate_exceptions
+        self.max_concurrency = max_concurrency or None
+        self.concurrency_limits = dict((b, l) for b, l in
+                                       six.iteritems(concurrency_limits or {})
+                                       if l)
+        self._bucket = bucket if self.concurrency_limits else None
+        if priority is not None:
+            self._keys.sort(key=priority, reverse=True)
+
+        self._step_count = 0
+        self._step_total = 0.0
+        self._step_max = 0.0
+        self.task_times = dict.fromkeys(self._keys, 0.0)
+
+        self.tracer = tracer
+        if tracer is not None:
+            self._requires = dict((k, list(self._graph[k]))
+                                  for k in self._keys)
+            self._done_times = {}
 
         if name is None:
             name = '(%s) %s' % (getattr(task, '__name__',
@@ -420,13 +559,18 @@ class DependencyTaskGroup(object):
         raised_exceptions = []
         thrown_exceptions = []
 
+        self._started = timeutils.wallclock()
+
         try:
             while any(six.itervalues(self._runners)):
                 try:
+                    step_start = timeutils.wallclock()
                     for k, r in self._ready():
-                        r.start()
+                        self._trace_schedule(k)
+                        self._timed(k, r.start)
                         if not r:
-                            del self._graph[k]
+                            self._done(k)
+                    self._record_step(step_start)
 
                     if self._graph:
                         try:
@@ -435,9 +579,11 @@ class DependencyTaskGroup(object):
                             thrown_exceptions.append(sys.exc_info())
                             raise
 
+                    step_start = timeutils.wallclock()
                     for k, r in self._running():
-                        if r.step():
-                            del self._graph[k]
+                        if self._timed(k, r.step):
+                            self._done(k)
+                    self._record_step(step_start)
                 except Exception:
                     exc_info = None
                     try:
@@ -453,6 +599,10 @@ class DependencyTaskGroup(object):
                     with excutils.save_and_reraise_exception():
                         self.cancel_all()
 
+            LOG.debug('%(task)s finished: %(steps)d steps, %(total).3fs '
+                      'spent stepping, longest step %(max).3fs',
+                      dict(task=six.text_type(self), **self.step_stats()))
+
             if raised_exceptions:
                 if self.aggregate_exceptions:
                     raise ExceptionGroup(v for t, v, tb in raised_exceptions)
@@ -497,12 +647,86 @@ class DependencyTaskGroup(object):
         Ready subtasks are subtasks whose dependencies have all been satisfied,
         but which have not yet been started.
         """
+        if self.max_concurrency is None and self._bucket is None:
+            for k in self._keys:
+                if not self._graph.get(k, True):
+                    runner = self._runners[k]
+                    if runner and not runner.started():
+                        yield k, runner
+            return
+
+        running = 0
+        bucket_running = collections.defaultdict(int)
+        for k, r in self._running():
+            if r:
+                running += 1
+                if self._bucket is not None:
+                    bucket_running[self._bucket(k)] += 1
+
         for k in self._keys:
+            if (self.max_concurrency is not None and
+                    running >= self.max_concurrency):
+                return
             if not self._graph.get(k, True):
                 runner = self._runners[k]
                 if runner and not runner.started():
+                    b = None
+                    if self._bucket is not None:
+                        b = self._bucket(k)
+                        limit = self.concurrency_limits.get(b)
+                        if limit is not None and bucket_running[b] >= limit:
+                            continue
+
                     yield k, runner
 
+                    # Tasks that are not resumable complete on start and do
+                    # not occupy a slot.
+                    if runner:
+                        running += 1
+                        if b is not None:
+                            bucket_running[b] += 1
+
+    def _timed(self, key, func):
+        """Call func, adding the time taken to the total for the task."""
+        start = timeutils.wallclock()
+        try:
+            return func()
+        finally:
+            self.task_times[key] += timeutils.wallclock() - start
+
+    def _done(self, key):
+        """Remove a completed task from the graph."""
+        del self._graph[key]
+        if self.tracer is not None:
+            self._done_times[key] = timeutils.wallclock()
+
+    def _trace_schedule(self, key):
+        """Record how long a task has waited since it became ready."""
+        if self.tracer is None:
+            return
+        requires = self._requires[key]
+        ready = max([self._done_times.get(r, self._started)
+                     for r in requires] or [self._started])
+        self.tracer.record(trace.SCHEDULE, ready, timeutils.wallclock(),
+                           _trace_name(key),
+                           requires=[_trace_name(r) for r in requires])
+
+    def _record_step(self, start):
+        step_time = timeutils.wallclock() - start
+        self._step_count += 1
+        self._step_total += step_time
+        self._step_max = max(self._step_max, step_time)
+
+    def step_stats(self):
+        """Return a summary of the time spent starting and stepping tasks.
+
+        The time reported excludes time spent waiting between steps, so it
+        measures the cost of each scheduling pass.
+        """
+        return {'steps': self._step_count,
+                'total': self._step_total,
+                'max': self._step_max}
+
     def _running(self):
         """Iterate over all subtasks that are currently running.
 
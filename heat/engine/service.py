@@ -59,6 +59,7 @@ from heat.engine import stack as parser
 from heat.engine import stack_lock
 from heat.engine import support
 from heat.engine import template as templatem
+from heat.engine import trace
 from heat.engine import update
 from heat.engine import watchrule
 from heat.engine import worker
@@ -67,6 +68,7 @@ from heat.objects import resource as resource_objects
 from heat.objects import service as service_objects
 from heat.objects import snapshot as snapshot_object
 from heat.objects import stack as stack_object
+from heat.objects import stack_trace as stack_trace_object
 from heat.objects import watch_data
 from heat.objects import watch_rule
 from heat.rpc import api as rpc_api
@@ -303,7 +305,7 @@ class EngineService(service.Service):
     by the RPC caller.
     """
 
-    RPC_API_VERSION = '1.35'
+    RPC_API_VERSION = '1.39'
 
     def __init__(self, host, topic):
         super(EngineService, self).__init__()
@@ -397,6 +399,9 @@ class EngineService(service.Service):
             self.manage_thread_grp = threadgroup.ThreadGroup()
         self.manage_thread_grp.add_timer(cfg.CONF.periodic_interval,
                                          self.service_manage_report)
+        if stack_lock.lease_duration():
+            self.manage_thread_grp.add_timer(stack_lock.heartbeat_interval(),
+                                             self.renew_stack_lock_leases)
         self.manage_thread_grp.add_thread(self.reset_stack_status)
 
         super(EngineService, self).start()
@@ -443,6 +448,9 @@ class EngineService(service.Service):
                 # Stop threads gracefully
                 self.thread_group_mgr.stop(stack_id, True)
                 LOG.info(_LI("Stack %s processing was finished"), stack_id)
+
+        # Publish any software deployment metadata that is still waiting
+        service_software_config.flush_pending_pushes()
         if self.manage_thread_grp:
             self.manage_thread_grp.stop()
             ctxt = context.get_admin_context()
@@ -504,7 +512,8 @@ class EngineService(service.Service):
         return s
 
     @context.request_context
-    def show_stack(self, cnxt, stack_identity, resolve_outputs=True):
+    def show_stack(self, cnxt, stack_identity, resolve_outputs=True,
+                   live_outputs=False):
         """Return detailed information about one or all stacks.
 
         :param cnxt: RPC context.
@@ -512,6 +521,8 @@ class EngineService(service.Service):
             to show all
         :param resolve_outputs: If True, outputs for given stack/stacks will
             be resolved
+        :param live_outputs: If True, outputs are resolved even if values
+            stored with the stack are available
         """
         if stack_identity is not None:
             db_stack = self._get_stack(cnxt, stack_identity, show_deleted=True)
@@ -520,7 +531,8 @@ class EngineService(service.Service):
             stacks = parser.Stack.load_all(cnxt)
 
         return [api.format_stack(
-            stack, resolve_outputs=resolve_outputs) for stack in stacks]
+            stack, resolve_outputs=resolve_outputs,
+            live_outputs=live_outputs) for stack in stacks]
 
     def get_revision(self, cnxt):
         return cfg.CONF.revision['heat_revision']
@@ -530,7 +542,7 @@ class EngineService(service.Service):
                     sort_dir=None, filters=None, tenant_safe=True,
                     show_deleted=False, show_nested=False, show_hidden=False,
                     tags=None, tags_any=None, not_tags=None,
-                    not_tags_any=None):
+                    not_tags_any=None, fields=None):
         """Returns attributes of all stacks.
 
         It supports pagination (``limit`` and ``marker``),
@@ -556,6 +568,8 @@ class EngineService(service.Service):
             multiple tags using the boolean AND expression
         :param not_tags_any: show stacks not containing these tags, combine
             multiple tags using the boolean OR expression
+        :param fields: if set, a list of the stack keys to return; only the
+            database columns needed for these keys are loaded
         :returns: a list of formatted stacks
         """
         if filters is not None:
@@ -564,6 +578,31 @@ class EngineService(service.Service):
         if not tenant_safe:
             cnxt = context.get_admin_context()
 
+        if fields is not None:
+            unknown = set(fields) - set(api.STACK_SUMMARY_COLUMNS)
+            if unknown:
+                msg = (_('Unsupported fields: %s') %
+                       ', '.join(sorted(unknown)))
+                raise exception.Invalid(reason=msg)
+
+            stacks = stack_object.Stack.get_all_summary(
+                cnxt,
+                api.stack_summary_columns(fields),
+                limit=limit,
+                sort_keys=sort_keys,
+                marker=marker,
+                sort_dir=sort_dir,
+                filters=filters,
+                show_deleted=show_deleted,
+                show_nested=show_nested,
+                show_hidden=show_hidden,
+                tags=tags,
+                tags_any=tags_any,
+                not_tags=not_tags,
+                not_tags_any=not_tags_any)
+            return [api.format_stack_summary(stack, fields)
+                    for stack in stacks]
+
         stacks = stack_object.Stack.get_all(
             cnxt,
             limit=limit,
@@ -584,7 +623,7 @@ class EngineService(service.Service):
     def count_stacks(self, cnxt, filters=None, tenant_safe=True,
                      show_deleted=False, show_nested=False, show_hidden=False,
                      tags=None, tags_any=None, not_tags=None,
-                     not_tags_any=None):
+                     not_tags_any=None, approximate=False):
         """Return the number of stacks that match the given filters.
 
         :param cnxt: RPC context.
@@ -602,6 +641,8 @@ class EngineService(service.Service):
             multiple tags using the boolean AND expression
         :param not_tags_any: count stacks not containing these tags, combine
             multiple tags using the boolean OR expression
+        :param approximate: if true, stop counting at the configured
+            approximate_stack_count_limit
         :returns: an integer representing the number of matched stacks
         """
         if not tenant_safe:
@@ -616,7 +657,8 @@ class EngineService(service.Service):
             tags=tags,
             tags_any=tags_any,
             not_tags=not_tags,
-            not_tags_any=not_tags_any)
+            not_tags_any=not_tags_any,
+            approximate=approximate)
 
     def _validate_deferred_auth_context(self, cnxt, stack):
         if cfg.CONF.deferred_auth_method != 'password':
@@ -1324,12 +1366,15 @@ class EngineService(service.Service):
         return api.format_stack_outputs(stack.outputs)
 
     @context.request_context
-    def show_output(self, cntx, stack_identity, output_key):
+    def show_output(self, cntx, stack_identity, output_key,
+                    live_outputs=False):
         """Returns dict with specified output key, value and description.
 
         :param cntx: RPC context.
         :param stack_identity: Name of the stack you want to see.
         :param output_key: key of desired stack output.
+        :param live_outputs: If True, the output is resolved even if a value
+            stored with the stack is available.
         :return: dict with output key, value and description in defined format.
         """
         s = self._get_stack(cntx, stack_identity)
@@ -1341,7 +1386,29 @@ class EngineService(service.Service):
             raise exception.NotFound(_('Specified output key %s not '
                                        'found.') % output_key)
 
-        return api.format_stack_output(outputs[output_key])
+        return api.format_stack_output(
+            outputs[output_key],
+            resolved=stack.resolved_output(output_key, live=live_outputs))
+
+    @context.request_context
+    def get_stack_trace(self, cnxt, stack_identity):
+        """Return the timeline of the latest traced operation on a stack.
+
+        Traces are only recorded when the enable_stack_tracing option is set.
+
+        :param cnxt: RPC context.
+        :param stack_identity: Name of the stack you want to see.
+        :return: dict with the operation ID and action, the start time and
+            duration of the operation and its critical path.
+        """
+        s = self._get_stack(cnxt, stack_identity, show_deleted=True)
+        traces = stack_trace_object.StackTrace.get_all_by_stack(cnxt, s.id)
+        spans = list(itertools.chain.from_iterable(t.spans or []
+                                                   for t in traces))
+        result = trace.critical_path(spans)
+        result['operation'] = traces[0].operation if traces else None
+        result['action'] = traces[0].action if traces else None
+        return result
 
     def _remote_call(self, cnxt, lock_engine_id, timeout, call, **kwargs):
         self.cctxt = self._client.prepare(
@@ -1673,7 +1740,7 @@ class EngineService(service.Service):
     @context.request_context
     def list_events(self, cnxt, stack_identity, filters=None, limit=None,
                     marker=None, sort_keys=None, sort_dir=None,
-                    nested_depth=None):
+                    nested_depth=None, tail=False):
         """Lists all events associated with a given stack.
 
         It supports pagination (``limit`` and ``marker``),
@@ -1688,14 +1755,41 @@ class EngineService(service.Service):
         :param sort_keys: an array of fields used to sort the list
         :param sort_dir: the direction of the sort ('asc' or 'desc').
         :param nested_depth: Levels of nested stacks to list events for.
+        :param tail: List only the events that were created after the marker,
+                     oldest first.
         """
+        if tail:
+            # Events are listed in creation order, i.e. by ascending ID, so
+            # that the marker can be used as a cursor by clients that poll.
+            sort_keys = None
+            sort_dir = 'asc'
 
         stack_identifiers = None
         root_stack_identifier = None
         if stack_identity:
             st = self._get_stack(cnxt, stack_identity, show_deleted=True)
 
-            if nested_depth:
+            if nested_depth and st.owner_id is None:
+                root_stack_identifier = st.identifier()
+                events = list(event_object.Event.get_all_by_root_stack(
+                    cnxt,
+                    st.id,
+                    limit=limit,
+                    marker=marker,
+                    sort_keys=sort_keys,
+                    sort_dir=sort_dir,
+                    filters=filters,
+                    nested_depth=nested_depth))
+
+                # only look up the stacks that appear in this page of events
+                stack_ids = {e.stack_id for e in events} - {st.id}
+                stacks = stack_object.Stack.get_all(
+                    cnxt, filters={'id': stack_ids},
+                    show_nested=True) if stack_ids else []
+                stack_identifiers = {s.id: s.identifier() for s in stacks}
+                stack_identifiers[st.id] = root_stack_identifier
+
+            elif nested_depth:
                 root_stack_identifier = st.identifier()
                 # find all resources associated with a root stack
                 all_r = resource_objects.Resource.get_all_by_root_stack(
@@ -1731,7 +1825,8 @@ class EngineService(service.Service):
                     marker=marker,
                     sort_keys=sort_keys,
                     sort_dir=sort_dir,
-                    filters=filters))
+                    filters=filters,
+                    keyset=tail))
                 stack_identifiers = {st.id: st.identifier()}
         else:
             events = list(event_object.Event.get_all_by_tenant(
@@ -2337,6 +2432,15 @@ class EngineService(service.Service):
                           'failed: %(error)s'),
                       {'service_id': self.service_id, 'error': ex})
 
+    def renew_stack_lock_leases(self):
+        cnxt = context.get_admin_context()
+        try:
+            stack_lock.renew_leases(cnxt, self.engine_id)
+        except Exception as ex:
+            LOG.error(_LE('Renewing the stack lock leases of engine '
+                          '%(engine)s failed: %(error)s'),
+                      {'engine': self.engine_id, 'error': ex})
+
     def service_manage_cleanup(self):
         cnxt = context.get_admin_context()
         last_updated_window = (3 * cfg.CONF.periodic_interval)
@@ -11,20 +11,24 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import bisect
 import uuid
 
+import eventlet
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_service import service
 from oslo_utils import timeutils
-import requests
 import six
 from six.moves.urllib import parse as urlparse
 
 from heat.common import crypt
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common.i18n import _LE
 from heat.common.i18n import _LI
+from heat.common import urlfetch
 from heat.db import api as db_api
 from heat.engine import api
 from heat.engine import scheduler
@@ -36,6 +40,93 @@ from heat.rpc import api as rpc_api
 
 LOG = logging.getLogger(__name__)
 
+cfg.CONF.import_opt('deployment_metadata_publish_delay', 'heat.common.config')
+
+# The latest metadata push waiting to be published for each server
+_pending_pushes = {}
+# Servers for which a publisher greenthread is running
+_publishing = set()
+
+
+def _publish(server_id, push):
+    """Publish the metadata of a server in the background.
+
+    The push is a callable that publishes the metadata. If a push for the
+    same server is still waiting, it is replaced, so that a burst of changes
+    to the deployments of a server results in a single push of the latest
+    metadata.
+    """
+    _pending_pushes[server_id] = push
+    if server_id not in _publishing:
+        _publishing.add(server_id)
+        eventlet.spawn_n(_publisher, server_id)
+
+
+def _push(server_id, push):
+    try:
+        push()
+    except Exception:
+        LOG.exception(_LE('Failed to publish the metadata of server %s'),
+                      server_id)
+
+
+def _publisher(server_id):
+    try:
+        while True:
+            delay = cfg.CONF.deployment_metadata_publish_delay
+            if delay:
+                eventlet.sleep(delay)
+            push = _pending_pushes.pop(server_id, None)
+            if push is None:
+                break
+            _push(server_id, push)
+    finally:
+        _publishing.discard(server_id)
+
+
+def flush_pending_pushes():
+    """Publish all of the metadata still waiting to be published.
+
+    This is called when the engine stops, so that no change is lost.
+    """
+    while _pending_pushes:
+        _push(*_pending_pushes.popitem())
+
+
+def _config_sort_key(config):
+    return config.get(rpc_api.SOFTWARE_CONFIG_NAME) or ''
+
+
+def update_deployments_metadata(deployments, removed_config_id=None,
+                                added_config=None):
+    """Apply a change to a single deployment to the metadata of a server.
+
+    The metadata is the list of formatted configs of the deployments of the
+    server, sorted by config name. The config of the deployment before the
+    change (if any) is removed from it, and the config after the change (if
+    any) is inserted in order. If the added config is already in the list,
+    e.g. because a concurrent change rebuilt the metadata from the database,
+    it replaces that entry instead of being added twice.
+
+    :returns: the new list, or None if the removed config is not in it
+    """
+    def remove(config_id):
+        for index, config in enumerate(deployments):
+            if config[rpc_api.SOFTWARE_CONFIG_ID] == config_id:
+                del deployments[index]
+                return True
+        return False
+
+    deployments = list(deployments)
+    if removed_config_id is not None and not remove(removed_config_id):
+        return None
+    if added_config is not None:
+        remove(added_config[rpc_api.SOFTWARE_CONFIG_ID])
+        keys = [_config_sort_key(c) for c in deployments]
+        index = bisect.bisect_right(keys, _config_sort_key(added_config))
+        deployments.insert(index, added_config)
+    return deployments
+
 
 class SoftwareConfigService(service.Service):
 
@@ -97,12 +188,27 @@ class SoftwareConfigService(service.Service):
 
     @resource_objects.retry_on_conflict
     def _push_metadata_software_deployments(
-            self, cnxt, server_id, stack_user_project_id):
+            self, cnxt, server_id, stack_user_project_id,
+            removed_config_id=None, added_config=None):
+        """Update the metadata of a server after a deployment changed.
+
+        When the config of the changed deployment before and after the change
+        is passed, the change is applied to the existing metadata of the
+        server; otherwise the metadata is rebuilt from all of its deployments.
+        The metadata is then published to Swift and/or Zaqar in the
+        background.
+        """
         rs = db_api.resource_get_by_physical_resource_id(cnxt, server_id)
         if not rs:
             return
-        deployments = self.metadata_software_deployments(cnxt, server_id)
-        md = rs.rsrc_metadata or {}
+        md = dict(rs.rsrc_metadata or {})
+        deployments = None
+        if (removed_config_id is not None or added_config is not None) and (
+                'deployments' in md):
+            deployments = update_deployments_metadata(
+                md['deployments'], removed_config_id, added_config)
+        if deployments is None:
+            deployments = self.metadata_software_deployments(cnxt, server_id)
         md['deployments'] = deployments
         rows_updated = db_api.resource_update(
             cnxt, rs.id, {'rsrc_metadata': md}, rs.atomic_key)
@@ -117,14 +223,21 @@ class SoftwareConfigService(service.Service):
                 metadata_put_url = rd.value
             if rd.key == 'metadata_queue_id':
                 metadata_queue_id = rd.value
-        if metadata_put_url:
-            json_md = jsonutils.dumps(md)
-            requests.put(metadata_put_url, json_md)
-        if metadata_queue_id:
-            project = stack_user_project_id
-            queue = self._get_zaqar_queue(cnxt, rs, project, metadata_queue_id)
-            zaqar_plugin = cnxt.clients.client_plugin('zaqar')
-            queue.post({'body': md, 'ttl': zaqar_plugin.DEFAULT_TTL})
+        if not (metadata_put_url or metadata_queue_id):
+            return
+
+        def push():
+            if metadata_put_url:
+                json_md = jsonutils.dumps(md)
+                urlfetch.get_session().put(metadata_put_url, json_md)
+            if metadata_queue_id:
+                project = stack_user_project_id
+                queue = self._get_zaqar_queue(cnxt, rs, project,
+                                              metadata_queue_id)
+                zaqar_plugin = cnxt.clients.client_plugin('zaqar')
+                queue.post({'body': md, 'ttl': zaqar_plugin.DEFAULT_TTL})
+
+        _publish(server_id, push)
 
     def _refresh_swift_software_deployment(self, cnxt, sd, deploy_signal_id):
         container, object_name = urlparse.urlparse(
@@ -257,7 +370,8 @@ class SoftwareConfigService(service.Service):
             'status': status,
             'status_reason': status_reason})
         self._push_metadata_software_deployments(
-            cnxt, server_id, stack_user_project_id)
+            cnxt, server_id, stack_user_project_id,
+            added_config=api.format_software_config(sd.config))
         return api.format_software_deployment(sd)
 
     def signal_software_deployment(self, cnxt, deployment_id, details,
@@ -343,6 +457,10 @@ class SoftwareConfigService(service.Service):
         else:
             update_data['updated_at'] = timeutils.utcnow()
 
+        if config_id:
+            prev_sd = software_deployment_object.SoftwareDeployment.get_by_id(
+                cnxt, deployment_id)
+
         sd = software_deployment_object.SoftwareDeployment.update_by_id(
             cnxt, deployment_id, update_data)
 
@@ -350,7 +468,9 @@ class SoftwareConfigService(service.Service):
         # changing, since metadata is just a list of configs
         if config_id:
             self._push_metadata_software_deployments(
-                cnxt, sd.server_id, sd.stack_user_project_id)
+                cnxt, sd.server_id, sd.stack_user_project_id,
+                removed_config_id=prev_sd.config_id,
+                added_config=api.format_software_config(sd.config))
 
         return api.format_software_deployment(sd)
 
@@ -360,4 +480,5 @@ class SoftwareConfigService(service.Service):
         software_deployment_object.SoftwareDeployment.delete(
             cnxt, deployment_id)
         self._push_metadata_software_deployments(
-            cnxt, sd.server_id, sd.stack_user_project_id)
+            cnxt, sd.server_id, sd.stack_user_project_id,
+            removed_config_id=sd.config_id)
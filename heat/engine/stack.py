@@ -12,12 +12,14 @@
 #    under the License.
 
 import collections
+import contextlib
 import copy
 import datetime
 import eventlet
 import functools
 import itertools
 import re
+import sys
 import warnings
 
 from oslo_config import cfg
@@ -49,6 +51,7 @@ from heat.engine import resources
 from heat.engine import scheduler
 from heat.engine import sync_point
 from heat.engine import template as tmpl
+from heat.engine import trace
 from heat.engine import update
 from heat.objects import raw_template as raw_template_object
 from heat.objects import resource as resource_objects
@@ -167,11 +170,15 @@ class Stack(collections.Mapping):
         self.disable_rollback = disable_rollback
         self.parent_resource_name = parent_resource
         self._parent_stack = None
+        self._root_stack_id = None
         self._outputs = None
         self._resources = None
+        self._resource_defns = {}
         self._dependencies = None
         self._access_allowed_handlers = {}
         self._db_resources = None
+        self._resource_update_batch = None
+        self._event_buffer = None
         self._tags = tags
         self.adopt_stack_data = adopt_stack_data
         self.stack_user_project_id = stack_user_project_id
@@ -188,6 +195,7 @@ class Stack(collections.Mapping):
         self.cache_data = cache_data
         self._worker_client = None
         self._convg_deps = None
+        self._tracer = None
         self.thread_group_mgr = None
 
         # strict_validate can be used to disable value validation
@@ -247,6 +255,27 @@ class Stack(collections.Mapping):
             self._worker_client = rpc_worker_client.WorkerClient()
         return self._worker_client
 
+    @property
+    def tracer(self):
+        """Return the tracer recording the current operation on the stack.
+
+        Spans are only recorded if the enable_stack_tracing option is set.
+        The operation is identified by the traversal ID in the convergence
+        engine, so that the spans recorded by each worker are stored
+        together.
+        """
+        if self._tracer is None:
+            if not cfg.CONF.enable_stack_tracing or self.id is None:
+                return trace.NULL_TRACER
+            operation = self.current_traversal if self.convergence else None
+            self._tracer = trace.Tracer(self.id, self.action, operation)
+        return self._tracer
+
+    def store_trace(self):
+        """Store the spans recorded so far in the current operation."""
+        if self._tracer is not None:
+            self._tracer.store(self.context)
+
     @property
     def env(self):
         """This is a helper to allow resources to access stack.env."""
@@ -299,10 +328,95 @@ class Stack(collections.Mapping):
             self._outputs = self.t.outputs(self)
         return self._outputs
 
+    def _output_cache_enabled(self):
+        return (cfg.CONF.cache_stack_outputs and self.id is not None and
+                self.status != self.IN_PROGRESS and
+                self.action != self.DELETE)
+
+    def _get_output_cache(self):
+        if not self._output_cache_enabled():
+            return None
+        cached = stack_object.Stack.get_output_cache(self.context, self.id)
+        if cached is None or set(cached) != set(self.outputs):
+            return None
+        return cached
+
+    @staticmethod
+    def _resolve_output(output):
+        try:
+            return {rpc_api.OUTPUT_VALUE: output.get_value()}
+        except Exception as ex:
+            return {rpc_api.OUTPUT_VALUE: None,
+                    rpc_api.OUTPUT_ERROR: six.text_type(ex)}
+
+    def resolved_outputs(self, live=False):
+        """Return the resolved value of each output, keyed by output name.
+
+        Each value is a dict containing the output_value and, if the output
+        could not be resolved, the output_error. Unless live is True, the
+        values stored with the stack are returned if there have been no
+        changes to the stack or its resources since they were resolved.
+        """
+        if not live:
+            cached = self._get_output_cache()
+            if cached is not None:
+                return cached
+
+        return dict((key, self._resolve_output(output))
+                    for key, output in six.iteritems(self.outputs))
+
+    def store_outputs(self):
+        """Resolve the outputs and store their values with the stack.
+
+        This is done only when a stack action completes. A read could
+        overwrite a change to a resource that invalidated the stored values
+        while it was resolving them, so reads never store them.
+        """
+        if self._output_cache_enabled():
+            stack_object.Stack.set_output_cache(
+                self.context, self.id, self.resolved_outputs(live=True))
+
+    def resolved_output(self, key, live=False):
+        """Return the resolved value of a single output.
+
+        The result is as for the values returned by resolved_outputs().
+        """
+        if not live:
+            cached = self._get_output_cache()
+            if cached is not None:
+                return cached[key]
+
+        return self._resolve_output(self.outputs[key])
+
+    def invalidate_output_cache(self):
+        """Discard the output values stored with the stack and its parents."""
+        if self.id is not None:
+            stack_object.Stack.invalidate_output_cache(self.context, self.id)
+
+    def _resource_definitions(self, template):
+        """Return the resource definitions of a template for this stack.
+
+        The definitions are cached per template ID, and recalculated if the
+        Template object or the stack parameters change.
+        """
+        cached = self._resource_defns.get(template.id)
+        if (cached is not None and cached[0] is template and
+                cached[1] is self.parameters):
+            return cached[2]
+
+        res_defns = template.resource_definitions(self)
+        self._resource_defns[template.id] = (template, self.parameters,
+                                             res_defns)
+        return res_defns
+
+    def reset_resource_definitions(self):
+        """Discard cached resource definitions after a template change."""
+        self._resource_defns = {}
+
     @property
     def resources(self):
         if self._resources is None:
-            res_defns = self.t.resource_definitions(self)
+            res_defns = self._resource_definitions(self.t)
 
             self._resources = dict((name,
                                     resource.Resource(name, data, self))
@@ -311,14 +425,13 @@ class Stack(collections.Mapping):
         return self._resources
 
     def _find_filtered_resources(self, filters):
-        template_cache = {self.t.id: self.t}
         if filters:
             resources = resource_objects.Resource.get_all_by_stack(
                 self.context, self.id, filters)
         else:
             resources = self._db_resources_get()
         for rsc in six.itervalues(resources):
-            yield self._resource_from_db_resource(rsc, template_cache)
+            yield self._resource_from_db_resource(rsc)
 
     def iter_resources(self, nested_depth=0, filters=None):
         """Iterates over all the resources in a stack.
@@ -358,18 +471,16 @@ class Stack(collections.Mapping):
             self._db_resources = _db_resources
         return self._db_resources
 
-    def _resource_from_db_resource(self, db_res, template_cache=None):
+    def _resource_from_db_resource(self, db_res):
         tid = db_res.current_template_id
         if tid is None or tid == self.t.id:
             t = self.t
-        elif template_cache and tid in template_cache:
-            t = template_cache[tid]
+        elif tid in self._resource_defns:
+            t = self._resource_defns[tid][0]
         else:
             t = tmpl.Template.load(self.context, tid)
-            if template_cache:
-                template_cache[tid] = t
 
-        res_defn = t.resource_definitions(self)[db_res.name]
+        res_defn = self._resource_definitions(t)[db_res.name]
         return resource.Resource(db_res.name, res_defn, self)
 
     def resource_get(self, name):
@@ -399,7 +510,10 @@ class Stack(collections.Mapping):
     def root_stack_id(self):
         if not self.owner_id:
             return self.id
-        return stack_object.Stack.get_root_id(self.context, self.owner_id)
+        if self._root_stack_id is None:
+            self._root_stack_id = stack_object.Stack.get_root_id(
+                self.context, self.owner_id)
+        return self._root_stack_id
 
     def object_path_in_stack(self):
         """Return stack resources and stacks in path from the root stack.
@@ -540,8 +654,13 @@ class Stack(collections.Mapping):
     def _from_db(cls, context, stack,
                  use_stored_context=False, cache_data=None,
                  service_check_defer=False, resource_validate=True):
+        if stack.obj_attr_is_set('raw_template'):
+            raw_template = stack.raw_template
+        else:
+            raw_template = None
         template = tmpl.Template.load(
-            context, stack.raw_template_id, stack.raw_template)
+            context, stack.raw_template_id, raw_template,
+            cache=bool(stack.convergence))
         return cls(context, stack.name, template,
                    stack_id=stack.id,
                    action=stack.action, status=stack.status,
@@ -696,6 +815,7 @@ class Stack(collections.Mapping):
         resource.reparse()
         self.resources[resource.name] = resource
         self.t.add_resource(definition)
+        self.reset_resource_definitions()
         if self.t.id is not None:
             self.t.store(self.context)
         if resource.action == resource.INIT:
@@ -705,6 +825,7 @@ class Stack(collections.Mapping):
         """Remove the resource with the specified name."""
         del self.resources[resource_name]
         self.t.remove_resource(resource_name)
+        self.reset_resource_definitions()
         if self.t.id is not None:
             self.t.store(self.context)
 
@@ -862,9 +983,16 @@ class Stack(collections.Mapping):
                          self.id, {},
                          self.name, 'OS::Heat::Stack')
 
-        ev.store()
+        self.store_event(ev)
         self.dispatch_event(ev)
 
+    def store_event(self, ev):
+        """Store an event, buffering it if writes are being batched."""
+        if self._event_buffer is not None:
+            self._event_buffer.add(ev)
+        else:
+            ev.store()
+
     def dispatch_event(self, ev):
         def _dispatch(ctx, sinks, ev):
             try:
@@ -891,6 +1019,12 @@ class Stack(collections.Mapping):
         self.status = status
         self.status_reason = reason
 
+        # Each state change ends an operation or starts a new one
+        self.store_trace()
+        if status == self.IN_PROGRESS:
+            self._tracer = None
+            self.invalidate_output_cache()
+
         if self.convergence and action in (
                 self.UPDATE, self.DELETE, self.CREATE,
                 self.ADOPT, self.ROLLBACK):
@@ -982,6 +1116,70 @@ class Stack(collections.Mapping):
             if r.action == r.INIT:
                 r._store()
 
+    @property
+    def resource_update_batch(self):
+        """The batch collecting updates to resources, if one is active."""
+        return self._resource_update_batch
+
+    @contextlib.contextmanager
+    def batch_writes(self):
+        """Context manager to write resource updates and events in batches.
+
+        While it is active, resource state updates and events are held back
+        until flush_writes() is called and are then written together. Any
+        pending writes are done when the context exits.
+        """
+        if self._resource_update_batch is not None:
+            yield
+            return
+
+        self._resource_update_batch = resource_objects.ResourceUpdateBatch(
+            self.context)
+        self._event_buffer = event.EventBuffer(self.context, self.id)
+        try:
+            yield
+        finally:
+            self.flush_writes()
+            self._resource_update_batch = None
+            self._event_buffer = None
+
+    def flush_writes(self):
+        """Write any pending batched resource updates and events."""
+        self.flush_resource_updates()
+        if self._event_buffer is not None:
+            try:
+                self._event_buffer.flush()
+            except Exception as ex:
+                LOG.error(_LE('DB error %s'), ex)
+
+    def flush_resource_updates(self):
+        """Write any pending batched resource updates to the database."""
+        if not self._resource_update_batch:
+            return
+        try:
+            with self.tracer.span(trace.DB_WRITE):
+                self._resource_update_batch.flush()
+        except Exception as ex:
+            LOG.error(_LE('DB error %s'), ex)
+
+    def _flush_writes_each_step(self, subtask):
+        """Run a task, doing any batched writes after each step."""
+        try:
+            step = next(subtask)
+            while True:
+                self.flush_writes()
+                try:
+                    yield step
+                except GeneratorExit:
+                    subtask.close()
+                    raise
+                except:  # noqa
+                    step = subtask.throw(*sys.exc_info())
+                else:
+                    step = next(subtask)
+        except StopIteration:
+            return
+
     @profiler.trace('Stack.create', hide_args=False)
     @reset_state_on_error
     def create(self, msg_queue=None):
@@ -1007,6 +1205,35 @@ class Stack(collections.Mapping):
 
         return {'resource_data': data['resources'].get(resource.name)}
 
+    @staticmethod
+    def concurrency_options(deps, reverse=False):
+        """Return the DependencyTaskGroup options limiting concurrency.
+
+        The limits come from the max_concurrent_resource_actions and
+        resource_type_concurrency_limits config options. When any limit is
+        set, resources on the longest dependency chain are started first.
+        """
+        type_limits = {}
+        for res_type, limit in six.iteritems(
+                cfg.CONF.resource_type_concurrency_limits):
+            try:
+                type_limits[res_type] = int(limit)
+            except ValueError:
+                LOG.warning(_LW('Ignoring invalid concurrency limit '
+                                '"%(limit)s" for resource type %(type)s'),
+                            {'limit': limit, 'type': res_type})
+
+        max_concurrency = cfg.CONF.max_concurrent_resource_actions
+        if not max_concurrency and not any(six.itervalues(type_limits)):
+            return {}
+
+        return {
+            'max_concurrency': max_concurrency,
+            'concurrency_limits': type_limits,
+            'bucket': lambda res: res.type(),
+            'priority': scheduler.critical_path_lengths(deps, reverse).get,
+        }
+
     @scheduler.wrappertask
     def stack_task(self, action, reverse=False, post_func=None,
                    aggregate_exceptions=False, pre_completion_func=None):
@@ -1062,10 +1289,13 @@ class Stack(collections.Mapping):
             resource_action,
             reverse,
             error_wait_time=get_error_wait_time,
-            aggregate_exceptions=aggregate_exceptions)
+            aggregate_exceptions=aggregate_exceptions,
+            tracer=self.tracer,
+            **self.concurrency_options(self.dependencies, reverse))
 
         try:
-            yield action_task()
+            with self.batch_writes():
+                yield self._flush_writes_each_step(action_task())
         except scheduler.Timeout:
             stack_status = self.FAILED
             reason = '%s timed out' % action.title()
@@ -1082,6 +1312,8 @@ class Stack(collections.Mapping):
             pre_completion_func(self, action, stack_status, reason)
 
         self.state_set(action, stack_status, reason)
+        if stack_status == self.COMPLETE:
+            self.store_outputs()
 
         if callable(post_func):
             post_func()
@@ -1335,6 +1567,8 @@ class Stack(collections.Mapping):
         curr_name_translated_dep = self.dependencies.translate(lambda res:
                                                                res.name)
         rsrcs = {}
+        needed_by_updates = resource_objects.ResourceUpdateBatch(
+            self.context)
 
         def update_needed_by(res):
             new_requirers = set(
@@ -1354,21 +1588,31 @@ class Stack(collections.Mapping):
                 rsrcs[rsrc.name] = rsrc
             else:
                 update_needed_by(existing_rsrc_db)
-                resource.Resource.set_needed_by(
-                    existing_rsrc_db, existing_rsrc_db.needed_by
-                )
+                needed_by_updates.add_select_and_update(
+                    existing_rsrc_db.id,
+                    {'needed_by': existing_rsrc_db.needed_by},
+                    atomic_key=existing_rsrc_db.atomic_key)
                 rsrcs[existing_rsrc_db.name] = existing_rsrc_db
+        needed_by_updates.flush()
         return rsrcs
 
     def set_resource_deps(self):
         curr_name_translated_dep = self.dependencies.translate(lambda res:
                                                                res.id)
         ext_rsrcs_db = self.db_active_resources_get()
+        needed_by_updates = resource_objects.ResourceUpdateBatch(self.context)
+        requires_updates = resource_objects.ResourceUpdateBatch(self.context)
         for r in self.dependencies:
             r.needed_by = list(curr_name_translated_dep.required_by(r.id))
             r.requires = list(curr_name_translated_dep.requires(r.id))
-            resource.Resource.set_needed_by(ext_rsrcs_db[r.id], r.needed_by)
-            resource.Resource.set_requires(ext_rsrcs_db[r.id], r.requires)
+            db_rsrc = ext_rsrcs_db[r.id]
+            if db_rsrc:
+                needed_by_updates.add_select_and_update(
+                    db_rsrc.id, {'needed_by': r.needed_by},
+                    atomic_key=db_rsrc.atomic_key)
+                requires_updates.add(db_rsrc.id, {'requires': r.requires})
+        needed_by_updates.flush()
+        requires_updates.flush()
 
     def _compute_convg_dependencies(self, existing_resources,
                                     current_template_deps, current_resources):
@@ -1523,6 +1767,8 @@ class Stack(collections.Mapping):
                 backup_stack.t.merge_snippets(newstack.t)
                 backup_stack.t.store(self.context)
             self.store()
+            if self.status == self.COMPLETE:
+                self.store_outputs()
 
             if previous_template_id is not None:
                 raw_template_object.RawTemplate.delete(self.context,
@@ -1745,7 +1991,8 @@ class Stack(collections.Mapping):
 
         action_task = scheduler.DependencyTaskGroup(self.dependencies,
                                                     resource.Resource.destroy,
-                                                    reverse=True)
+                                                    reverse=True,
+                                                    tracer=self.tracer)
         try:
             scheduler.TaskRunner(action_task)(timeout=self.timeout_secs())
         except exception.ResourceFailure as ex:
@@ -2006,6 +2253,7 @@ class Stack(collections.Mapping):
             return
 
         self.purge_db()
+        self.store_outputs()
 
     def purge_db(self):
         """Cleanup database after stack has completed/failed.
@@ -13,6 +13,7 @@
 
 import contextlib
 
+from oslo_config import cfg
 from oslo_log import log as logging
 from oslo_utils import excutils
 
@@ -27,6 +28,30 @@ from heat.objects import stack_lock as stack_lock_object
 LOG = logging.getLogger(__name__)
 
 
+def lease_duration():
+    """Return the duration of stack lock leases, or 0 if they are disabled."""
+    return max(cfg.CONF.stack_lock_lease_duration, 0)
+
+
+def heartbeat_interval():
+    """Return the number of seconds between renewals of lock leases."""
+    return max(lease_duration() // 3, 1)
+
+
+def renew_leases(context, engine_id):
+    """Renew the leases of all of the stack locks held by an engine.
+
+    This is done in a single database update, however many locks the engine
+    holds. The new expiry time is taken from the database's clock.
+    """
+    if not lease_duration():
+        return
+    count = stack_lock_object.StackLock.renew(context, engine_id,
+                                              lease_duration())
+    LOG.debug("Engine %(engine)s renewed the lease on %(count)s stack "
+              "locks" % {'engine': engine_id, 'count': count})
+
+
 class StackLock(object):
     def __init__(self, context, stack_id, engine_id):
         self.context = context
@@ -42,6 +67,27 @@ class StackLock(object):
         return stack_lock_object.StackLock.get_engine_id(self.context,
                                                          self.stack_id)
 
+    def _lease_args(self):
+        if not lease_duration():
+            return {}
+        return {'lease_duration': lease_duration()}
+
+    def _is_stale(self, lock_engine_id):
+        """Return True if the lock held by another engine is stale.
+
+        A leased lock is stale once its lease has expired by the database's
+        clock. The engine holding a lock without a lease is checked for
+        liveness over RPC.
+        """
+        if lock_engine_id == self.engine_id:
+            return False
+        if lease_duration():
+            expired = stack_lock_object.StackLock.lease_expired(
+                self.context, self.stack_id)
+            if expired is not None:
+                return expired
+        return not service_utils.engine_alive(self.context, lock_engine_id)
+
     def try_acquire(self):
         """Try to acquire a stack lock.
 
@@ -49,7 +95,8 @@ class StackLock(object):
         """
         return stack_lock_object.StackLock.create(self.context,
                                                   self.stack_id,
-                                                  self.engine_id)
+                                                  self.engine_id,
+                                                  **self._lease_args())
 
     def acquire(self, retry=True):
         """Acquire a lock on the stack.
@@ -57,9 +104,9 @@ class StackLock(object):
         :param retry: When True, retry if lock was released while stealing.
         :type retry: boolean
         """
-        lock_engine_id = stack_lock_object.StackLock.create(self.context,
-                                                            self.stack_id,
-                                                            self.engine_id)
+        lock_engine_id = stack_lock_object.StackLock.create(
+            self.context, self.stack_id, self.engine_id,
+            **self._lease_args())
         if lock_engine_id is None:
             LOG.debug("Engine %(engine)s acquired lock on stack "
                       "%(stack)s" % {'engine': self.engine_id,
@@ -69,8 +116,7 @@ class StackLock(object):
         stack = stack_object.Stack.get_by_id(self.context, self.stack_id,
                                              show_deleted=True,
                                              eager_load=False)
-        if (lock_engine_id == self.engine_id or
-                service_utils.engine_alive(self.context, lock_engine_id)):
+        if not self._is_stale(lock_engine_id):
             LOG.debug("Lock on stack %(stack)s is owned by engine "
                       "%(engine)s" % {'stack': self.stack_id,
                                       'engine': lock_engine_id})
@@ -84,7 +130,8 @@ class StackLock(object):
             result = stack_lock_object.StackLock.steal(self.context,
                                                        self.stack_id,
                                                        lock_engine_id,
-                                                       self.engine_id)
+                                                       self.engine_id,
+                                                       **self._lease_args())
 
             if result is None:
                 LOG.info(_LI("Engine %(engine)s successfully stole the lock "
@@ -99,6 +146,12 @@ class StackLock(object):
                                  "Trying again"), {'stack': self.stack_id,
                                                    'engine': self.engine_id})
                     return self.acquire(retry=False)
+            elif result == lock_engine_id:
+                LOG.info(_LI("Failed to steal lock on stack %(stack)s. "
+                             "Engine %(engine)s renewed its lease on the "
+                             "lock"),
+                         {'stack': self.stack_id,
+                          'engine': lock_engine_id})
             else:
                 new_lock_engine_id = result
                 LOG.info(_LI("Failed to steal lock on stack %(stack)s. "
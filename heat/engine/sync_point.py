@@ -13,10 +13,12 @@
 # limitations under the License.
 
 import ast
+import collections
 import eventlet
 import random
 import six
 
+from oslo_config import cfg
 from oslo_log import log as logging
 
 from heat.common import exception
@@ -116,8 +118,48 @@ def serialize_input_data(input_data):
     return {'input_data': _serialize(input_data)}
 
 
-def sync(cnxt, entity_id, current_traversal, is_update, propagate,
-         predecessors, new_data):
+class _PendingSync(object):
+    """Predecessor notifications waiting to be written to a sync point."""
+
+    def __init__(self):
+        self.new_data = {}
+        self.notifications = 0
+
+    def add(self, new_data):
+        self.new_data.update(new_data)
+        self.notifications += 1
+
+
+# Notifications being coalesced in this engine, keyed on
+# (entity_id, traversal_id, is_update)
+_pending = {}
+
+STAT_NOTIFICATIONS = 'notifications'
+STAT_UPDATES = 'updates'
+STAT_CONFLICTS = 'conflicts'
+STAT_COALESCED = 'coalesced'
+
+_stats = collections.Counter()
+
+
+def stats():
+    """Return the sync point counters for this engine process.
+
+    The counters are the number of predecessor notifications received, the
+    number of successful sync point updates written, the number of
+    compare-and-swap conflicts (each of which causes a retry) and the number
+    of notifications that were merged into another notification's update.
+    """
+    return dict((k, _stats[k]) for k in (STAT_NOTIFICATIONS, STAT_UPDATES,
+                                         STAT_CONFLICTS, STAT_COALESCED))
+
+
+def reset_stats():
+    _stats.clear()
+
+
+def _update(cnxt, entity_id, current_traversal, is_update,
+            predecessors, new_data):
     rows_updated = None
     sync_point = None
     input_data = None
@@ -133,10 +175,55 @@ def sync(cnxt, entity_id, current_traversal, is_update, propagate,
             sync_point.atomic_key, serialize_input_data(input_data))
         # don't aggressively spin; induce some sleep
         if not rows_updated:
+            _stats[STAT_CONFLICTS] += 1
             eventlet.sleep(random.uniform(0, max_wt))
 
-    waiting = predecessors - set(input_data)
+    _stats[STAT_UPDATES] += 1
+    return input_data
+
+
+def _coalesce(key, new_data, window):
+    """Collect notifications for a sync point over the coalescing window.
+
+    The first notification to arrive for a sync point waits for the window
+    to elapse and then returns all of the data received in the meantime, to
+    be written in a single update. Notifications arriving while another is
+    waiting are merged into it and None is returned.
+    """
+    pending = _pending.get(key)
+    if pending is not None:
+        pending.add(new_data)
+        _stats[STAT_COALESCED] += 1
+        return None
+
+    pending = _pending[key] = _PendingSync()
+    pending.add(new_data)
+    try:
+        eventlet.sleep(window)
+    finally:
+        del _pending[key]
+    return pending
+
+
+def sync(cnxt, entity_id, current_traversal, is_update, propagate,
+         predecessors, new_data):
+    _stats[STAT_NOTIFICATIONS] += 1
     key = make_key(entity_id, current_traversal, is_update)
+
+    window = cfg.CONF.convergence_sync_point_coalesce_window
+    if window > 0:
+        pending = _coalesce((entity_id, current_traversal, is_update),
+                            new_data, window)
+        if pending is None:
+            return
+        new_data = pending.new_data
+        LOG.debug('[%s] Coalesced %d notifications', key,
+                  pending.notifications)
+
+    input_data = _update(cnxt, entity_id, current_traversal, is_update,
+                         predecessors, new_data)
+
+    waiting = predecessors - set(input_data)
     if waiting:
         LOG.debug('[%s] Waiting %s: Got %s; still need %s',
                   key, entity_id, _dump_list(input_data), _dump_list(waiting))
@@ -18,11 +18,13 @@ import functools
 import hashlib
 import warnings
 
+from oslo_config import cfg
 import six
 from stevedore import extension
 
 from heat.common import exception
 from heat.common.i18n import _
+from heat.common import lru
 from heat.engine import conditions
 from heat.engine import environment
 from heat.engine import function
@@ -35,6 +37,12 @@ __all__ = ['Template']
 
 _template_classes = None
 
+_CachedTemplate = collections.namedtuple('_CachedTemplate',
+                                         ['template', 'environment', 'files'])
+
+# Parsed raw templates shared by all loads in this process, keyed by ID.
+_template_cache = lru.LRUCache(lambda: cfg.CONF.template_cache_size)
+
 
 def get_version(template_data, available_versions):
     version_keys = set(key for key, version in available_versions)
@@ -91,6 +99,15 @@ def get_template_class(template_data):
         raise exception.InvalidTemplateVersion(explanation=explanation)
 
 
+def _copy_sections(template_data):
+    """Copy a template with its sections, but share their contents.
+
+    Templates modify only their top-level sections (e.g. when adding a
+    resource), so this is sufficient to keep a shared copy unmodified.
+    """
+    return dict((k, copy.copy(v)) for k, v in six.iteritems(template_data))
+
+
 class Template(collections.Mapping):
     """Abstract base class for template format plugins.
 
@@ -150,16 +167,35 @@ class Template(collections.Mapping):
             self.t[s].update(other.t[s])
 
     @classmethod
-    def load(cls, context, template_id, t=None):
-        """Retrieve a Template with the given ID from the database."""
-        if t is None:
-            t = template_object.RawTemplate.get_by_id(context, template_id)
-        env = environment.Environment(t.environment)
-        # support loading the legacy t.files, but modern templates will
-        # have a t.files_id
-        t_files = t.files or t.files_id
-        return cls(t.template, template_id=template_id, env=env,
-                   files=t_files)
+    def load(cls, context, template_id, t=None, cache=False):
+        """Retrieve a Template with the given ID from the database.
+
+        If cache is True, the parsed template is shared with other loads of
+        the same template ID in this process, so that it need not be fetched
+        from the database and decrypted again. This must only be used for
+        templates that are not modified after they are stored, as is the
+        case for convergence stacks.
+        """
+        cached = _template_cache.get(template_id) if cache else None
+        if cached is None:
+            if t is None:
+                t = template_object.RawTemplate.get_by_id(context,
+                                                          template_id)
+            if not cache:
+                env = environment.Environment(t.environment)
+                # support loading the legacy t.files, but modern templates
+                # will have a t.files_id
+                t_files = t.files or t.files_id
+                return cls(t.template, template_id=template_id, env=env,
+                           files=t_files)
+
+            cached = _CachedTemplate(t.template, t.environment,
+                                     t.files or t.files_id)
+            _template_cache.put(template_id, cached)
+
+        env = environment.Environment(copy.deepcopy(cached.environment))
+        return cls(_copy_sections(cached.template), template_id=template_id,
+                   env=env, files=cached.files)
 
     def store(self, context):
         """Store the Template in the database and return its ID."""
@@ -173,6 +209,7 @@ class Template(collections.Mapping):
             self.id = new_rt.id
         else:
             template_object.RawTemplate.update_by_id(context, self.id, rt)
+            _template_cache.discard(self.id)
         return self.id
 
     @property
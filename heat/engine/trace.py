@@ -0,0 +1,223 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Timing traces of stack operations.
+
+While a stack operation is in progress, the time spent in each phase of each
+resource action is recorded as a span. The spans are stored with the stack,
+and critical_path() turns the spans of an operation into a timeline of the
+chain of resource actions that determined how long the operation took.
+"""
+
+import collections
+import contextlib
+import datetime
+import uuid
+
+from oslo_log import log as logging
+import six
+
+from heat.common.i18n import _LE
+from heat.common import timeutils
+from heat.objects import stack_trace as stack_trace_object
+
+LOG = logging.getLogger(__name__)
+
+PHASES = (
+    ACTION, HANDLE, CHECK, PROPERTIES, DB_WRITE, LOCK_WAIT, SCHEDULE,
+) = (
+    'action', 'handle', 'check', 'properties', 'db_write', 'lock_wait',
+    'schedule',
+)
+
+SPAN_KEYS = (
+    SPAN_PHASE, SPAN_RESOURCE, SPAN_START, SPAN_END, SPAN_ATTRIBUTES,
+) = (
+    'phase', 'resource', 'start', 'end', 'attributes',
+)
+
+# Phases that make up the time spent on a resource action, as opposed to the
+# action as a whole or the time spent waiting for it to be scheduled.
+ACTION_PHASES = (HANDLE, CHECK, PROPERTIES, DB_WRITE, LOCK_WAIT)
+
+
+class Tracer(object):
+    """Record the spans of a single operation on a stack."""
+
+    def __init__(self, stack_id, action, operation=None):
+        self.stack_id = stack_id
+        self.action = action
+        self.operation = operation or str(uuid.uuid4())
+        self.spans = []
+
+    @contextlib.contextmanager
+    def span(self, phase, resource=None, **attributes):
+        """Return a context manager that records its duration as a span."""
+        start = timeutils.wallclock()
+        try:
+            yield
+        finally:
+            self.record(phase, start, timeutils.wallclock(), resource,
+                        **attributes)
+
+    def record(self, phase, start, end, resource=None, **attributes):
+        """Record a span that has already ended."""
+        self.spans.append({SPAN_PHASE: phase,
+                           SPAN_RESOURCE: resource,
+                           SPAN_START: start,
+                           SPAN_END: end,
+                           SPAN_ATTRIBUTES: attributes})
+
+    def store(self, context):
+        """Store the spans recorded since the last call, if any."""
+        if not self.spans:
+            return
+        spans, self.spans = self.spans, []
+        try:
+            stack_trace_object.StackTrace.create(
+                context, {'stack_id': self.stack_id,
+                          'operation': self.operation,
+                          'action': self.action,
+                          'spans': spans})
+        except Exception as ex:
+            # Tracing must never cause a stack operation to fail
+            LOG.error(_LE('Failed to store trace of stack %(stack)s: '
+                          '%(err)s'), {'stack': self.stack_id,
+                                       'err': six.text_type(ex)})
+
+
+class _NullTracer(object):
+    """A tracer that records nothing, for when tracing is disabled."""
+
+    @contextlib.contextmanager
+    def span(self, phase, resource=None, **attributes):
+        yield
+
+    def record(self, phase, start, end, resource=None, **attributes):
+        pass
+
+    def store(self, context):
+        pass
+
+
+NULL_TRACER = _NullTracer()
+
+
+def _duration(span):
+    return span[SPAN_END] - span[SPAN_START]
+
+
+def _resource_actions(spans):
+    """Return a summary of each resource action recorded in the spans.
+
+    The other spans of a resource are attributed to the first of its
+    actions that ends after they start, so that e.g. the properties resolved
+    before an action begins are counted as part of it.
+    """
+    by_resource = collections.defaultdict(list)
+    for span in spans:
+        if span[SPAN_RESOURCE] is not None:
+            by_resource[span[SPAN_RESOURCE]].append(span)
+
+    entries = []
+    for name, rsrc_spans in six.iteritems(by_resource):
+        rsrc_spans.sort(key=lambda s: s[SPAN_START])
+        actions = sorted((s for s in rsrc_spans if s[SPAN_PHASE] == ACTION),
+                         key=lambda s: s[SPAN_END])
+        for action in actions:
+            entries.append({
+                'resource_name': name,
+                'action': action[SPAN_ATTRIBUTES].get('action'),
+                'start': action[SPAN_START],
+                'end': action[SPAN_END],
+                'ready': action[SPAN_START],
+                'requires': None,
+                'phases': dict.fromkeys(ACTION_PHASES, 0.0),
+                'check_polls': 0,
+            })
+        rsrc_entries = entries[len(entries) - len(actions):]
+        if not rsrc_entries:
+            continue
+
+        for span in rsrc_spans:
+            if span[SPAN_PHASE] == ACTION:
+                continue
+            entry = next((e for e in rsrc_entries
+                          if span[SPAN_START] <= e['end']), rsrc_entries[-1])
+            if span[SPAN_PHASE] == SCHEDULE:
+                entry['ready'] = min(entry['ready'], span[SPAN_START])
+                entry['requires'] = span[SPAN_ATTRIBUTES].get('requires')
+                continue
+            # Work done before the action began delays it, too
+            entry['start'] = min(entry['start'], span[SPAN_START])
+            entry['ready'] = min(entry['ready'], span[SPAN_START])
+            if span[SPAN_PHASE] in entry['phases']:
+                entry['phases'][span[SPAN_PHASE]] += _duration(span)
+            if span[SPAN_PHASE] == CHECK:
+                entry['check_polls'] += 1
+
+    return entries
+
+
+def critical_path(spans):
+    """Return the critical path of a traced operation.
+
+    The path starts from the resource action that finished last and works
+    back through the action that each one waited for: the latest finishing
+    of the resources it requires, if the dependencies were recorded when the
+    action was scheduled, or else the latest finishing action that ended
+    before it became ready. The result is a dict containing the duration of
+    the operation and the actions on the path in the order in which they
+    ran, with times in seconds relative to the start of the operation.
+    """
+    if not spans:
+        return {'start': None, 'duration': 0.0, 'critical_path': []}
+
+    start = min(s[SPAN_START] for s in spans)
+    end = max(s[SPAN_END] for s in spans)
+    entries = _resource_actions(spans)
+
+    def predecessor(entry):
+        candidates = [e for e in entries
+                      if e is not entry and e['end'] <= entry['ready']]
+        if entry['requires'] is not None:
+            required = set(entry['requires'])
+            candidates = [e for e in candidates
+                          if e['resource_name'] in required]
+        return max(candidates, key=lambda e: e['end']) if candidates else None
+
+    path = []
+    entry = max(entries, key=lambda e: e['end']) if entries else None
+    while entry is not None and not any(e is entry for e in path):
+        path.append(entry)
+        entry = predecessor(entry)
+    path.reverse()
+
+    def timeline_entry(entry):
+        return {
+            'resource_name': entry['resource_name'],
+            'action': entry['action'],
+            'start': round(entry['start'] - start, 3),
+            'duration': round(entry['end'] - entry['start'], 3),
+            'wait': round(entry['start'] - entry['ready'], 3),
+            'phases': dict((p, round(d, 3))
+                           for p, d in six.iteritems(entry['phases'])),
+            'check_polls': entry['check_polls'],
+        }
+
+    return {
+        'start': timeutils.isotime(
+            datetime.datetime.utcfromtimestamp(start)),
+        'duration': round(end - start, 3),
+        'critical_path': [timeline_entry(e) for e in path],
+    }
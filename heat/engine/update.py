@@ -59,10 +59,13 @@ class StackUpdate(object):
         def get_error_wait_time(resource):
             return resource.cancel_grace_period()
 
+        deps = self.dependencies()
         updater = scheduler.DependencyTaskGroup(
-            self.dependencies(),
+            deps,
             self._resource_update,
-            error_wait_time=get_error_wait_time)
+            error_wait_time=get_error_wait_time,
+            tracer=self.existing_stack.tracer,
+            **self.existing_stack.concurrency_options(deps))
 
         if not self.rollback:
             yield cleanup_prev()
@@ -131,6 +134,7 @@ class StackUpdate(object):
                 self.previous_stack.t[self.previous_stack.t.RESOURCES]):
             LOG.debug("Storing definition of new Resource %s", res_name)
             self.previous_stack.t.add_resource(new_res.t)
+            self.previous_stack.reset_resource_definitions()
             self.previous_stack.t.store(self.previous_stack.context)
 
         yield new_res.create()
@@ -168,6 +172,7 @@ class StackUpdate(object):
                     LOG.debug("Storing definition of updated Resource %s",
                               res_name)
                     self.previous_stack.t.add_resource(new_res.t)
+                    self.previous_stack.reset_resource_definitions()
                     self.previous_stack.t.store(self.previous_stack.context)
 
                     LOG.info(_LI("Resource %(res_name)s for stack "
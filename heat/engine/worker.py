@@ -186,6 +186,9 @@ class WorkerService(service.Service):
         finally:
             self.thread_group_mgr.remove_msg_queue(None,
                                                    stack.id, msg_queue)
+            stack.store_trace()
+            if rsrc_owning_stack is not stack:
+                rsrc_owning_stack.store_trace()
 
     @context.request_context
     def cancel_check_resource(self, cnxt, stack_id):
@@ -57,6 +57,57 @@ class ResourceCache(object):
             self.by_stack_id_name[res.stack_id][res.name] = res
 
 
+class ResourceUpdateBatch(object):
+    """Collect resource updates to write them to the database together.
+
+    Unconditional updates to the same resource are merged, so that only the
+    latest value of each field is written. A compare-and-swap update is never
+    merged; any update already pending for the same resource is written out
+    first, so that updates of a resource always reach the database in order.
+    """
+
+    def __init__(self, context):
+        self.context = context
+        self._updates = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._updates)
+
+    def add(self, resource_id, values):
+        """Queue an unconditional update of a resource."""
+        pending = self._updates.get(resource_id)
+        if pending is not None and 'atomic_key' in pending:
+            self.flush()
+            pending = None
+        if pending is None:
+            self._updates[resource_id] = {'id': resource_id,
+                                          'values': dict(values)}
+        else:
+            pending['values'].update(values)
+
+    def add_select_and_update(self, resource_id, values, atomic_key,
+                              expected_engine_id=None):
+        """Queue an update of a resource, subject to the atomic_key check."""
+        if resource_id in self._updates:
+            self.flush()
+        self._updates[resource_id] = {'id': resource_id,
+                                      'values': dict(values),
+                                      'atomic_key': atomic_key,
+                                      'expected_engine_id': expected_engine_id}
+
+    def flush(self):
+        """Write all pending updates to the database.
+
+        :returns: the set of IDs of resources whose compare-and-swap update
+                  was not applied
+        """
+        if not self._updates:
+            return set()
+        updates = list(six.itervalues(self._updates))
+        self._updates.clear()
+        return db_api.resource_update_batch(self.context, updates)
+
+
 class Resource(
     heat_base.HeatObject,
     base.VersionedObjectDictCompat,
@@ -183,6 +234,10 @@ class Resource(
         ]
         return dict(resources)
 
+    @classmethod
+    def get_summaries_by_stack(cls, context, stack_id):
+        return db_api.resource_get_summaries_by_stack(context, stack_id)
+
     @classmethod
     def get_all_by_root_stack(cls, context, stack_id, filters, cache=False):
         resources_db = db_api.resource_get_all_by_root_stack(
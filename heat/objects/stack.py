@@ -66,17 +66,27 @@ class Stack(
     def _from_db_object(context, stack, db_stack):
         for field in stack.fields:
             if field == 'raw_template':
-                stack['raw_template'] = (
-                    raw_template.RawTemplate.from_db_object(
-                        context,
-                        raw_template.RawTemplate(),
-                        db_stack['raw_template']))
+                # If the template was not loaded with the stack, leave it to
+                # be loaded on demand.
+                if 'raw_template' in db_stack.__dict__:
+                    stack['raw_template'] = (
+                        raw_template.RawTemplate.from_db_object(
+                            context,
+                            raw_template.RawTemplate(),
+                            db_stack['raw_template']))
             else:
                 stack[field] = db_stack.__dict__.get(field)
         stack._context = context
         stack.obj_reset_changes()
         return stack
 
+    def obj_load_attr(self, attrname):
+        if attrname != 'raw_template':
+            return super(Stack, self).obj_load_attr(attrname)
+        self.raw_template = raw_template.RawTemplate.get_by_id(
+            self._context, self.raw_template_id)
+        self.obj_reset_changes(['raw_template'])
+
     @classmethod
     def get_root_id(cls, context, stack_id):
         return db_api.stack_get_root_id(context, stack_id)
@@ -136,6 +146,10 @@ class Stack(
             except exception.NotFound:
                 pass
 
+    @classmethod
+    def get_all_summary(cls, context, columns, **kwargs):
+        return db_api.stack_get_all_summary(context, columns, **kwargs)
+
     @classmethod
     def get_all_by_owner_id(cls, context, owner_id):
         db_stacks = db_api.stack_get_all_by_owner_id(context, owner_id)
@@ -163,6 +177,18 @@ class Stack(
     def count_total_resources(cls, context, stack_id):
         return db_api.stack_count_total_resources(context, stack_id)
 
+    @classmethod
+    def get_output_cache(cls, context, stack_id):
+        return db_api.stack_output_cache_get(context, stack_id)
+
+    @classmethod
+    def set_output_cache(cls, context, stack_id, values):
+        db_api.stack_output_cache_set(context, stack_id, values)
+
+    @classmethod
+    def invalidate_output_cache(cls, context, stack_id):
+        db_api.stack_output_cache_invalidate(context, stack_id)
+
     @classmethod
     def create(cls, context, values):
         return cls._from_db_object(context, cls(context),
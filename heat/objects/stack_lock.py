@@ -29,19 +29,31 @@ class StackLock(
     fields = {
         'engine_id': fields.StringField(nullable=True),
         'stack_id': fields.StringField(),
+        'expires_at': fields.DateTimeField(nullable=True),
         'created_at': fields.DateTimeField(read_only=True),
         'updated_at': fields.DateTimeField(nullable=True),
     }
 
     @classmethod
-    def create(cls, context, stack_id, engine_id):
-        return db_api.stack_lock_create(context, stack_id, engine_id)
+    def create(cls, context, stack_id, engine_id, **kwargs):
+        return db_api.stack_lock_create(context, stack_id, engine_id,
+                                        **kwargs)
 
     @classmethod
-    def steal(cls, context, stack_id, old_engine_id, new_engine_id):
+    def steal(cls, context, stack_id, old_engine_id, new_engine_id,
+              **kwargs):
         return db_api.stack_lock_steal(context, stack_id,
                                        old_engine_id,
-                                       new_engine_id)
+                                       new_engine_id,
+                                       **kwargs)
+
+    @classmethod
+    def lease_expired(cls, context, stack_id):
+        return db_api.stack_lock_lease_expired(context, stack_id)
+
+    @classmethod
+    def renew(cls, context, engine_id, lease_duration):
+        return db_api.stack_lock_renew(context, engine_id, lease_duration)
 
     @classmethod
     def release(cls, context, stack_id, engine_id):
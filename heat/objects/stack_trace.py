@@ -0,0 +1,59 @@
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+
+"""StackTrace object."""
+
+
+from oslo_versionedobjects import base
+from oslo_versionedobjects import fields
+
+from heat.db import api as db_api
+from heat.objects import base as heat_base
+from heat.objects import fields as heat_fields
+
+
+class StackTrace(
+        heat_base.HeatObject,
+        base.VersionedObjectDictCompat,
+        base.ComparableVersionedObject,
+):
+
+    fields = {
+        'id': fields.IntegerField(),
+        'stack_id': fields.StringField(),
+        'operation': fields.StringField(),
+        'action': fields.StringField(nullable=True),
+        'spans': heat_fields.JsonField(nullable=True),
+        'created_at': fields.DateTimeField(read_only=True),
+        'updated_at': fields.DateTimeField(nullable=True),
+    }
+
+    @staticmethod
+    def _from_db_object(context, trace, db_trace):
+        for field in trace.fields:
+            trace[field] = db_trace[field]
+        trace._context = context
+        trace.obj_reset_changes()
+        return trace
+
+    @classmethod
+    def create(cls, context, values):
+        return cls._from_db_object(
+            context, cls(), db_api.stack_trace_create(context, values))
+
+    @classmethod
+    def get_all_by_stack(cls, context, stack_id, operation=None):
+        return [cls._from_db_object(context, cls(), db_trace)
+                for db_trace in db_api.stack_trace_get_all_by_stack(
+                    context, stack_id, operation)]
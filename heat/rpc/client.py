@@ -58,6 +58,10 @@ class EngineClient(object):
                and list_software_configs
         1.34 - Add migrate_convergence_1 call
         1.35 - Add with_condition to list_template_functions
+        1.36 - Add tail to list_events
+        1.37 - Add live_outputs to show_stack and show_output
+        1.38 - Add fields to list_stacks, approximate to count_stacks
+        1.39 - Add get_stack_trace call
     """
 
     BASE_RPC_API_VERSION = '1.0'
@@ -123,7 +127,7 @@ class EngineClient(object):
                     sort_dir=None, filters=None,
                     show_deleted=False, show_nested=False, show_hidden=False,
                     tags=None, tags_any=None, not_tags=None,
-                    not_tags_any=None):
+                    not_tags_any=None, fields=None):
         """Returns attributes of all stacks.
 
         It supports pagination (``limit`` and ``marker``), sorting
@@ -147,6 +151,7 @@ class EngineClient(object):
             multiple tags using the boolean AND expression
         :param not_tags_any: show stacks not containing these tags, combine
             multiple tags using the boolean OR expression
+        :param fields: if set, a list of the stack keys to return
         :returns: a list of stacks
         """
         return self.call(ctxt,
@@ -158,13 +163,14 @@ class EngineClient(object):
                                        show_hidden=show_hidden,
                                        tags=tags, tags_any=tags_any,
                                        not_tags=not_tags,
-                                       not_tags_any=not_tags_any),
-                         version='1.33')
+                                       not_tags_any=not_tags_any,
+                                       fields=fields),
+                         version='1.38')
 
     def count_stacks(self, ctxt, filters=None,
                      show_deleted=False, show_nested=False, show_hidden=False,
                      tags=None, tags_any=None, not_tags=None,
-                     not_tags_any=None):
+                     not_tags_any=None, approximate=False):
         """Returns the number of stacks that match the given filters.
 
         :param ctxt: RPC context.
@@ -180,6 +186,8 @@ class EngineClient(object):
             multiple tags using the boolean AND expression
         :param not_tags_any: count stacks not containing these tags, combine
             multiple tags using the boolean OR expression
+        :param approximate: if true, stop counting at the engine's
+            configured approximate_stack_count_limit
         :returns: an integer representing the number of matched stacks
         """
         return self.call(ctxt, self.make_msg('count_stacks',
@@ -190,21 +198,26 @@ class EngineClient(object):
                                              tags=tags,
                                              tags_any=tags_any,
                                              not_tags=not_tags,
-                                             not_tags_any=not_tags_any),
-                         version='1.33')
+                                             not_tags_any=not_tags_any,
+                                             approximate=approximate),
+                         version='1.38')
 
-    def show_stack(self, ctxt, stack_identity, resolve_outputs=True):
+    def show_stack(self, ctxt, stack_identity, resolve_outputs=True,
+                   live_outputs=False):
         """Returns detailed information about one or all stacks.
 
         :param ctxt: RPC context.
         :param stack_identity: Name of the stack you want to show, or None to
         show all
         :param resolve_outputs: If True, stack outputs will be resolved
+        :param live_outputs: If True, stack outputs will be resolved even if
+        values stored with the stack are available
         """
         return self.call(ctxt, self.make_msg('show_stack',
                                              stack_identity=stack_identity,
-                                             resolve_outputs=resolve_outputs),
-                         version='1.20')
+                                             resolve_outputs=resolve_outputs,
+                                             live_outputs=live_outputs),
+                         version='1.37')
 
     def preview_stack(self, ctxt, stack_name, template, params, files,
                       args, environment_files=None):
@@ -515,7 +528,7 @@ class EngineClient(object):
 
     def list_events(self, ctxt, stack_identity, filters=None, limit=None,
                     marker=None, sort_keys=None, sort_dir=None,
-                    nested_depth=None):
+                    nested_depth=None, tail=False):
         """Lists all events associated with a given stack.
 
         It supports pagination (``limit`` and ``marker``),
@@ -530,6 +543,8 @@ class EngineClient(object):
         :param sort_keys: an array of fields used to sort the list
         :param sort_dir: the direction of the sort ('asc' or 'desc').
         :param nested_depth: Levels of nested stacks to list events for.
+        :param tail: List only the events that were created after the marker,
+                     oldest first.
         """
         return self.call(ctxt, self.make_msg('list_events',
                                              stack_identity=stack_identity,
@@ -538,8 +553,9 @@ class EngineClient(object):
                                              marker=marker,
                                              sort_keys=sort_keys,
                                              sort_dir=sort_dir,
-                                             nested_depth=nested_depth),
-                         version='1.31')
+                                             nested_depth=nested_depth,
+                                             tail=tail),
+                         version='1.36')
 
     def describe_stack_resource(self, ctxt, stack_identity, resource_name,
                                 with_attr=False):
@@ -836,11 +852,23 @@ class EngineClient(object):
                                              stack_identity=stack_identity),
                          version='1.19')
 
-    def show_output(self, cntx, stack_identity, output_key):
+    def show_output(self, cntx, stack_identity, output_key,
+                    live_outputs=False):
         return self.call(cntx, self.make_msg('show_output',
                                              stack_identity=stack_identity,
-                                             output_key=output_key),
-                         version='1.19')
+                                             output_key=output_key,
+                                             live_outputs=live_outputs),
+                         version='1.37')
+
+    def get_stack_trace(self, ctxt, stack_identity):
+        """Returns the timeline of the latest traced operation on a stack.
+
+        :param ctxt: RPC context.
+        :param stack_identity: Name of the stack you want to see.
+        """
+        return self.call(ctxt, self.make_msg('get_stack_trace',
+                                             stack_identity=stack_identity),
+                         version='1.39')
 
     def export_stack(self, ctxt, stack_identity):
         """Exports the stack data in JSON format.
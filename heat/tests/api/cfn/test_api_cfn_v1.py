@@ -164,9 +164,9 @@ class CfnStackControllerTest(common.HeatTestCase):
                         'show_deleted': False, 'show_nested': False,
                         'show_hidden': False, 'tags': None,
                         'tags_any': None, 'not_tags': None,
-                        'not_tags_any': None}
+                        'not_tags_any': None, 'fields': None}
         mock_call.assert_called_once_with(
-            dummy_req.context, ('list_stacks', default_args), version='1.33')
+            dummy_req.context, ('list_stacks', default_args), version='1.38')
 
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_list_rmt_aterr(self, mock_call):
@@ -182,7 +182,7 @@ class CfnStackControllerTest(common.HeatTestCase):
         result = self.controller.list(dummy_req)
         self.assertIsInstance(result, exception.HeatInvalidParameterValueError)
         mock_call.assert_called_once_with(
-            dummy_req.context, ('list_stacks', mock.ANY), version='1.33')
+            dummy_req.context, ('list_stacks', mock.ANY), version='1.38')
 
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_list_rmt_interr(self, mock_call):
@@ -198,7 +198,7 @@ class CfnStackControllerTest(common.HeatTestCase):
         result = self.controller.list(dummy_req)
         self.assertIsInstance(result, exception.HeatInternalFailureError)
         mock_call.assert_called_once_with(
-            dummy_req.context, ('list_stacks', mock.ANY), version='1.33')
+            dummy_req.context, ('list_stacks', mock.ANY), version='1.38')
 
     def test_describe_last_updated_time(self):
         params = {'Action': 'DescribeStacks'}
@@ -213,8 +213,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             dummy_req.context, ('show_stack', {'stack_identity': None,
-                                               'resolve_outputs': True}),
-            version='1.20'
+                                               'resolve_outputs': True,
+                                               'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -237,8 +238,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             dummy_req.context, ('show_stack', {'stack_identity': None,
-                                               'resolve_outputs': True}),
-            version='1.20'
+                                               'resolve_outputs': True,
+                                               'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -294,8 +296,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         rpc_client.EngineClient.call(
             dummy_req.context,
             ('show_stack', {'stack_identity': identity,
-                            'resolve_outputs': True}),
-            version='1.20'
+                            'resolve_outputs': True,
+                            'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -385,8 +388,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         rpc_client.EngineClient.call(
             dummy_req.context,
             ('show_stack', {'stack_identity': identity,
-                            'resolve_outputs': True}),
-            version='1.20'
+                            'resolve_outputs': True,
+                            'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
 
         self.m.ReplayAll()
@@ -446,8 +450,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         self.m.StubOutWithMock(rpc_client.EngineClient, 'call')
         rpc_client.EngineClient.call(
             dummy_req.context, ('show_stack', {'stack_identity': identity,
-                                               'resolve_outputs': True},),
-            version='1.20'
+                                               'resolve_outputs': True,
+                                               'live_outputs': False},),
+            version='1.37'
         ).AndRaise(heat_exception.InvalidTenant(target='test',
                                                 actual='test'))
 
@@ -471,8 +476,9 @@ class CfnStackControllerTest(common.HeatTestCase):
         ).AndReturn(identity)
         rpc_client.EngineClient.call(
             dummy_req.context, ('show_stack', {'stack_identity': identity,
-                                               'resolve_outputs': True}),
-            version='1.20'
+                                               'resolve_outputs': True,
+                                               'live_outputs': False}),
+            version='1.37'
         ).AndRaise(AttributeError())
 
         self.m.ReplayAll()
@@ -74,6 +74,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         kwargs = {'stack_identity': stack_identity,
                   'nested_depth': nested_depth,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'filters': {'resource_name': res_name}}
 
         engine_resp = [
@@ -98,7 +99,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -173,7 +174,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         rpc_call_args, _ = mock_call.call_args
         engine_args = rpc_call_args[1][1]
-        self.assertEqual(7, len(engine_args))
+        self.assertEqual(8, len(engine_args))
         self.assertIn('filters', engine_args)
         self.assertIn('resource_name', engine_args['filters'])
         self.assertEqual(res_name, engine_args['filters']['resource_name'])
@@ -220,7 +221,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         rpc_call_args, _ = mock_call.call_args
         engine_args = rpc_call_args[1][1]
-        self.assertEqual(7, len(engine_args))
+        self.assertEqual(8, len(engine_args))
         self.assertIn('filters', engine_args)
         self.assertIn('resource_name', engine_args['filters'])
         self.assertIn('resource1', engine_args['filters']['resource_name'])
@@ -247,6 +248,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity, 'nested_depth': None,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'filters': {'resource_name': res_name}}
 
         engine_resp = [
@@ -268,7 +270,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -308,6 +310,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity, 'nested_depth': None,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'filters': None}
 
         error = heat_exc.EntityNotFound(entity='Stack', name='a')
@@ -315,7 +318,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndRaise(tools.to_remote_error(error))
         self.m.ReplayAll()
 
@@ -358,6 +361,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity, 'nested_depth': None,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'filters': {'resource_name': res_name}}
 
         engine_resp = []
@@ -365,7 +369,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -401,7 +405,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         rpc_call_args, _ = mock_call.call_args
         engine_args = rpc_call_args[1][1]
-        self.assertEqual(7, len(engine_args))
+        self.assertEqual(8, len(engine_args))
         self.assertIn('limit', engine_args)
         self.assertEqual(10, engine_args['limit'])
         self.assertIn('sort_keys', engine_args)
@@ -414,6 +418,40 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertIsNone(engine_args['filters'])
         self.assertNotIn('balrog', engine_args)
 
+    @mock.patch.object(rpc_client.EngineClient, 'call')
+    def test_index_tail(self, mock_call, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        sid = identifier.HeatIdentifier(self.tenant, 'wibble', '6')
+
+        req = self._get(sid._tenant_path() + '/events',
+                        params={'tail': 'True', 'marker': 'fake marker'})
+
+        mock_call.return_value = []
+
+        self.controller.index(req, tenant_id=self.tenant,
+                              stack_name=sid.stack_name,
+                              stack_id=sid.stack_id)
+
+        rpc_call_args, _ = mock_call.call_args
+        engine_args = rpc_call_args[1][1]
+        self.assertTrue(engine_args['tail'])
+        self.assertEqual('fake marker', engine_args['marker'])
+
+    @mock.patch.object(rpc_client.EngineClient, 'call')
+    def test_index_tail_not_bool(self, mock_call, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        sid = identifier.HeatIdentifier(self.tenant, 'wibble', '6')
+
+        req = self._get(sid._tenant_path() + '/events',
+                        params={'tail': 'not-a-bool'})
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.index, req,
+                          tenant_id=self.tenant,
+                          stack_name=sid.stack_name,
+                          stack_id=sid.stack_id)
+        self.assertFalse(mock_call.called)
+
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_index_limit_not_int(self, mock_call, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'index', True)
@@ -490,6 +528,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'nested_depth': None,
                   'filters': {'resource_name': res_name, 'uuid': event_id}}
 
@@ -513,7 +552,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -558,6 +597,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'nested_depth': None,
                   'filters': {'resource_name': res_name, 'uuid': '42'}}
 
@@ -566,7 +606,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
 
@@ -590,6 +630,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         kwargs = {'stack_identity': stack_identity,
                   'limit': None, 'sort_keys': None, 'marker': None,
+                  'tail': False,
                   'sort_dir': None, 'nested_depth': None,
                   'filters': {'resource_name': res_name, 'uuid': '42'}}
 
@@ -598,7 +639,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('list_events', kwargs),
-            version='1.31'
+            version='1.36'
         ).AndRaise(tools.to_remote_error(error))
         self.m.ReplayAll()
 
@@ -674,7 +715,7 @@ class EventControllerTest(tools.ControllerTest, common.HeatTestCase):
 
         rpc_call_args, _ = mock_call.call_args
         engine_args = rpc_call_args[1][1]
-        self.assertEqual(7, len(engine_args))
+        self.assertEqual(8, len(engine_args))
         self.assertIn('filters', engine_args)
         self.assertIn('resource_name', engine_args['filters'])
         self.assertIn(res_name, engine_args['filters']['resource_name'])
@@ -238,6 +238,19 @@ class RoutesTest(common.HeatTestCase):
                 'snapshot_id': 'cccc'
             })
 
+    def test_stack_trace(self):
+        self.assertRoute(
+            self.m,
+            '/aaaa/stacks/teststack/bbbb/trace',
+            'GET',
+            'trace',
+            'StackController',
+            {
+                'tenant_id': 'aaaa',
+                'stack_name': 'teststack',
+                'stack_id': 'bbbb'
+            })
+
     def test_stack_outputs(self):
         self.assertRoute(
             self.m,
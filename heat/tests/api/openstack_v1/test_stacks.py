@@ -299,9 +299,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
                         'show_deleted': False, 'show_nested': False,
                         'show_hidden': False, 'tags': None,
                         'tags_any': None, 'not_tags': None,
-                        'not_tags_any': None}
+                        'not_tags_any': None, 'fields': None}
         mock_call.assert_called_once_with(
-            req.context, ('list_stacks', default_args), version='1.33')
+            req.context, ('list_stacks', default_args), version='1.38')
 
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_index_whitelists_pagination_params(self, mock_call, mock_enforce):
@@ -436,6 +436,71 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
                     'acceptable values are: true, false')
         self.assertIn(excepted, six.text_type(exc))
 
+    def test_index_approximate_count(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        params = {'with_count': 'True', 'approximate_count': 'True'}
+        req = self._get('/stacks', params=params)
+        engine = self.controller.rpc_client
+
+        engine.list_stacks = mock.Mock(return_value=[])
+        engine.count_stacks = mock.Mock(return_value=1000)
+
+        result = self.controller.index(req, tenant_id=self.tenant)
+        self.assertEqual(1000, result['count'])
+        engine.count_stacks.assert_called_once_with(mock.ANY,
+                                                    filters=mock.ANY,
+                                                    show_deleted=False,
+                                                    show_nested=False,
+                                                    show_hidden=False,
+                                                    tags=None,
+                                                    tags_any=None,
+                                                    not_tags=None,
+                                                    not_tags_any=None,
+                                                    approximate=True)
+
+    def test_index_fields(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        req = self._get('/stacks')
+        req.environ['QUERY_STRING'] = ('fields=id&fields=stack_status'
+                                       '&fields=links')
+        engine = self.controller.rpc_client
+
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '1')
+        engine.list_stacks = mock.Mock(return_value=[
+            {u'stack_identity': dict(identity),
+             u'stack_action': u'CREATE',
+             u'stack_status': u'COMPLETE'}])
+
+        result = self.controller.index(req, tenant_id=self.tenant)
+
+        engine.list_stacks.assert_called_once_with(mock.ANY,
+                                                   filters=mock.ANY,
+                                                   fields=['stack_status'])
+        expected = {
+            'stacks': [
+                {
+                    'links': [{"href": self._url(identity),
+                               "rel": "self"}],
+                    'id': '1',
+                    u'stack_status': u'CREATE_COMPLETE'
+                }
+            ]
+        }
+        self.assertEqual(expected, result)
+
+    def test_index_fields_invalid(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'index', True)
+        req = self._get('/stacks')
+        req.environ['QUERY_STRING'] = 'fields=stack_name&fields=parameters'
+        engine = self.controller.rpc_client
+        engine.list_stacks = mock.Mock()
+
+        ex = self.assertRaises(webob.exc.HTTPBadRequest,
+                               self.controller.index, req,
+                               tenant_id=self.tenant)
+        self.assertIn('parameters', six.text_type(ex))
+        self.assertFalse(engine.list_stacks.called)
+
     @mock.patch.object(rpc_client.EngineClient, 'count_stacks')
     def test_index_doesnt_break_with_old_engine(self, mock_count_stacks,
                                                 mock_enforce):
@@ -545,7 +610,8 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
                                                         tags=None,
                                                         tags_any=None,
                                                         not_tags=None,
-                                                        not_tags_any=None)
+                                                        not_tags_any=None,
+                                                        approximate=False)
 
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_detail(self, mock_call, mock_enforce):
@@ -606,9 +672,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
                         'show_deleted': False, 'show_nested': False,
                         'show_hidden': False, 'tags': None,
                         'tags_any': None, 'not_tags': None,
-                        'not_tags_any': None}
+                        'not_tags_any': None, 'fields': None}
         mock_call.assert_called_once_with(
-            req.context, ('list_stacks', default_args), version='1.33')
+            req.context, ('list_stacks', default_args), version='1.38')
 
     @mock.patch.object(rpc_client.EngineClient, 'call')
     def test_index_rmt_aterr(self, mock_call, mock_enforce):
@@ -624,7 +690,7 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertEqual(400, resp.json['code'])
         self.assertEqual('AttributeError', resp.json['error']['type'])
         mock_call.assert_called_once_with(
-            req.context, ('list_stacks', mock.ANY), version='1.33')
+            req.context, ('list_stacks', mock.ANY), version='1.38')
 
     def test_index_err_denied_policy(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'index', False)
@@ -652,7 +718,7 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertEqual(500, resp.json['code'])
         self.assertEqual('Exception', resp.json['error']['type'])
         mock_call.assert_called_once_with(
-            req.context, ('list_stacks', mock.ANY), version='1.33')
+            req.context, ('list_stacks', mock.ANY), version='1.38')
 
     def test_create(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'create', True)
@@ -1525,8 +1591,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('show_stack', {'stack_identity': dict(identity),
-                            'resolve_outputs': True}),
-            version='1.20'
+                            'resolve_outputs': True,
+                            'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
         response = self.controller.show(req,
@@ -1590,8 +1657,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('show_stack', {'stack_identity': dict(identity),
-                            'resolve_outputs': False}),
-            version='1.20'
+                            'resolve_outputs': False,
+                            'live_outputs': False}),
+            version='1.37'
         ).AndReturn(engine_resp)
         self.m.ReplayAll()
         response = self.controller.show(req,
@@ -1630,8 +1698,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('show_stack', {'stack_identity': dict(identity),
-                            'resolve_outputs': True}),
-            version='1.20'
+                            'resolve_outputs': True,
+                            'live_outputs': False}),
+            version='1.37'
         ).AndRaise(tools.to_remote_error(error))
         self.m.ReplayAll()
 
@@ -2535,8 +2604,9 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         rpc_client.EngineClient.call(
             req.context,
             ('show_output', {'output_key': 'key',
-                             'stack_identity': dict(identity)}),
-            version='1.19'
+                             'stack_identity': dict(identity),
+                             'live_outputs': False}),
+            version='1.37'
         ).AndReturn(output)
         self.m.ReplayAll()
 
@@ -2548,6 +2618,79 @@ class StackControllerTest(tools.ControllerTest, common.HeatTestCase):
         self.assertEqual({'output': output}, response)
         self.m.VerifyAll()
 
+    def test_trace(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'trace', True)
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '6')
+        req = self._get('/stacks/%(stack_name)s/%(stack_id)s/trace' %
+                        identity)
+        trace = {'operation': 'op', 'action': 'CREATE',
+                 'start': '2016-10-17T12:00:00Z', 'duration': 3.0,
+                 'critical_path': []}
+        mock_call = self.patchobject(rpc_client.EngineClient, 'call',
+                                     return_value=trace)
+
+        response = self.controller.trace(req, tenant_id=identity.tenant,
+                                         stack_name=identity.stack_name,
+                                         stack_id=identity.stack_id)
+
+        self.assertEqual({'trace': trace}, response)
+        mock_call.assert_called_once_with(
+            req.context,
+            ('get_stack_trace', {'stack_identity': dict(identity)}),
+            version='1.39')
+
+    def test_trace_err_denied_policy(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'trace', False)
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '6')
+        req = self._get('/stacks/%(stack_name)s/%(stack_id)s/trace' %
+                        identity)
+
+        resp = tools.request_with_middleware(
+            fault.FaultWrapper, self.controller.trace, req,
+            tenant_id=self.tenant, stack_name=identity.stack_name,
+            stack_id=identity.stack_id)
+
+        self.assertEqual(403, resp.status_int)
+        self.assertIn('403 Forbidden', six.text_type(resp))
+
+    def test_show_output_live(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'show_output', True)
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '6')
+        req = self._get('/stacks/%(stack_name)s/%(stack_id)s/key' % identity,
+                        params={'live_outputs': 'true'})
+        output = {'output_key': 'key',
+                  'output_value': 'val',
+                  'description': 'description'}
+
+        mock_call = self.patchobject(rpc_client.EngineClient, 'call',
+                                     return_value=output)
+
+        response = self.controller.show_output(req, tenant_id=identity.tenant,
+                                               stack_name=identity.stack_name,
+                                               stack_id=identity.stack_id,
+                                               output_key='key')
+
+        self.assertEqual({'output': output}, response)
+        mock_call.assert_called_once_with(
+            req.context,
+            ('show_output', {'output_key': 'key',
+                             'stack_identity': dict(identity),
+                             'live_outputs': True}),
+            version='1.37')
+
+    def test_show_output_live_invalid(self, mock_enforce):
+        self._mock_enforce_setup(mock_enforce, 'show_output', True)
+        identity = identifier.HeatIdentifier(self.tenant, 'wordpress', '6')
+        req = self._get('/stacks/%(stack_name)s/%(stack_id)s/key' % identity,
+                        params={'live_outputs': 'bad'})
+
+        self.assertRaises(webob.exc.HTTPBadRequest,
+                          self.controller.show_output, req,
+                          tenant_id=identity.tenant,
+                          stack_name=identity.stack_name,
+                          stack_id=identity.stack_id,
+                          output_key='key')
+
     def test_list_template_versions(self, mock_enforce):
         self._mock_enforce_setup(mock_enforce, 'list_template_versions', True)
         req = self._get('/template_versions')
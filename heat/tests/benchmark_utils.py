@@ -0,0 +1,47 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Settings and reports shared by the benchmark tests.
+
+Each benchmark reads the sizes to run from its own environment variable,
+since their units differ. All of them write their JSON reports to the
+directory named by HEAT_BENCHMARK_OUTPUT, if it is set.
+"""
+
+import json
+import os
+
+
+def sizes(variable, default):
+    """Return the sizes to benchmark, from an environment variable if set.
+
+    The value, like the default, is a comma-separated list of integers.
+    """
+    value = os.environ.get(variable, default)
+    return [int(size) for size in value.split(',')]
+
+
+def report_path(name):
+    """Return the path of a JSON report, or None if none was requested."""
+    output_dir = os.environ.get('HEAT_BENCHMARK_OUTPUT')
+    if output_dir:
+        return os.path.join(output_dir, '%s.json' % name)
+
+
+def write_report(results, path):
+    """Write benchmark results to a file as JSON."""
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'w') as f:
+        json.dump({'results': results}, f, indent=2, sort_keys=True)
@@ -13,8 +13,10 @@
 """Tests for :module:'heat.engine.clients.os.nova'."""
 
 import collections
+import datetime
 import uuid
 
+import eventlet
 import mock
 from novaclient import client as nc
 from novaclient import exceptions as nova_exceptions
@@ -328,6 +330,143 @@ class NovaClientPluginFetchServerTest(NovaClientPluginTestCase):
         self.nova_client.servers.get.assert_called_once_with(self.server.id)
 
 
+class NovaClientPluginFetchServerBatchedTest(NovaClientPluginTestCase):
+
+    def setUp(self):
+        super(NovaClientPluginFetchServerBatchedTest, self).setUp()
+        self.addCleanup(nova._status_pollers.clear)
+        self.now = datetime.datetime(2016, 6, 1, 12, 0, 0)
+        self.patchobject(nova.oslo_timeutils, 'utcnow',
+                         side_effect=lambda: self.now)
+
+    def _server(self, server_id, status):
+        server = mock.Mock()
+        server.id = server_id
+        server.status = status
+        return server
+
+    def test_not_batched_by_default(self):
+        server = self._server('1234', 'BUILD')
+        self.nova_client.servers.get.return_value = server
+        self.assertIs(server,
+                      self.nova_plugin.fetch_server('1234', batched=True))
+        self.assertIs(server,
+                      self.nova_plugin.fetch_server('1234', batched=True))
+        self.assertEqual(2, self.nova_client.servers.get.call_count)
+        self.assertEqual({}, nova._status_pollers)
+
+    def test_batched(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        building = {'1': self._server('1', 'BUILD'),
+                    '2': self._server('2', 'BUILD')}
+        self.nova_client.servers.get.side_effect = building.get
+
+        # Servers not seen before are fetched individually
+        self.assertIs(building['1'], self.nova_plugin.fetch_server(
+            '1', batched=True))
+        self.assertIs(building['2'], self.nova_plugin.fetch_server(
+            '2', batched=True))
+        self.assertEqual(2, self.nova_client.servers.get.call_count)
+        self.assertEqual(0, self.nova_client.servers.list.call_count)
+
+        # Within the interval, the known state is returned
+        self.now += datetime.timedelta(seconds=2)
+        self.assertIs(building['1'], self.nova_plugin.fetch_server(
+            '1', batched=True))
+        self.assertEqual(0, self.nova_client.servers.list.call_count)
+
+        # After the interval, changed servers are listed with one request
+        active = self._server('1', 'ACTIVE')
+        self.nova_client.servers.list.side_effect = [
+            [active, self._server('other', 'ACTIVE')], []]
+        self.now += datetime.timedelta(seconds=5)
+        self.assertIs(active, self.nova_plugin.fetch_server(
+            '1', batched=True))
+        self.assertIs(building['2'], self.nova_plugin.fetch_server(
+            '2', batched=True))
+        search_opts = {'changes-since': '2016-06-01T11:59:00Z'}
+        self.assertEqual(
+            [mock.call(search_opts=search_opts, marker=None),
+             mock.call(search_opts=search_opts, marker='other')],
+            self.nova_client.servers.list.call_args_list)
+        self.assertEqual(2, self.nova_client.servers.get.call_count)
+
+    def test_batched_pages(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        self.nova_client.servers.get.return_value = self._server('1', 'BUILD')
+        self.nova_plugin.fetch_server('1', batched=True)
+
+        # A changed server on a later page is not missed
+        active = self._server('1', 'ACTIVE')
+        self.nova_client.servers.list.side_effect = [
+            [self._server('a', 'ACTIVE')], [active], []]
+        self.now += datetime.timedelta(seconds=5)
+        self.assertIs(active, self.nova_plugin.fetch_server(
+            '1', batched=True))
+        self.assertEqual(3, self.nova_client.servers.list.call_count)
+        self.assertEqual(
+            [None, 'a', '1'],
+            [c[1]['marker']
+             for c in self.nova_client.servers.list.call_args_list])
+
+    def test_batched_lookups_concurrent(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        in_flight = []
+        max_in_flight = []
+
+        def get(server_id):
+            in_flight.append(server_id)
+            max_in_flight.append(len(in_flight))
+            eventlet.sleep(0)
+            in_flight.remove(server_id)
+            return self._server(server_id, 'BUILD')
+
+        self.nova_client.servers.get.side_effect = get
+        client = self.nova_plugin.client()
+        poller = nova.ServerStatusPoller(5)
+        threads = [eventlet.spawn(poller.get, client, server_id)
+                   for server_id in ('1', '2', '3')]
+        self.assertEqual(['1', '2', '3'], [t.wait().id for t in threads])
+        self.assertEqual(3, max(max_in_flight))
+
+    def test_idle_pollers_removed(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        self.nova_client.servers.get.return_value = self._server('1', 'BUILD')
+        self.nova_plugin.fetch_server('1', batched=True)
+        nova._status_pollers[('other', None)] = nova.ServerStatusPoller(5)
+        self.assertEqual(2, len(nova._status_pollers))
+
+        self.now += datetime.timedelta(
+            seconds=nova.ServerStatusPoller.MAX_IDLE + 1)
+        self.nova_plugin.fetch_server('1', batched=True)
+        self.assertEqual([(self.nova_plugin.context.tenant_id,
+                           self.nova_plugin._get_region_name())],
+                         list(nova._status_pollers))
+
+    def test_batched_not_found(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        self.nova_client.servers.get.side_effect = (
+            nova_exceptions.NotFound(404))
+        self.assertRaises(nova_exceptions.NotFound,
+                          self.nova_plugin.fetch_server, '1', batched=True)
+
+    def test_batched_overlimit(self):
+        cfg.CONF.set_override('server_status_batch_interval', 5,
+                              group='clients_nova', enforce_type=True)
+        self.nova_client.servers.get.return_value = self._server('1', 'BUILD')
+        self.nova_plugin.fetch_server('1', batched=True)
+
+        self.nova_client.servers.list.side_effect = (
+            nova_exceptions.OverLimit(413, "limit reached"))
+        self.now += datetime.timedelta(seconds=5)
+        self.assertIsNone(self.nova_plugin.fetch_server('1', batched=True))
+
+
 class NovaClientPluginCheckActiveTest(NovaClientPluginTestCase):
 
     scenarios = [
@@ -377,13 +516,13 @@ class NovaClientPluginCheckActiveTest(NovaClientPluginTestCase):
         else:
             self.assertTrue(self.nova_plugin._check_active(self.server.id))
 
-        self.f_mock.assert_called_once_with(self.server.id)
+        self.f_mock.assert_called_once_with(self.server.id, batched=True)
         self.assertEqual(0, self.r_mock.call_count)
 
     def test_check_active_with_string_unavailable(self):
         self.f_mock.return_value = None
         self.assertFalse(self.nova_plugin._check_active(self.server.id))
-        self.f_mock.assert_called_once_with(self.server.id)
+        self.f_mock.assert_called_once_with(self.server.id, batched=True)
         self.assertEqual(0, self.r_mock.call_count)
 
 
@@ -38,6 +38,7 @@ from heat.engine import environment
 from heat.engine import resource
 from heat.engine import resources
 from heat.engine import scheduler
+from heat.engine import template
 from heat.tests import fakes
 from heat.tests import generic_resource as generic_rsrc
 from heat.tests import utils
@@ -137,6 +138,8 @@ class HeatTestCase(testscenarios.WithScenarios,
         utils.setup_dummy_db()
         self.register_test_resources()
         self.addCleanup(utils.reset_dummy_db)
+        # Template IDs are reused once the database is reset
+        self.addCleanup(template._template_cache.clear)
 
     def register_test_resources(self):
         resource._register_class('GenericResourceType',
@@ -0,0 +1,333 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks of stack operations on large synthetic stacks.
+
+The stacks are built from the simulator's OS::Heat::TestResource, so no real
+services are needed. Engine RPC calls (e.g. for nested stacks) are dispatched
+to an in-process engine, and convergence worker messages go through the
+simulator's message queue.
+"""
+
+import json
+import resource as resource_usage
+import sys
+import time
+
+from oslo_config import cfg
+from oslo_messaging.rpc import dispatcher
+import six
+import sqlalchemy
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from heat.common import service_utils
+from heat.db import api as db_api
+from heat.engine import service
+from heat.engine import sync_point
+from heat.rpc import client as rpc_client
+from heat.rpc import worker_client
+from heat.tests.convergence.framework import engine_wrapper
+from heat.tests import utils
+
+
+SHAPES = (
+    WIDE, DEEP, GROUP, NESTED,
+) = (
+    'wide', 'deep', 'group', 'nested',
+)
+
+MODES = (
+    LEGACY, CONVERGENCE,
+) = (
+    'legacy', 'convergence',
+)
+
+OPERATIONS = (
+    CREATE, UPDATE, DELETE,
+) = (
+    'create', 'update', 'delete',
+)
+
+RESULT_KEYS = (
+    RESULT_SHAPE, RESULT_SIZE, RESULT_MODE, RESULT_OPERATION,
+    RESULT_STACK_STATUS, RESULT_WALL_TIME, RESULT_DB_QUERIES,
+    RESULT_RPC_MESSAGES, RESULT_SYNC_POINT_CONFLICTS, RESULT_PEAK_MEMORY,
+    RESULT_MEMORY_SOURCE,
+) = (
+    'shape', 'size', 'mode', 'operation',
+    'stack_status', 'wall_time', 'db_queries',
+    'rpc_messages', 'sync_point_conflicts', 'peak_memory_kb',
+    'memory_source',
+)
+
+MEMORY_SOURCES = (
+    TRACEMALLOC, PROCESS_MAXRSS,
+) = (
+    'tracemalloc', 'process_maxrss',
+)
+
+NESTED_TEMPLATE = 'nested.yaml'
+
+
+def _test_resource(value, depends_on=None):
+    defn = {'type': 'OS::Heat::TestResource',
+            'properties': {'a': value}}
+    if depends_on:
+        defn['depends_on'] = depends_on
+    return defn
+
+
+def _hot(resources, parameters=None):
+    tmpl = {'heat_template_version': '2013-05-23',
+            'resources': resources}
+    if parameters:
+        tmpl['parameters'] = parameters
+    return tmpl
+
+
+def generate_template(shape, size, value='a'):
+    """Return a template and its files for a synthetic stack.
+
+    The size is the number of resources in the top-level stack. Each nested
+    stack of the 'nested' shape adds two more resources. Generating the same
+    shape and size with a different value produces an update that changes
+    every resource in place.
+    """
+    files = {}
+    if shape == WIDE:
+        resources = dict(('r%d' % i, _test_resource(value))
+                         for i in range(size))
+    elif shape == DEEP:
+        resources = dict(('r%d' % i,
+                          _test_resource(value,
+                                         ['r%d' % (i - 1)] if i else None))
+                         for i in range(size))
+    elif shape == GROUP:
+        resources = {
+            'group': {
+                'type': 'OS::Heat::ResourceGroup',
+                'properties': {
+                    'count': size,
+                    'resource_def': _test_resource(value),
+                },
+            },
+        }
+    elif shape == NESTED:
+        nested = _hot({'first': _test_resource({'get_param': 'a'}),
+                       'second': _test_resource({'get_param': 'a'},
+                                                ['first'])},
+                      parameters={'a': {'type': 'string'}})
+        files[NESTED_TEMPLATE] = json.dumps(nested)
+        resources = dict(('r%d' % i, {'type': NESTED_TEMPLATE,
+                                      'properties': {'a': value}})
+                         for i in range(size))
+    else:
+        raise ValueError('Unknown stack shape "%s"' % shape)
+
+    return _hot(resources), files
+
+
+def _process_maxrss():
+    """Return the peak resident memory of the whole process so far, in KB."""
+    maxrss = resource_usage.getrusage(resource_usage.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Reported in bytes rather than KB
+        maxrss //= 1024
+    return maxrss
+
+
+class _Measurement(object):
+    """Collect the cost of a single stack operation.
+
+    Tracing memory allocations slows the operation down several times over,
+    so when trace_memory is set the wall time is not representative, and
+    only the peak memory should be used. Otherwise the peak memory is that
+    of the whole process over its lifetime.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.db_queries = 0
+        self.rpc_messages = 0
+
+    def count_query(self, *args, **kwargs):
+        self.db_queries += 1
+
+    def __enter__(self):
+        sqlalchemy.event.listen(db_api.get_engine(), 'before_cursor_execute',
+                                self.count_query)
+        sync_point.reset_stats()
+        if self.trace_memory:
+            tracemalloc.start()
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wall_time = time.time() - self.start
+        if self.trace_memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1] // 1024
+            self.memory_source = TRACEMALLOC
+            tracemalloc.stop()
+        else:
+            self.peak_memory = _process_maxrss()
+            self.memory_source = PROCESS_MAXRSS
+        self.sync_point_conflicts = sync_point.stats()[
+            sync_point.STAT_CONFLICTS]
+        sqlalchemy.event.remove(db_api.get_engine(), 'before_cursor_execute',
+                                self.count_query)
+        return False
+
+
+class Benchmark(object):
+    """Run stack operations in one engine mode and measure their cost.
+
+    The RPC clients are patched for the lifetime of the test case, so that
+    engine calls are handled by an in-process engine and worker messages are
+    queued for the simulator's event loop.
+    """
+
+    def __init__(self, testcase, procs, mode):
+        self.procs = procs
+        self.mode = mode
+        self.measurement = None
+        self.cnxt = utils.dummy_context()
+
+        cfg.CONF.set_override('convergence_engine', mode == CONVERGENCE,
+                              enforce_type=True)
+
+        self.engine = service.EngineService('host', 'engine')
+        self.engine.engine_id = service_utils.generate_engine_id()
+        self.engine.thread_group_mgr = (
+            engine_wrapper.SynchronousThreadGroupManager())
+        self.engine.worker_service = procs.worker
+
+        testcase.patchobject(rpc_client.EngineClient, 'call',
+                             side_effect=self._engine_call)
+        testcase.patchobject(rpc_client.EngineClient, 'cast',
+                             side_effect=self._engine_call)
+        testcase.patchobject(worker_client.WorkerClient, 'check_resource',
+                             side_effect=self._check_resource)
+        testcase.patchobject(worker_client.WorkerClient,
+                             'cancel_check_resource',
+                             side_effect=self._count_rpc_message)
+
+    def _count_rpc_message(self, *args, **kwargs):
+        if self.measurement is not None:
+            self.measurement.rpc_messages += 1
+
+    def _engine_call(self, ctxt, msg, version=None, timeout=None):
+        self._count_rpc_message()
+        method, kwargs = msg
+        try:
+            result = getattr(self.engine, method)(ctxt, **kwargs)
+        except dispatcher.ExpectedException as ex:
+            six.reraise(*ex.exc_info)
+        # A real engine would process the work for e.g. a nested stack
+        # concurrently; here it must be done before the caller carries on.
+        self.procs.event_loop()
+        return result
+
+    def _check_resource(self, *args, **kwargs):
+        self._count_rpc_message()
+        return self.procs.worker.check_resource(*args, **kwargs)
+
+    def _identity(self, stack_name):
+        db_stack = db_api.stack_get_by_name(self.cnxt, stack_name)
+        return {'stack_name': stack_name,
+                'stack_id': db_stack.id,
+                'tenant': db_stack.tenant,
+                'path': ''}
+
+    def _run(self, operation, stack_name, template=None, files=None):
+        if operation == CREATE:
+            self.engine.create_stack(self.cnxt, stack_name, template,
+                                     params={}, files=files,
+                                     environment_files=None, args={})
+        elif operation == UPDATE:
+            self.engine.update_stack(self.cnxt, self._identity(stack_name),
+                                     template, params={}, files=files,
+                                     environment_files=None, args={})
+        elif operation == DELETE:
+            self.engine.delete_stack(self.cnxt, self._identity(stack_name))
+        self.procs.event_loop()
+
+    def measure(self, operation, stack_name, template=None, files=None,
+                trace_memory=False):
+        """Run a stack operation and return its cost.
+
+        The result is a dict of the RESULT_KEYS that describe the operation
+        and its cost; the shape and size are left for the caller to fill in.
+        """
+        stack_id = None
+        if operation != CREATE:
+            stack_id = self._identity(stack_name)['stack_id']
+
+        with _Measurement(trace_memory) as measurement:
+            self.measurement = measurement
+            try:
+                self._run(operation, stack_name, template, files)
+            finally:
+                self.measurement = None
+
+        if stack_id is None:
+            stack_id = self._identity(stack_name)['stack_id']
+        db_stack = db_api.stack_get(self.cnxt, stack_id, show_deleted=True)
+
+        return {
+            RESULT_MODE: self.mode,
+            RESULT_OPERATION: operation,
+            RESULT_STACK_STATUS: '%s_%s' % (db_stack.action,
+                                            db_stack.status),
+            RESULT_WALL_TIME: measurement.wall_time,
+            RESULT_DB_QUERIES: measurement.db_queries,
+            RESULT_RPC_MESSAGES: measurement.rpc_messages,
+            RESULT_SYNC_POINT_CONFLICTS: measurement.sync_point_conflicts,
+            RESULT_PEAK_MEMORY: measurement.peak_memory,
+            RESULT_MEMORY_SOURCE: measurement.memory_source,
+        }
+
+    def _run_all(self, stack_name, shape, size, trace_memory=False):
+        template, files = generate_template(shape, size)
+        updated, updated_files = generate_template(shape, size, value='b')
+        return [
+            self.measure(CREATE, stack_name, template, files, trace_memory),
+            self.measure(UPDATE, stack_name, updated, updated_files,
+                         trace_memory),
+            self.measure(DELETE, stack_name, trace_memory=trace_memory),
+        ]
+
+    def run(self, shape, size):
+        """Create, update and delete a synthetic stack.
+
+        Return a list of the results of each operation. The operations are
+        timed without tracing memory allocations. Where tracemalloc is
+        available, they are then repeated on a second stack to measure the
+        peak memory of each.
+        """
+        stack_name = '%s_%s_%d' % (self.mode, shape, size)
+        results = self._run_all(stack_name, shape, size)
+        if tracemalloc is not None:
+            traced = self._run_all(stack_name + '_memory', shape, size,
+                                   trace_memory=True)
+            for result, traced_result in zip(results, traced):
+                result[RESULT_PEAK_MEMORY] = traced_result[RESULT_PEAK_MEMORY]
+                result[RESULT_MEMORY_SOURCE] = TRACEMALLOC
+        for result in results:
+            result[RESULT_SHAPE] = shape
+            result[RESULT_SIZE] = size
+        return results
+
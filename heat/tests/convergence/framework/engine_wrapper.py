@@ -22,6 +22,19 @@ from heat.tests.convergence.framework import scenario_template
 from heat.tests import utils
 
 
+class SynchronousThread(object):
+    """Stand-in for a green thread that has already run to completion."""
+
+    def __init__(self, result):
+        self.result = result
+
+    def link(self, func, *args, **kwargs):
+        func(self, *args, **kwargs)
+
+    def wait(self):
+        return self.result
+
+
 class SynchronousThreadGroupManager(service.ThreadGroupManager):
     """Wrapper for thread group manager.
 
@@ -30,7 +43,7 @@ class SynchronousThreadGroupManager(service.ThreadGroupManager):
     tests can be run.
     """
     def start(self, stack_id, func, *args, **kwargs):
-        func(*args, **kwargs)
+        return SynchronousThread(func(*args, **kwargs))
 
 
 class Engine(message_processor.MessageProcessor):
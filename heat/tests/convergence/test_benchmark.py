@@ -0,0 +1,63 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks of stack operations on synthetic stacks.
+
+By default each benchmark runs once on a small stack, to keep the harness
+working. To measure larger stacks, set HEAT_BENCHMARK_SIZES to a
+comma-separated list of stack sizes and HEAT_BENCHMARK_OUTPUT to a directory
+in which to write a JSON report for each benchmark, e.g.:
+
+    HEAT_BENCHMARK_SIZES=10,100,1000 HEAT_BENCHMARK_OUTPUT=/tmp/bench \\
+        python -m testtools.run heat.tests.convergence.test_benchmark
+"""
+
+from heat.engine import resource
+from heat.tests import benchmark_utils
+from heat.tests import common
+from heat.tests.convergence.framework import benchmark
+from heat.tests.convergence.framework import fake_resource
+from heat.tests.convergence.framework import processes
+
+
+class BenchmarkTest(common.HeatTestCase):
+
+    scenarios = [('%s_%s' % (mode, shape), {'mode': mode, 'shape': shape})
+                 for mode in benchmark.MODES
+                 for shape in benchmark.SHAPES]
+
+    def setUp(self):
+        super(BenchmarkTest, self).setUp()
+        resource._register_class('OS::Heat::TestResource',
+                                 fake_resource.TestResource)
+        self.procs = processes.Processes()
+        self.procs.clear()
+        self.sizes = benchmark_utils.sizes('HEAT_BENCHMARK_SIZES', '3')
+
+    def test_benchmark(self):
+        bench = benchmark.Benchmark(self, self.procs, self.mode)
+        results = []
+        for size in self.sizes:
+            results.extend(bench.run(self.shape, size))
+
+        self.assertEqual(['CREATE_COMPLETE', 'UPDATE_COMPLETE',
+                          'DELETE_COMPLETE'] * len(self.sizes),
+                         [r[benchmark.RESULT_STACK_STATUS] for r in results])
+        for result in results:
+            self.assertEqual(set(benchmark.RESULT_KEYS), set(result))
+            self.assertTrue(result[benchmark.RESULT_DB_QUERIES] > 0)
+
+        path = benchmark_utils.report_path('%s_%s' % (self.mode,
+                                                      self.shape))
+        if path:
+            benchmark_utils.write_report(results, path)
@@ -760,6 +760,74 @@ class HeatMigrationsCheckers(test_migrations.WalkVersionsMixin,
         self.assertEqual('resource', fk['referred_table'])
         self.assertEqual(['id'], fk['referred_columns'])
 
+    def _pre_upgrade_074(self, engine):
+        raw_template = utils.get_table(engine, 'raw_template')
+        templ = [dict(id=970, template='{}', files='{}')]
+        engine.execute(raw_template.insert(), templ)
+
+        user_creds = utils.get_table(engine, 'user_creds')
+        user = [dict(id=970, username='test_user', password='password',
+                     tenant='test_project', auth_url='bla',
+                     tenant_id=str(uuid.uuid4()),
+                     trust_id='',
+                     trustor_user_id='')]
+        engine.execute(user_creds.insert(), user)
+
+        # Make a nested tree root->child->grandchild
+        stack = utils.get_table(engine, 'stack')
+        root_sid = '4f6a2c1e-8d3b-4a07-9e5c-1b7d0a3f6e21'
+        child_sid = 'c2e8b4d0-5a19-4f63-8b7e-3d6a9f1c0e54'
+        grandchild_sid = '7b1d9e3a-0c45-4e8f-a6d2-5f8c3b7e1a90'
+        stack_ids = [(root_sid, None),
+                     (child_sid, root_sid),
+                     (grandchild_sid, child_sid)]
+        stacks = [dict(id=sid, name=sid,
+                       owner_id=owner_id,
+                       raw_template_id=templ[0]['id'],
+                       user_creds_id=user[0]['id'],
+                       username='test_user',
+                       disable_rollback=True,
+                       parameters='test_params',
+                       created_at=timeutils.utcnow(),
+                       deleted_at=None)
+                  for sid, owner_id in stack_ids]
+        engine.execute(stack.insert(), stacks)
+
+        event_table = utils.get_table(engine, 'event')
+        events = [dict(id=970 + i, uuid=str(uuid.uuid4()), stack_id=sid,
+                       resource_action='CREATE',
+                       resource_status='COMPLETE',
+                       created_at=timeutils.utcnow())
+                  for i, (sid, owner_id) in enumerate(stack_ids)]
+        engine.execute(event_table.insert(), events)
+        return root_sid, events
+
+    def _check_074(self, engine, data):
+        self.assertColumnExists(engine, 'event', 'root_stack_id')
+        self.assertIndexExists(engine, 'event', 'ix_event_root_stack_id')
+        self.assertIndexMembers(engine, 'event', 'ix_event_root_stack_id',
+                                ['root_stack_id', 'id'])
+
+        root_sid, events = data
+        event_table = utils.get_table(engine, 'event')
+        ev_in_db = dict((e.id, e) for e in event_table.select().execute())
+        # confirm the event.root_stack_id is set for the whole tree
+        for ev in events:
+            self.assertEqual(root_sid, ev_in_db[ev['id']].root_stack_id)
+
+    def _check_075(self, engine, data):
+        self.assertColumnExists(engine, 'stack', 'output_cache')
+
+    def _check_076(self, engine, data):
+        self.assertColumnExists(engine, 'stack_lock', 'expires_at')
+
+    def _check_077(self, engine, data):
+        self.assertColumnExists(engine, 'stack_trace', 'stack_id')
+        self.assertColumnExists(engine, 'stack_trace', 'operation')
+        self.assertColumnExists(engine, 'stack_trace', 'spans')
+        self.assertIndexExists(engine, 'stack_trace',
+                               'ix_stack_trace_stack_id_operation')
+
 
 class TestHeatMigrationsMySQL(HeatMigrationsCheckers,
                               test_base.MySQLOpportunisticTestCase):
@@ -16,6 +16,8 @@ import datetime
 import fixtures
 import json
 import logging
+import multiprocessing
+import os
 import time
 import uuid
 
@@ -33,6 +35,7 @@ from heat.common import context
 from heat.common import exception
 from heat.common import template_format
 from heat.db.sqlalchemy import api as db_api
+from heat.db.sqlalchemy import models
 from heat.engine.clients.os import glance
 from heat.engine.clients.os import nova
 from heat.engine import environment
@@ -634,6 +637,42 @@ class SqlAlchemyTest(common.HeatTestCase):
                                                          'tag3'])
         self.assertEqual(3, len(st_db))
 
+    def test_stack_get_all_summary(self):
+        stacks = [self._setup_test_stack('stack', x)[1] for x in UUIDs]
+        stacks[0].tags = ['tag1', 'tag2']
+        stacks[0].store()
+
+        st_db = db_api.stack_get_all_summary(self.ctx, ['name', 'status',
+                                                        'tags'])
+        self.assertEqual(3, len(st_db))
+        by_id = dict((s['id'], s) for s in st_db)
+        self.assertEqual(set(UUIDs), set(by_id))
+        self.assertEqual({'id', 'name', 'status', 'tags'},
+                         set(by_id[UUID1]))
+        self.assertEqual('stack', by_id[UUID1]['name'])
+        self.assertEqual(stacks[0].status, by_id[UUID1]['status'])
+        self.assertEqual(['tag1', 'tag2'], sorted(by_id[UUID1]['tags']))
+        self.assertEqual([], by_id[UUID2]['tags'])
+
+    def test_stack_get_all_summary_pages_and_filters(self):
+        for i, stack_id in enumerate(UUIDs):
+            self._setup_test_stack('stack%d' % i, stack_id)
+
+        st_db = db_api.stack_get_all_summary(self.ctx, ['name'],
+                                             sort_keys=['name'],
+                                             sort_dir='asc', limit=2)
+        self.assertEqual(['stack0', 'stack1'], [s['name'] for s in st_db])
+
+        st_db = db_api.stack_get_all_summary(self.ctx, ['name'],
+                                             sort_keys=['name'],
+                                             sort_dir='asc', limit=2,
+                                             marker=UUID2)
+        self.assertEqual(['stack2'], [s['name'] for s in st_db])
+
+        st_db = db_api.stack_get_all_summary(self.ctx, ['name'],
+                                             filters={'name': 'stack1'})
+        self.assertEqual([UUID2], [s['id'] for s in st_db])
+
     def test_stack_get_all_by_not_tags(self):
         stacks = [self._setup_test_stack('stack', x)[1] for x in UUIDs]
         stacks[0].tags = ['tag1']
@@ -728,6 +767,22 @@ class SqlAlchemyTest(common.HeatTestCase):
         st_db = db_api.stack_count_all(self.ctx, show_deleted=True)
         self.assertEqual(3, st_db)
 
+    def test_stack_count_all_approximate(self):
+        cfg.CONF.set_override('approximate_stack_count_limit', 2,
+                              enforce_type=True)
+        for stack_id in UUIDs:
+            self._setup_test_stack('stack', stack_id)
+
+        st_db = db_api.stack_count_all(self.ctx, approximate=True)
+        self.assertEqual(2, st_db)
+
+        st_db = db_api.stack_count_all(self.ctx, approximate=True,
+                                       filters={'id': UUID1})
+        self.assertEqual(1, st_db)
+
+        st_db = db_api.stack_count_all(self.ctx)
+        self.assertEqual(3, st_db)
+
     def test_count_all_hidden_tags(self):
         cfg.CONF.set_override('hidden_stack_tags', ['hidden'],
                               enforce_type=True)
@@ -2006,6 +2061,91 @@ class DBAPIStackTest(common.HeatTestCase):
         self._deleted_stack_existance(utils.dummy_context(), stacks,
                                       tmpl_files, (), (0, 1, 2, 3, 4))
 
+    def test_purge_deleted_in_batches(self):
+        now = timeutils.utcnow()
+        delta = datetime.timedelta(seconds=3600 * 7)
+        deleted = [now - delta * i for i in range(1, 6)]
+        tmpl_files = [template_files.TemplateFiles(
+            {'foo': 'file contents %d' % i}) for i in range(5)]
+        [tmpl_file.store(self.ctx) for tmpl_file in tmpl_files]
+        templates = [create_raw_template(self.ctx,
+                                         files_id=tmpl_files[i].files_id
+                                         ) for i in range(5)]
+        creds = [create_user_creds(self.ctx) for i in range(5)]
+        stacks = [create_stack(self.ctx, templates[i], creds[i],
+                               deleted_at=deleted[i]) for i in range(5)]
+        mock_sleep = self.patchobject(time, 'sleep')
+
+        self.assertEqual(4, db_api.purge_deleted(age=3600,
+                                                 granularity='seconds',
+                                                 batch_size=2, pause=1.5))
+        self._deleted_stack_existance(utils.dummy_context(), stacks,
+                                      tmpl_files, (0,), (1, 2, 3, 4))
+        self.assertEqual([mock.call(1.5)], mock_sleep.call_args_list)
+
+        self.assertEqual(1, db_api.purge_deleted(age=0,
+                                                 granularity='seconds',
+                                                 batch_size=2))
+        self._deleted_stack_existance(utils.dummy_context(), stacks,
+                                      tmpl_files, (), (0, 1, 2, 3, 4))
+        self.assertEqual(0, db_api.purge_deleted(age=0,
+                                                 granularity='seconds'))
+
+    def test_purge_deleted_oldest_first(self):
+        now = timeutils.utcnow()
+        delta = datetime.timedelta(seconds=3600 * 7)
+        deleted = [now - delta * i for i in range(1, 4)]
+        stacks = [create_stack(self.ctx, self.template, self.user_creds,
+                               deleted_at=deleted[i]) for i in range(3)]
+        processed = []
+
+        def purge_stacks(conn, meta, batch):
+            processed.append([s[0] for s in batch])
+            return purge(conn, meta, batch)
+
+        purge = db_api._purge_stacks
+        self.patchobject(db_api, '_purge_stacks', side_effect=purge_stacks)
+
+        db_api.purge_deleted(age=0, granularity='seconds', batch_size=2)
+        self.assertEqual([[stacks[2].id, stacks[1].id], [stacks[0].id]],
+                         processed)
+
+    def test_purge_deleted_batch_rolled_back(self):
+        now = timeutils.utcnow()
+        delta = datetime.timedelta(seconds=3600 * 7)
+        stacks = [create_stack(self.ctx, self.template, self.user_creds,
+                               deleted_at=now - delta * i)
+                  for i in range(1, 5)]
+        purge = db_api._purge_stacks
+        calls = []
+
+        def purge_stacks(conn, meta, batch):
+            calls.append(batch)
+            purge(conn, meta, batch)
+            if len(calls) == 2:
+                raise exception.Error('boom')
+
+        self.patchobject(db_api, '_purge_stacks', side_effect=purge_stacks)
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=0, granularity='seconds', batch_size=2)
+
+        # The first batch was committed and the second rolled back
+        ctx = utils.dummy_context()
+        ctx.is_admin = True
+        for s in stacks[2:]:
+            self.assertIsNone(db_api.stack_get(ctx, s.id, show_deleted=True))
+        for s in stacks[:2]:
+            self.assertIsNotNone(db_api.stack_get(ctx, s.id,
+                                                  show_deleted=True))
+
+    def test_purge_deleted_invalid_batch(self):
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=1, batch_size=0)
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=1, batch_size='big')
+        self.assertRaises(exception.Error, db_api.purge_deleted,
+                          age=1, pause=-1)
+
     def test_purge_project_deleted(self):
         now = timeutils.utcnow()
         delta = datetime.timedelta(seconds=3600 * 7)
@@ -2380,6 +2520,28 @@ class DBAPIResourceTest(common.HeatTestCase):
         for rsrc_id, res in resources.items():
             self.assertIn(res.name, ['res2', 'res3', 'res4', 'res5', 'res6'])
 
+    def test_resource_get_summaries_by_stack(self):
+        values = [
+            {'name': 'res1', 'action': rsrc.Resource.DELETE,
+             'status': rsrc.Resource.COMPLETE},
+            {'name': 'res2', 'action': rsrc.Resource.CREATE,
+             'status': rsrc.Resource.FAILED},
+            {'name': 'res3', 'action': rsrc.Resource.UPDATE,
+             'status': rsrc.Resource.COMPLETE, 'replaced_by': 42},
+            {'name': 'res3', 'action': rsrc.Resource.CREATE,
+             'status': rsrc.Resource.IN_PROGRESS},
+        ]
+        [create_resource(self.ctx, self.stack, **val) for val in values]
+        stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        create_resource(self.ctx, stack1, name='res4')
+
+        summaries = db_api.resource_get_summaries_by_stack(self.ctx,
+                                                           self.stack.id)
+        self.assertEqual([('res2', rsrc.Resource.FAILED),
+                          ('res3', rsrc.Resource.IN_PROGRESS)],
+                         sorted((name, status)
+                                for name, status, created in summaries))
+
     def test_resource_get_all_by_root_stack(self):
         self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
         self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
@@ -2534,6 +2696,51 @@ class DBAPIStackLockTest(common.HeatTestCase):
         observed = db_api.stack_lock_release(self.ctx, self.stack.id, UUID2)
         self.assertTrue(observed)
 
+    def test_stack_lock_lease(self):
+        db_api.stack_lock_create(self.ctx, self.stack.id, UUID1,
+                                 lease_duration=60)
+        self.assertFalse(db_api.stack_lock_lease_expired(self.ctx,
+                                                         self.stack.id))
+
+        self.assertEqual(1, db_api.stack_lock_renew(self.ctx, UUID1, 60))
+        self.assertEqual(0, db_api.stack_lock_renew(self.ctx, UUID2, 60))
+        self.assertFalse(db_api.stack_lock_lease_expired(self.ctx,
+                                                         self.stack.id))
+
+        # A negative duration backdates the lease by the database's clock
+        db_api.stack_lock_renew(self.ctx, UUID1, -60)
+        self.assertTrue(db_api.stack_lock_lease_expired(self.ctx,
+                                                        self.stack.id))
+
+    def test_stack_lock_no_lease(self):
+        self.assertIsNone(db_api.stack_lock_lease_expired(self.ctx,
+                                                          self.stack.id))
+        db_api.stack_lock_create(self.ctx, self.stack.id, UUID1)
+        self.assertIsNone(db_api.stack_lock_lease_expired(self.ctx,
+                                                          self.stack.id))
+
+    def test_stack_lock_steal_expired_lease(self):
+        db_api.stack_lock_create(self.ctx, self.stack.id, UUID1,
+                                 lease_duration=-60)
+
+        observed = db_api.stack_lock_steal(self.ctx, self.stack.id,
+                                           UUID1, UUID2, lease_duration=60)
+        self.assertIsNone(observed)
+        self.assertEqual(UUID2, db_api.stack_lock_get_engine_id(
+            self.ctx, self.stack.id))
+        self.assertFalse(db_api.stack_lock_lease_expired(self.ctx,
+                                                         self.stack.id))
+
+    def test_stack_lock_steal_fail_renewed_lease(self):
+        db_api.stack_lock_create(self.ctx, self.stack.id, UUID1,
+                                 lease_duration=60)
+
+        observed = db_api.stack_lock_steal(self.ctx, self.stack.id,
+                                           UUID1, UUID2, lease_duration=60)
+        self.assertEqual(UUID1, observed)
+        self.assertEqual(UUID1, db_api.stack_lock_get_engine_id(
+            self.ctx, self.stack.id))
+
     @mock.patch.object(time, 'sleep')
     def test_stack_lock_retry_on_deadlock(self, sleep):
         with mock.patch('sqlalchemy.orm.Session.add',
@@ -2703,6 +2910,62 @@ class DBAPIEventTest(common.HeatTestCase):
         events = db_api.event_get_all_by_stack(self.ctx, self.stack2.id)
         self.assertEqual(1, len(events))
 
+    def test_event_get_all_by_root_stack(self):
+        root = create_stack(self.ctx, self.template, self.user_creds,
+                            nested_depth=0)
+        child = create_stack(self.ctx, self.template, self.user_creds,
+                             owner_id=root.id, nested_depth=1)
+        grandchild = create_stack(self.ctx, self.template, self.user_creds,
+                                  owner_id=child.id, nested_depth=2)
+        other = create_stack(self.ctx, self.template, self.user_creds,
+                             nested_depth=0)
+        values = [
+            {'stack_id': root.id, 'resource_name': 'res1'},
+            {'stack_id': child.id, 'resource_name': 'res2'},
+            {'stack_id': grandchild.id, 'resource_name': 'res3'},
+            {'stack_id': other.id, 'resource_name': 'res4'},
+            {'stack_id': root.id, 'resource_name': 'res5'},
+        ]
+        events = [create_event(self.ctx, root_stack_id=(
+            other.id if val['stack_id'] == other.id else root.id), **val)
+            for val in values]
+
+        result = db_api.event_get_all_by_root_stack(self.ctx, root.id,
+                                                    nested_depth=2)
+        self.assertEqual(['res5', 'res3', 'res2', 'res1'],
+                         [e.resource_name for e in result])
+
+        result = db_api.event_get_all_by_root_stack(self.ctx, root.id,
+                                                    nested_depth=1)
+        self.assertEqual(['res5', 'res2', 'res1'],
+                         [e.resource_name for e in result])
+
+        # events of deleted nested stacks are excluded
+        db_api.stack_delete(self.ctx, child.id)
+        result = db_api.event_get_all_by_root_stack(self.ctx, root.id,
+                                                    nested_depth=2)
+        self.assertEqual(['res5', 'res3', 'res1'],
+                         [e.resource_name for e in result])
+
+        # list the events after a marker, oldest first
+        result = db_api.event_get_all_by_root_stack(self.ctx, root.id,
+                                                    marker=events[0].uuid,
+                                                    sort_dir='asc',
+                                                    nested_depth=2)
+        self.assertEqual(['res3', 'res5'],
+                         [e.resource_name for e in result])
+
+    def test_event_get_all_by_stack_keyset(self):
+        self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
+        events = [create_event(self.ctx, stack_id=self.stack1.id,
+                               resource_name='res%d' % i) for i in range(4)]
+
+        result = db_api.event_get_all_by_stack(self.ctx, self.stack1.id,
+                                               marker=events[1].uuid,
+                                               sort_dir='asc', keyset=True)
+        self.assertEqual(['res2', 'res3'],
+                         [e.resource_name for e in result])
+
     def test_event_count_all_by_stack(self):
         self.stack1 = create_stack(self.ctx, self.template, self.user_creds)
         self.stack2 = create_stack(self.ctx, self.template, self.user_creds)
@@ -2720,6 +2983,52 @@ class DBAPIEventTest(common.HeatTestCase):
                                                             self.stack2.id))
 
 
+class DBAPIStackTraceTest(common.HeatTestCase):
+    def setUp(self):
+        super(DBAPIStackTraceTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        self.template = create_raw_template(self.ctx)
+        self.user_creds = create_user_creds(self.ctx)
+        self.stack = create_stack(self.ctx, self.template, self.user_creds)
+
+    def _store(self, operation, stack_id=None):
+        db_api.stack_trace_create(self.ctx, {
+            'stack_id': stack_id or self.stack.id,
+            'operation': operation,
+            'action': 'UPDATE',
+            'spans': []})
+
+    def _operations(self, stack_id=None):
+        traces = self.ctx.session.query(models.StackTrace).filter_by(
+            stack_id=stack_id or self.stack.id).order_by(models.StackTrace.id)
+        return [t.operation for t in traces]
+
+    def test_stack_trace_get_latest(self):
+        self._store('op1')
+        self._store('op2')
+        self._store('op2')
+        traces = db_api.stack_trace_get_all_by_stack(self.ctx, self.stack.id)
+        self.assertEqual(['op2', 'op2'], [t.operation for t in traces])
+
+    def test_stack_trace_old_operations_pruned(self):
+        cfg.CONF.set_override('max_traced_operations_per_stack', 2,
+                              enforce_type=True)
+        other = create_stack(self.ctx, self.template, self.user_creds)
+        self._store('other', stack_id=other.id)
+        self._store('op1')
+        self._store('op1')
+        self._store('op2')
+        self.assertEqual(['op1', 'op1', 'op2'], self._operations())
+
+        # Further traces of a known operation do not prune
+        self._store('op2')
+        self.assertEqual(['op1', 'op1', 'op2', 'op2'], self._operations())
+
+        self._store('op3')
+        self.assertEqual(['op2', 'op2', 'op3'], self._operations())
+        self.assertEqual(['other'], self._operations(other.id))
+
+
 class DBAPIWatchRuleTest(common.HeatTestCase):
     def setUp(self):
         super(DBAPIWatchRuleTest, self).setUp()
@@ -3020,6 +3329,70 @@ class DBAPIResourceUpdateTest(common.HeatTestCase):
         self.assertEqual(2, db_res.atomic_key)
 
 
+class DBAPIResourceUpdateBatchTest(common.HeatTestCase):
+    def setUp(self):
+        super(DBAPIResourceUpdateBatchTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        template = create_raw_template(self.ctx)
+        user_creds = create_user_creds(self.ctx)
+        stack = create_stack(self.ctx, template, user_creds)
+        self.resources = [create_resource(self.ctx, stack, atomic_key=0,
+                                          name='res%d' % i)
+                          for i in range(3)]
+
+    def test_update_batch(self):
+        updates = [{'id': r.id,
+                    'values': {'status': 'IN_PROGRESS',
+                               'needed_by': [i],
+                               'rsrc_metadata': {'index': i}}}
+                   for i, r in enumerate(self.resources)]
+        failed = db_api.resource_update_batch(self.ctx, updates)
+        self.assertEqual(set(), failed)
+        for i, r in enumerate(self.resources):
+            db_res = db_api.resource_get(self.ctx, r.id, refresh=True)
+            self.assertEqual('IN_PROGRESS', db_res.status)
+            self.assertEqual([i], db_res.needed_by)
+            self.assertEqual({'index': i}, db_res.rsrc_metadata)
+            self.assertEqual(0, db_res.atomic_key)
+
+    def test_update_batch_compare_and_swap(self):
+        res0, res1, res2 = self.resources
+        db_api.resource_update(self.ctx, res1.id, {'engine_id': 'engine-1'},
+                               0)
+        updates = [{'id': r.id,
+                    'values': {'needed_by': [r.id]},
+                    'atomic_key': 0}
+                   for r in self.resources]
+        updates.append({'id': res2.id, 'values': {'status': 'FAILED'}})
+        failed = db_api.resource_update_batch(self.ctx, updates)
+        self.assertEqual({res1.id}, failed)
+
+        db_res = db_api.resource_get(self.ctx, res0.id, refresh=True)
+        self.assertEqual([res0.id], db_res.needed_by)
+        self.assertEqual(1, db_res.atomic_key)
+        db_res = db_api.resource_get(self.ctx, res1.id, refresh=True)
+        self.assertIsNone(db_res.needed_by)
+        self.assertEqual(1, db_res.atomic_key)
+        db_res = db_api.resource_get(self.ctx, res2.id, refresh=True)
+        self.assertEqual([res2.id], db_res.needed_by)
+        self.assertEqual('FAILED', db_res.status)
+        self.assertEqual(1, db_res.atomic_key)
+
+    def test_update_batch_expected_engine_id(self):
+        res = self.resources[0]
+        db_api.resource_update(self.ctx, res.id, {'engine_id': 'engine-1'},
+                               0)
+        updates = [{'id': res.id,
+                    'values': {'engine_id': None},
+                    'atomic_key': 1,
+                    'expected_engine_id': 'engine-1'}]
+        self.assertEqual(set(),
+                         db_api.resource_update_batch(self.ctx, updates))
+        db_res = db_api.resource_get(self.ctx, res.id, refresh=True)
+        self.assertIsNone(db_res.engine_id)
+        self.assertEqual(2, db_res.atomic_key)
+
+
 class DBAPISyncPointTest(common.HeatTestCase):
     def setUp(self):
         super(DBAPISyncPointTest, self).setUp()
@@ -3265,7 +3638,8 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
 
         return db_api.raw_template_create(self.ctx, template)
 
-    def _test_db_encrypt_decrypt(self, template_ids, batch_size=50):
+    def _test_db_encrypt_decrypt(self, template_ids, batch_size=50,
+                                 workers=None):
         hidden_params_dict = {
             'param2': 'bar',
             'param_number': '456',
@@ -3276,8 +3650,14 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         def encrypt(enc_key=None):
             if enc_key is None:
                 enc_key = cfg.CONF.auth_encryption_key
-            self.assertEqual([], db_api.db_encrypt_parameters_and_properties(
-                self.ctx, enc_key, batch_size=batch_size))
+            if workers is None:
+                excs = db_api.db_encrypt_parameters_and_properties(
+                    self.ctx, enc_key, batch_size=batch_size)
+            else:
+                excs = db_api.db_crypt_parameters_and_properties(
+                    self.ctx, 'encrypt', enc_key, batch_size=batch_size,
+                    workers=workers)
+            self.assertEqual([], excs)
             for template_id in template_ids:
                 enc_tmpl = db_api.raw_template_get(self.ctx, template_id)
                 for param_name in hidden_params_dict.keys():
@@ -3300,8 +3680,14 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         def decrypt(encrypt_value, enc_key=None):
             if enc_key is None:
                 enc_key = cfg.CONF.auth_encryption_key
-            self.assertEqual([], db_api.db_decrypt_parameters_and_properties(
-                self.ctx, enc_key, batch_size=batch_size))
+            if workers is None:
+                excs = db_api.db_decrypt_parameters_and_properties(
+                    self.ctx, enc_key, batch_size=batch_size)
+            else:
+                excs = db_api.db_crypt_parameters_and_properties(
+                    self.ctx, 'decrypt', enc_key, batch_size=batch_size,
+                    workers=workers)
+            self.assertEqual([], excs)
             for template_id in template_ids:
                 dec_tmpl = db_api.raw_template_get(self.ctx, template_id)
                 self.assertNotEqual(
@@ -3385,6 +3771,143 @@ class DBAPICryptParamsPropsTest(common.HeatTestCase):
         template_ids = [tmpl1.id, tmpl2.id]
         self._test_db_encrypt_decrypt(template_ids, batch_size=1)
 
+    def test_db_crypt_parallel(self):
+        tmpl1 = self._create_template()
+        tmpl2 = self._create_template()
+        self.addCleanup(self._delete_templates, [tmpl1, tmpl2])
+        self._test_db_encrypt_decrypt([tmpl1.id, tmpl2.id], batch_size=1,
+                                      workers=1)
+
+    def test_db_crypt_worker_pool(self):
+        pool = mock.Mock()
+        pool.map.side_effect = lambda func, chunks: [func(c) for c in chunks]
+        mock_pool = self.patchobject(multiprocessing, 'Pool',
+                                     return_value=pool)
+
+        self.assertEqual([], db_api.db_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key, workers=2))
+        mock_pool.assert_called_once_with(2)
+        pool.close.assert_called_once_with()
+        pool.join.assert_called_once_with()
+        # one map call per batch of each table, each split into two chunks
+        self.assertEqual(2, pool.map.call_count)
+        for args, kwargs in pool.map.call_args_list:
+            self.assertEqual(2, len(args[1]))
+
+        tmpl = db_api.raw_template_get(self.ctx, self.template.id)
+        self.assertEqual('cryptography_decrypt_v1',
+                         tmpl.environment['parameters']['param2'][0])
+        res = db_api.resource_get(self.ctx, self.resources[0].id)
+        self.assertTrue(res.properties_data_encrypted)
+
+    def test_db_crypt_checkpoint(self):
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'checkpoint')
+        # resume after the raw_templates have all been processed
+        with open(checkpoint, 'w') as f:
+            json.dump({'operation': 'encrypt',
+                       'markers': {'raw_template': self.template.id}}, f)
+
+        self.assertRaises(exception.Error,
+                          db_api.db_crypt_parameters_and_properties,
+                          self.ctx, 'decrypt', cfg.CONF.auth_encryption_key,
+                          checkpoint=checkpoint)
+        self.assertEqual([], db_api.db_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key,
+            checkpoint=checkpoint))
+
+        tmpl = db_api.raw_template_get(self.ctx, self.template.id)
+        self.assertEqual('bar', tmpl.environment['parameters']['param2'])
+        res = db_api.resource_get(self.ctx, self.resources[0].id)
+        self.assertTrue(res.properties_data_encrypted)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_db_crypt_checkpoint_saved(self):
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'checkpoint')
+        self.patchobject(db_api, '_crypt_values',
+                         side_effect=[[], exception.Error('interrupted')])
+
+        self.assertRaises(exception.Error,
+                          db_api.db_crypt_parameters_and_properties,
+                          self.ctx, 'encrypt', cfg.CONF.auth_encryption_key,
+                          checkpoint=checkpoint)
+        with open(checkpoint) as f:
+            self.assertEqual({'operation': 'encrypt',
+                              'markers': {'raw_template': self.template.id}},
+                             json.load(f))
+
+    def test_db_crypt_concurrent_modification(self):
+        crypt_values = db_api._crypt_values
+        resource_id = self.resources[0].id
+
+        def modify_resource(args):
+            result = crypt_values(args)
+            res = db_api.resource_get(self.ctx, resource_id)
+            db_api.resource_update(self.ctx, resource_id,
+                                   {'status': 'modified'}, res.atomic_key)
+            return result
+
+        self.patchobject(db_api, '_crypt_values',
+                         side_effect=modify_resource)
+        excs = db_api.db_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key)
+        self.assertEqual(1, len(excs))
+        self.assertIsInstance(excs[0], exception.Error)
+        res = db_api.resource_get(self.ctx, resource_id)
+        self.assertFalse(res.properties_data_encrypted)
+        self.assertEqual('bar1', res.properties_data['foo1'])
+
+    def test_db_crypt_checkpoint_retries_conflict(self):
+        checkpoint = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                  'checkpoint')
+        crypt_values = db_api._crypt_values
+        resource_id = self.resources[0].id
+
+        def modify_resource(args):
+            result = crypt_values(args)
+            if any(row_id == resource_id for row_id, values in args[2]):
+                res = db_api.resource_get(self.ctx, resource_id)
+                db_api.resource_update(self.ctx, resource_id,
+                                       {'status': 'modified'},
+                                       res.atomic_key)
+            return result
+
+        mock_crypt = self.patchobject(db_api, '_crypt_values',
+                                      side_effect=modify_resource)
+        excs = db_api.db_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key, batch_size=1,
+            checkpoint=checkpoint)
+        self.assertEqual(1, len(excs))
+        with open(checkpoint) as f:
+            markers = json.load(f)['markers']
+        self.assertTrue(markers['resource'] < resource_id)
+
+        # the same checkpoint resumes from the row that was modified
+        mock_crypt.side_effect = crypt_values
+        self.assertEqual([], db_api.db_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key, batch_size=1,
+            checkpoint=checkpoint))
+        res = db_api.resource_get(self.ctx, resource_id)
+        self.assertTrue(res.properties_data_encrypted)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_db_estimate_crypt(self):
+        estimates = db_api.db_estimate_crypt_parameters_and_properties(
+            self.ctx, 'encrypt', cfg.CONF.auth_encryption_key, batch_size=1,
+            workers=2)
+        self.assertEqual({'raw_template', 'resource'}, set(estimates))
+        self.assertEqual(1, estimates['raw_template']['rows'])
+        self.assertEqual(1, estimates['resource']['rows'])
+        self.assertEqual(1, estimates['resource']['sampled'])
+        self.assertTrue(estimates['resource']['estimated_seconds'] >= 0)
+
+        # nothing is written
+        tmpl = db_api.raw_template_get(self.ctx, self.template.id)
+        self.assertEqual('bar', tmpl.environment['parameters']['param2'])
+        res = db_api.resource_get(self.ctx, self.resources[0].id)
+        self.assertFalse(res.properties_data_encrypted)
+
     def test_db_encrypt_decrypt_exception_continue(self):
         """Test that encryption and decryption proceed after an exception"""
         def create_malformed_template():
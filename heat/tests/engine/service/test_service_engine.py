@@ -21,6 +21,7 @@ from oslo_utils import timeutils
 from heat.common import context
 from heat.common import service_utils
 from heat.engine import service
+from heat.engine import stack_lock
 from heat.engine import worker
 from heat.objects import service as service_objects
 from heat.rpc import worker_api
@@ -40,7 +41,7 @@ class ServiceEngineTest(common.HeatTestCase):
 
     def test_make_sure_rpc_version(self):
         self.assertEqual(
-            '1.35',
+            '1.39',
             service.EngineService.RPC_API_VERSION,
             ('RPC version is changed, please update this test to new version '
              'and make sure additional test cases are added for RPC APIs '
@@ -128,6 +129,26 @@ class ServiceEngineTest(common.HeatTestCase):
         msg = 'Service %s update failed' % self.eng.service_id
         self.assertIn(msg, self.LOG.output)
 
+    @mock.patch.object(stack_lock, 'renew_leases')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_renew_stack_lock_leases(self, mock_admin_context,
+                                     mock_renew_leases):
+        mock_admin_context.return_value = self.ctx
+        self.eng.renew_stack_lock_leases()
+        mock_renew_leases.assert_called_once_with(self.ctx,
+                                                  'engine-fake-uuid')
+
+    @mock.patch.object(stack_lock, 'renew_leases')
+    @mock.patch.object(context, 'get_admin_context')
+    def test_renew_stack_lock_leases_fail(self, mock_admin_context,
+                                          mock_renew_leases):
+        mock_admin_context.return_value = self.ctx
+        mock_renew_leases.side_effect = Exception()
+        self.eng.renew_stack_lock_leases()
+        msg = ('Renewing the stack lock leases of engine engine-fake-uuid '
+               'failed')
+        self.assertIn(msg, self.LOG.output)
+
     def test_stop_rpc_server(self):
         with mock.patch.object(self.eng,
                                '_rpc_server') as mock_rpc_server:
@@ -310,6 +331,8 @@ class ServiceEngineTest(common.HeatTestCase):
         self.eng.service_id = 'sample-service-uuid'
 
         orig_stop = self.eng.thread_group_mgr.stop
+        flush = self.patchobject(service.service_software_config,
+                                 'flush_pending_pushes')
 
         with mock.patch.object(self.eng.thread_group_mgr, 'stop') as stop:
             stop.side_effect = orig_stop
@@ -328,6 +351,9 @@ class ServiceEngineTest(common.HeatTestCase):
                      mock.call('sample-uuid2', True)]
             self.eng.thread_group_mgr.stop.assert_has_calls(calls, True)
 
+            # Pending software deployment metadata
+            flush.assert_called_once_with()
+
             # # Manage Thread group
             self.eng.manage_thread_grp.stop.assert_called_with(False)
 
@@ -15,9 +15,11 @@ import datetime
 import uuid
 
 import mock
+from oslo_config import cfg
 from oslo_messaging.rpc import dispatcher
 from oslo_serialization import jsonutils as json
 from oslo_utils import timeutils
+import requests
 import six
 
 from heat.common import crypt
@@ -78,6 +80,10 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         super(SoftwareConfigServiceTest, self).setUp()
         self.ctx = utils.dummy_context()
         self.engine = service.EngineService('a-host', 'a-topic')
+        self._unpatched_publish = service_software_config._publish
+        # publish metadata synchronously
+        self.patchobject(service_software_config, '_publish',
+                         side_effect=lambda server_id, push: push())
 
     def _create_software_config(
             self, group='Heat::Shell', name='config_mysql', config=None,
@@ -531,6 +537,11 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         self.assertEqual('DEPLOY', updated['action'])
         self.assertEqual('WAITING', updated['status'])
         self.assertEqual(2, mock_push.call_count)
+        mock_push.assert_called_with(self.ctx, server_id, None,
+                                     removed_config_id=config_id,
+                                     added_config=mock.ANY)
+        self.assertEqual(config_id,
+                         mock_push.call_args[1]['added_config']['id'])
 
     def test_update_software_deployment_status(self):
 
@@ -552,7 +563,8 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         self.assertEqual('DEPLOY', updated['action'])
         self.assertEqual('WAITING', updated['status'])
 
-        mock_push.assert_called_once_with(self.ctx, server_id, None)
+        mock_push.assert_called_once_with(self.ctx, server_id, None,
+                                          added_config=mock.ANY)
 
     def test_update_software_deployment_fields(self):
 
@@ -603,8 +615,10 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
 
         # assert one call for the create, and one for the delete
         pmsd.assert_has_calls([
-            mock.call(self.ctx, deployment['server_id'], None),
-            mock.call(self.ctx, deployment['server_id'], None)
+            mock.call(self.ctx, deployment['server_id'], None,
+                      added_config=mock.ANY),
+            mock.call(self.ctx, deployment['server_id'], None,
+                      removed_config_id=deployment['config_id'])
         ])
 
         deployments = self.engine.list_software_deployments(
@@ -616,7 +630,7 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
                        'metadata_software_deployments')
     @mock.patch.object(db_api, 'resource_update')
     @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
-    @mock.patch.object(service_software_config.requests, 'put')
+    @mock.patch.object(requests.Session, 'put')
     def test_push_metadata_software_deployments(
             self, put, res_get, res_upd, md_sd):
         rs = mock.Mock()
@@ -645,7 +659,7 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
                        'metadata_software_deployments')
     @mock.patch.object(db_api, 'resource_update')
     @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
-    @mock.patch.object(service_software_config.requests, 'put')
+    @mock.patch.object(requests.Session, 'put')
     def test_push_metadata_software_deployments_retry(
             self, put, res_get, res_upd, md_sd):
         rs = mock.Mock()
@@ -674,7 +688,7 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
                        'metadata_software_deployments')
     @mock.patch.object(db_api, 'resource_update')
     @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
-    @mock.patch.object(service_software_config.requests, 'put')
+    @mock.patch.object(requests.Session, 'put')
     def test_push_metadata_software_deployments_temp_url(
             self, put, res_get, res_upd, md_sd):
         rs = mock.Mock()
@@ -744,6 +758,144 @@ class SoftwareConfigServiceTest(common.HeatTestCase):
         queue.post.assert_called_once_with(
             {'body': result_metadata, 'ttl': 3600})
 
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(db_api, 'resource_update')
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_incremental(
+            self, res_get, res_upd, md_sd):
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'original': 'metadata',
+                            'deployments': [{'id': 'c1', 'name': 'a'},
+                                            {'id': 'c2', 'name': 'c'}]}
+        rs.id = '1234'
+        rs.atomic_key = 1
+        rs.data = []
+        res_get.return_value = rs
+        res_upd.return_value = 1
+
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', None, removed_config_id='c1',
+            added_config={'id': 'c3', 'name': 'b'})
+        result_metadata = {
+            'original': 'metadata',
+            'deployments': [{'id': 'c3', 'name': 'b'},
+                            {'id': 'c2', 'name': 'c'}]
+        }
+        res_upd.assert_called_once_with(
+            self.ctx, '1234', {'rsrc_metadata': result_metadata}, 1)
+        md_sd.assert_not_called()
+
+    @mock.patch.object(service_software_config.SoftwareConfigService,
+                       'metadata_software_deployments')
+    @mock.patch.object(db_api, 'resource_update')
+    @mock.patch.object(db_api, 'resource_get_by_physical_resource_id')
+    def test_push_metadata_software_deployments_rebuild(
+            self, res_get, res_upd, md_sd):
+        rs = mock.Mock()
+        rs.rsrc_metadata = {'deployments': [{'id': 'c2', 'name': 'c'}]}
+        rs.id = '1234'
+        rs.atomic_key = 1
+        rs.data = []
+        res_get.return_value = rs
+        res_upd.return_value = 1
+        md_sd.return_value = [{'id': 'c3', 'name': 'b'}]
+
+        # the removed config is missing, so the metadata is rebuilt
+        self.engine.software_config._push_metadata_software_deployments(
+            self.ctx, '1234', None, removed_config_id='c1',
+            added_config={'id': 'c3', 'name': 'b'})
+        md_sd.assert_called_once_with(self.ctx, '1234')
+        res_upd.assert_called_once_with(
+            self.ctx, '1234',
+            {'rsrc_metadata': {'deployments': [{'id': 'c3', 'name': 'b'}]}},
+            1)
+
+    def test_update_deployments_metadata(self):
+        update = service_software_config.update_deployments_metadata
+        c1 = {'id': 'c1', 'name': 'a'}
+        c2 = {'id': 'c2', 'name': 'c'}
+        c3 = {'id': 'c3', 'name': 'b'}
+        c4 = {'id': 'c4', 'name': None}
+
+        self.assertEqual([c1, c3, c2], update([c1, c2], added_config=c3))
+        self.assertEqual([c4, c1], update([c1], added_config=c4))
+        self.assertEqual([c2], update([c1, c2], removed_config_id='c1'))
+        self.assertEqual([c1, c1], update([c1, c1, c1],
+                                          removed_config_id='c1'))
+        self.assertEqual([c3, c2], update([c1, c2], removed_config_id='c1',
+                                          added_config=c3))
+        self.assertIsNone(update([c2], removed_config_id='c1',
+                                 added_config=c3))
+
+    def test_update_deployments_metadata_already_added(self):
+        update = service_software_config.update_deployments_metadata
+        c1 = {'id': 'c1', 'name': 'a'}
+        c2 = {'id': 'c2', 'name': 'c'}
+        c3 = {'id': 'c3', 'name': 'b'}
+        c3_renamed = {'id': 'c3', 'name': 'd'}
+
+        # The metadata was rebuilt with the new config by a concurrent push
+        self.assertEqual([c1, c3, c2], update([c1, c3, c2], added_config=c3))
+        self.assertEqual([c3, c2], update([c1, c3, c2],
+                                          removed_config_id='c1',
+                                          added_config=c3))
+        self.assertEqual([c1, c2, c3_renamed],
+                         update([c1, c3, c2], added_config=c3_renamed))
+
+    def test_publish_coalesces(self):
+        cfg.CONF.set_override('deployment_metadata_publish_delay', 0.5,
+                              enforce_type=True)
+        self.patchobject(service_software_config, '_pending_pushes', new={})
+        self.patchobject(service_software_config, '_publishing', new=set())
+        mock_spawn = self.patchobject(service_software_config.eventlet,
+                                      'spawn_n')
+        mock_sleep = self.patchobject(service_software_config.eventlet,
+                                      'sleep')
+        pushes = [mock.Mock(), mock.Mock(), mock.Mock()]
+        # bypass the synchronous publishing from setUp
+        publish = self._unpatched_publish
+
+        publish('server1', pushes[0])
+        publish('server1', pushes[1])
+        publish('server2', pushes[2])
+        self.assertEqual([mock.call(service_software_config._publisher,
+                                    'server1'),
+                          mock.call(service_software_config._publisher,
+                                    'server2')],
+                         mock_spawn.call_args_list)
+
+        service_software_config._publisher('server1')
+        pushes[0].assert_not_called()
+        pushes[1].assert_called_once_with()
+        pushes[2].assert_not_called()
+        mock_sleep.assert_called_with(0.5)
+        self.assertEqual({'server2'}, service_software_config._publishing)
+
+    def test_publish_failure(self):
+        self.patchobject(service_software_config, '_pending_pushes', new={})
+        self.patchobject(service_software_config, '_publishing', new=set())
+        self.patchobject(service_software_config.eventlet, 'spawn_n',
+                         side_effect=lambda func, *args: func(*args))
+        self.patchobject(service_software_config.eventlet, 'sleep')
+        publish = self._unpatched_publish
+        push = mock.Mock(side_effect=Exception('boom'))
+
+        publish('server1', push)
+        push.assert_called_once_with()
+        self.assertEqual(set(), service_software_config._publishing)
+
+    def test_flush_pending_pushes(self):
+        pushes = {'server1': mock.Mock(side_effect=Exception('boom')),
+                  'server2': mock.Mock()}
+        self.patchobject(service_software_config, '_pending_pushes',
+                         new=dict(pushes))
+
+        service_software_config.flush_pending_pushes()
+        pushes['server1'].assert_called_once_with()
+        pushes['server2'].assert_called_once_with()
+        self.assertEqual({}, service_software_config._pending_pushes)
+
     @mock.patch.object(service_software_config.SoftwareConfigService,
                        'signal_software_deployment')
     @mock.patch.object(swift.SwiftClientPlugin, '_create')
@@ -233,7 +233,39 @@ class StackEventTest(common.HeatTestCase):
         mock_get_all.assert_called_once_with(self.ctx, 1, limit=limit,
                                              sort_keys=sort_keys,
                                              marker=marker, sort_dir=sort_dir,
-                                             filters=filters)
+                                             filters=filters, keyset=False)
+
+    @mock.patch.object(event_object.Event, 'get_all_by_stack')
+    @mock.patch.object(service.EngineService, '_get_stack')
+    def test_event_list_tail(self, mock_get, mock_get_all):
+        marker = object()
+        mock_get.return_value = mock.Mock(id=1)
+        self.eng.list_events(self.ctx, 1, limit=10, marker=marker,
+                             sort_keys=['event_time'], sort_dir='desc',
+                             tail=True)
+
+        mock_get_all.assert_called_once_with(self.ctx, 1, limit=10,
+                                             sort_keys=None,
+                                             marker=marker, sort_dir='asc',
+                                             filters=None, keyset=True)
+
+    @mock.patch.object(stack_object.Stack, 'get_all')
+    @mock.patch.object(event_object.Event, 'get_all_by_root_stack')
+    @mock.patch.object(service.EngineService, '_get_stack')
+    def test_event_list_nested_depth_root_stack(self, mock_get,
+                                                mock_get_all, mock_stacks):
+        marker = object()
+        mock_get.return_value = mock.Mock(id='root', owner_id=None)
+        mock_get_all.return_value = []
+        self.eng.list_events(self.ctx, 'root', limit=10, marker=marker,
+                             nested_depth=2)
+
+        mock_get_all.assert_called_once_with(self.ctx, 'root', limit=10,
+                                             sort_keys=None,
+                                             marker=marker, sort_dir=None,
+                                             filters=None, nested_depth=2)
+        # no stacks other than the root appear in the events
+        self.assertFalse(mock_stacks.called)
 
     @mock.patch.object(event_object.Event, 'get_all_by_tenant')
     def test_tenant_events_list_with_marker_and_filters(self, mock_get_all):
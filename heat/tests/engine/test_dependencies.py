@@ -11,6 +11,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import six
 
 from heat.engine import dependencies
 from heat.tests import common
@@ -160,6 +161,56 @@ class dependenciesTest(common.HeatTestCase):
                           list,
                           reversed(d))
 
+    def test_circular_message(self):
+        d = dependencies.Dependencies([('first', 'second'),
+                                       ('second', 'third'),
+                                       ('third', 'first'),
+                                       ('last', 'first')])
+        ex = self.assertRaises(dependencies.CircularDependencyException,
+                               list,
+                               iter(d))
+        self.assertEqual('Circular Dependency Found: '
+                         'second -> third -> first -> second',
+                         six.text_type(ex))
+
+    def test_find_cycle(self):
+        d = dependencies.Dependencies([('last', 'e1'), ('last', 'mid1'),
+                                       ('last', 'mid2'), ('mid1', 'e2'),
+                                       ('mid1', 'mid3'), ('mid2', 'mid3'),
+                                       ('mid3', 'e3')])
+        self.assertIsNone(d.find_cycle())
+
+        d += ('e3', 'mid1')
+        cycle = d.find_cycle()
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assertEqual({'mid1', 'mid3', 'e3'}, set(cycle))
+        self.assertEqual(4, len(cycle))
+
+    def test_add_edges_after_sort(self):
+        d = dependencies.Dependencies([('mid', 'first')])
+        self.assertEqual(['first', 'mid'], list(iter(d)))
+        self.assertEqual(['mid', 'first'], list(reversed(d)))
+
+        d += ('last', 'mid')
+        d += ('first', 'zeroth')
+        d += ('other', None)
+        order = list(iter(d))
+        self.assertEqual(5, len(order))
+        for l, f in [('mid', 'first'), ('last', 'mid'), ('first', 'zeroth')]:
+            self.assertLess(order.index(f), order.index(l))
+        order = list(reversed(d))
+        self.assertEqual(5, len(order))
+        for l, f in [('mid', 'first'), ('last', 'mid'), ('first', 'zeroth')]:
+            self.assertGreater(order.index(f), order.index(l))
+
+        d += ('zeroth', 'last')
+        self.assertRaises(dependencies.CircularDependencyException,
+                          list,
+                          iter(d))
+        self.assertRaises(dependencies.CircularDependencyException,
+                          list,
+                          reversed(d))
+
     def test_noexist_partial(self):
         d = dependencies.Dependencies([('foo', 'bar')])
 
@@ -208,6 +259,16 @@ class dependenciesTest(common.HeatTestCase):
             self.assertIn(n, order,
                           "'%s' not found in dependency order" % n)
 
+    def test_diamond_partial(self):
+        d = dependencies.Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                                       ('mid1', 'first'), ('mid2', 'first')])
+        p = d['first']
+        self.assertEqual(set(d.graph().edges()), set(p.graph().edges()))
+        order = list(iter(p))
+        self.assertEqual(4, len(order))
+        self.assertEqual('first', order[0])
+        self.assertEqual('last', order[-1])
+
     def test_required_by(self):
         d = dependencies.Dependencies([('last', 'e1'), ('last', 'mid1'),
                                        ('last', 'mid2'), ('mid1', 'e2'),
@@ -0,0 +1,82 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmarks of str_replace on cloud-init style user data.
+
+Each benchmark compares the single-pass matcher with replacing one
+placeholder at a time. HEAT_BENCHMARK_REPLACE_KB sets the sizes of the
+generated scripts, in KB (default 1), and a JSON report is written if
+HEAT_BENCHMARK_OUTPUT is set (see heat.tests.benchmark_utils).
+"""
+
+import random
+import timeit
+
+import six
+
+from heat.engine.hot import functions as hot_functions
+from heat.tests import benchmark_utils
+from heat.tests import common
+
+
+def generate_user_data(size_kb, num_params, rand):
+    """Return a cloud-init style script and a map of its params."""
+    values = dict(('$param_%d' % i, 'value-%d' % i)
+                  for i in six.moves.range(num_params))
+    values.update(('%%%%MASTER_%d%%%%' % i, '10.0.0.%d' % i)
+                  for i in six.moves.range(num_params // 4))
+    placeholders = sorted(values)
+    lines = ['echo "configuring" >> /var/log/setup.log\n',
+             'systemctl restart some-service\n',
+             'export PATH=$PATH:/usr/local/bin\n']
+
+    pieces = ['#!/bin/bash\n']
+    length = len(pieces[0])
+    while length < size_kb * 1024:
+        piece = rand.choice(lines)
+        if rand.random() < 0.2:
+            piece = 'config %s\n' % rand.choice(placeholders)
+        pieces.append(piece)
+        length += len(piece)
+    return ''.join(pieces), values
+
+
+class ReplaceBenchmarkTest(common.HeatTestCase):
+
+    scenarios = [('%d_params' % n, {'num_params': n}) for n in (8, 40)]
+
+    def test_benchmark(self):
+        path = benchmark_utils.report_path('str_replace_%d' %
+                                           self.num_params)
+        number = 10 if path else 1
+        rand = random.Random(self.num_params)
+        results = []
+        for size in benchmark_utils.sizes('HEAT_BENCHMARK_REPLACE_KB', '1'):
+            template, values = generate_user_data(size, self.num_params, rand)
+            matcher = hot_functions._replace_matcher(values)
+            self.assertEqual(matcher._replace_each(template, values),
+                             matcher.replace(template, values))
+
+            results.append({
+                'size_kb': size,
+                'num_params': self.num_params,
+                'replace_each': timeit.timeit(
+                    lambda: matcher._replace_each(template, values),
+                    number=number) / number,
+                'matcher': timeit.timeit(
+                    lambda: matcher.replace(template, values),
+                    number=number) / number,
+            })
+
+        if path:
+            benchmark_utils.write_report(results, path)
@@ -15,12 +15,14 @@ import contextlib
 import itertools
 
 import eventlet
+from oslo_config import cfg
 import six
 
 from heat.common.i18n import repr_wrapper
 from heat.common import timeutils
 from heat.engine import dependencies
 from heat.engine import scheduler
+from heat.engine import trace
 from heat.tests import common
 
 
@@ -391,6 +393,95 @@ class DependencyTaskGroupTest(common.HeatTestCase):
         exc = self.assertRaises(type(e2), task.throw, e2)
         self.assertIs(e2, exc)
 
+    def _run_tracked(self, deps, **kwargs):
+        running = set()
+        concurrency = []
+        started = []
+
+        def task_func(key):
+            started.append(key)
+            running.add(key)
+            concurrency.append(set(running))
+            yield
+            yield
+            running.discard(key)
+
+        tg = scheduler.DependencyTaskGroup(deps, task_func, **kwargs)
+        scheduler.TaskRunner(tg)(wait_time=None)
+        return tg, started, concurrency
+
+    def test_max_concurrency(self):
+        deps = dependencies.Dependencies([(str(i), None) for i in range(5)])
+        tg, started, concurrency = self._run_tracked(deps, max_concurrency=2)
+
+        self.assertEqual(5, len(started))
+        self.assertEqual(2, max(len(r) for r in concurrency))
+
+    def test_concurrency_limits(self):
+        deps = dependencies.Dependencies([('a1', None), ('a2', None),
+                                          ('a3', None), ('b1', None),
+                                          ('b2', None)])
+        tg, started, concurrency = self._run_tracked(
+            deps, concurrency_limits={'a': 1}, bucket=lambda k: k[0])
+
+        self.assertEqual(5, len(started))
+        for r in concurrency:
+            self.assertTrue(len([k for k in r if k[0] == 'a']) <= 1)
+        self.assertIn(set(['a1', 'b1', 'b2']), concurrency)
+
+    def test_concurrency_not_resumable(self):
+        deps = dependencies.Dependencies([(str(i), None) for i in range(4)])
+        started = []
+
+        tg = scheduler.DependencyTaskGroup(deps, started.append,
+                                           max_concurrency=1)
+        task = tg()
+        self.assertRaises(StopIteration, next, task)
+        self.assertEqual(4, len(started))
+
+    def test_priority(self):
+        deps = dependencies.Dependencies([('a', None), ('b', None),
+                                          ('c', 'b'), ('d', 'c')])
+        priority = scheduler.critical_path_lengths(deps)
+        self.assertEqual({'a': 1, 'b': 3, 'c': 2, 'd': 1}, priority)
+
+        tg, started, concurrency = self._run_tracked(
+            deps, max_concurrency=1, priority=priority.get)
+        self.assertEqual(['b', 'c'], started[:2])
+
+    def test_critical_path_lengths_reverse(self):
+        deps = dependencies.Dependencies([('a', None), ('b', None),
+                                          ('c', 'b'), ('d', 'c')])
+        self.assertEqual({'a': 1, 'b': 1, 'c': 2, 'd': 3},
+                         scheduler.critical_path_lengths(deps, reverse=True))
+
+    def test_step_stats(self):
+        deps = dependencies.Dependencies([('second', 'first')])
+        tg, started, concurrency = self._run_tracked(deps)
+
+        stats = tg.step_stats()
+        self.assertTrue(stats['steps'] > 0)
+        self.assertTrue(0.0 <= stats['max'] <= stats['total'])
+        self.assertEqual(set(['first', 'second']), set(tg.task_times))
+
+    def test_tracer(self):
+        deps = dependencies.Dependencies([('a', None), ('b', None),
+                                          ('c', 'b'), ('c', 'a')])
+        tracer = trace.Tracer('stack_id', 'CREATE')
+        self._run_tracked(deps, tracer=tracer)
+
+        spans = dict((s['resource'], s) for s in tracer.spans)
+        self.assertEqual(set(['a', 'b', 'c']), set(spans))
+        for span in tracer.spans:
+            self.assertEqual(trace.SCHEDULE, span['phase'])
+            self.assertTrue(span['start'] <= span['end'])
+        self.assertEqual([], spans['a']['attributes']['requires'])
+        self.assertEqual(['a', 'b'],
+                         sorted(spans['c']['attributes']['requires']))
+        # c becomes ready when the last of its dependencies completes
+        self.assertTrue(spans['c']['start'] >= spans['a']['end'])
+        self.assertTrue(spans['c']['start'] >= spans['b']['end'])
+
 
 class TaskTest(common.HeatTestCase):
 
@@ -1275,6 +1366,47 @@ class TaskTest(common.HeatTestCase):
         self.assertTrue(runner.done())
 
 
+class PollingPolicyTest(common.HeatTestCase):
+
+    def test_default(self):
+        policy = scheduler.PollingPolicy()
+        self.assertFalse(policy.fast_path)
+        self.assertEqual([1, 1, 1], list(itertools.islice(policy, 3)))
+
+    def test_exponential_backoff(self):
+        policy = scheduler.ExponentialBackoff(max_period=10, jitter=0)
+        self.assertTrue(policy.fast_path)
+        self.assertEqual([1, 2, 4, 8, 10, 10],
+                         list(itertools.islice(policy, 6)))
+
+    def test_exponential_backoff_config(self):
+        cfg.CONF.set_override('max_poll_interval', 3, enforce_type=True)
+        policy = scheduler.ExponentialBackoff(jitter=0)
+        self.assertEqual([1, 2, 3, 3], list(itertools.islice(policy, 4)))
+
+    def test_exponential_backoff_jitter(self):
+        policy = scheduler.ExponentialBackoff(max_period=100, jitter=0.5)
+        for attempt, period in enumerate(itertools.islice(policy, 6)):
+            self.assertTrue(2 ** attempt <= period <= 1.5 * 2 ** attempt + 1)
+
+
+class PollStatsTest(common.HeatTestCase):
+
+    def test_record(self):
+        stats = scheduler.PollStats()
+        stats.record('OS::Nova::Server', 3, 2.0)
+        stats.record('OS::Nova::Server', 5, 4.0)
+        stats.record('OS::Cinder::Volume', 1, 0.5)
+
+        self.assertEqual({'OS::Nova::Server': {'tasks': 2, 'polls': 8,
+                                               'elapsed': 6.0},
+                          'OS::Cinder::Volume': {'tasks': 1, 'polls': 1,
+                                                 'elapsed': 0.5}},
+                         stats.get())
+        stats.reset()
+        self.assertEqual({}, stats.get())
+
+
 class TimeoutTest(common.HeatTestCase):
     def test_compare(self):
         task = scheduler.TaskRunner(DummyTask())
@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import eventlet
 import mock
+from oslo_config import cfg
 from oslo_db import exception
 
 from heat.engine import sync_point
@@ -93,3 +95,66 @@ class SyncPointTestCase(common.HeatTestCase):
         stack.converge_stack(stack.t, action=stack.CREATE)
         mock_sleep_time = self.sync_with_sleep(ctx, stack)
         mock_sleep_time.assert_called_once_with(mock.ANY)
+
+    def test_sync_counts_conflicts(self):
+        ctx = utils.dummy_context()
+        stack = tools.get_stack('test_stack', utils.dummy_context(),
+                                template=tools.string_template_five,
+                                convergence=True)
+        stack.converge_stack(stack.t, action=stack.CREATE)
+        resource = stack['C']
+        graph = stack.convergence_dependencies.graph()
+        sync_point.reset_stats()
+
+        mock_callback = mock.Mock()
+        with mock.patch.object(sync_point, 'update_input_data',
+                               side_effect=[0, 0, 1]):
+            with mock.patch('eventlet.sleep'):
+                sync_point.sync(ctx, resource.id, stack.current_traversal,
+                                True, mock_callback,
+                                set(graph[(resource.id, True)]),
+                                {(4, True): None})
+
+        stats = sync_point.stats()
+        self.assertEqual(1, stats['notifications'])
+        self.assertEqual(1, stats['updates'])
+        self.assertEqual(2, stats['conflicts'])
+        self.assertEqual(0, stats['coalesced'])
+
+    def test_sync_coalesced(self):
+        cfg.CONF.set_override('convergence_sync_point_coalesce_window', 0.1,
+                              enforce_type=True)
+        ctx = utils.dummy_context()
+        stack = tools.get_stack('test_stack', utils.dummy_context(),
+                                template=tools.string_template_five,
+                                convergence=True)
+        stack.converge_stack(stack.t, action=stack.CREATE)
+        resource = stack['C']
+        graph = stack.convergence_dependencies.graph()
+        predecessors = set(graph[(resource.id, True)])
+        sync_point.reset_stats()
+
+        mock_callback = mock.Mock()
+        mock_update = self.patchobject(sync_point, 'update_input_data',
+                                       wraps=sync_point.update_input_data)
+
+        def notify(sender):
+            sync_point.sync(ctx, resource.id, stack.current_traversal,
+                            True, mock_callback, predecessors,
+                            {sender: None})
+
+        threads = [eventlet.spawn(notify, sender) for sender in predecessors]
+        for thread in threads:
+            thread.wait()
+
+        self.assertEqual(1, mock_update.call_count)
+        mock_callback.assert_called_once_with(resource.id, mock.ANY)
+        updated_sync_point = sync_point.get(ctx, resource.id,
+                                            stack.current_traversal, True)
+        input_data = sync_point.deserialize_input_data(
+            updated_sync_point.input_data)
+        self.assertEqual(predecessors, set(input_data))
+        stats = sync_point.stats()
+        self.assertEqual(len(predecessors), stats['notifications'])
+        self.assertEqual(1, stats['updates'])
+        self.assertEqual(len(predecessors) - 1, stats['coalesced'])
@@ -0,0 +1,163 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from heat.engine import trace
+from heat.objects import stack_trace as stack_trace_object
+from heat.tests import common
+from heat.tests import utils
+
+
+def _span(phase, resource, start, end, **attributes):
+    return {'phase': phase, 'resource': resource,
+            'start': start, 'end': end, 'attributes': attributes}
+
+
+class TracerTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(TracerTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        self.mock_create = self.patchobject(stack_trace_object.StackTrace,
+                                            'create')
+
+    def test_span(self):
+        tracer = trace.Tracer('stack_id', 'CREATE', 'op')
+        with tracer.span(trace.HANDLE, 'res', method='handle_create'):
+            pass
+
+        self.assertEqual(1, len(tracer.spans))
+        span = tracer.spans[0]
+        self.assertEqual(trace.HANDLE, span['phase'])
+        self.assertEqual('res', span['resource'])
+        self.assertTrue(span['start'] <= span['end'])
+        self.assertEqual({'method': 'handle_create'}, span['attributes'])
+
+    def test_span_exception(self):
+        tracer = trace.Tracer('stack_id', 'CREATE', 'op')
+
+        def fail():
+            with tracer.span(trace.CHECK, 'res'):
+                raise ValueError()
+
+        self.assertRaises(ValueError, fail)
+        self.assertEqual(1, len(tracer.spans))
+
+    def test_store(self):
+        tracer = trace.Tracer('stack_id', 'CREATE', 'op')
+        tracer.record(trace.ACTION, 1.0, 2.0, 'res', action='CREATE')
+
+        tracer.store(self.ctx)
+        tracer.store(self.ctx)
+
+        self.mock_create.assert_called_once_with(
+            self.ctx, {'stack_id': 'stack_id', 'operation': 'op',
+                       'action': 'CREATE',
+                       'spans': [_span(trace.ACTION, 'res', 1.0, 2.0,
+                                       action='CREATE')]})
+        self.assertEqual([], tracer.spans)
+
+    def test_store_failure(self):
+        self.mock_create.side_effect = Exception('DB error')
+        tracer = trace.Tracer('stack_id', 'CREATE')
+        tracer.record(trace.ACTION, 1.0, 2.0, 'res')
+
+        tracer.store(self.ctx)
+
+        self.assertEqual([], tracer.spans)
+
+    def test_null_tracer(self):
+        with trace.NULL_TRACER.span(trace.ACTION, 'res'):
+            pass
+        trace.NULL_TRACER.record(trace.ACTION, 1.0, 2.0, 'res')
+        trace.NULL_TRACER.store(self.ctx)
+
+        self.assertFalse(self.mock_create.called)
+
+
+class CriticalPathTest(common.HeatTestCase):
+
+    def _names(self, timeline):
+        return [e['resource_name'] for e in timeline['critical_path']]
+
+    def test_empty(self):
+        self.assertEqual({'start': None, 'duration': 0.0,
+                          'critical_path': []},
+                         trace.critical_path([]))
+
+    def test_requires(self):
+        spans = [
+            _span(trace.SCHEDULE, 'a', 0.0, 0.0, requires=[]),
+            _span(trace.ACTION, 'a', 0.0, 5.0, action='CREATE'),
+            _span(trace.SCHEDULE, 'b', 0.0, 0.0, requires=[]),
+            _span(trace.ACTION, 'b', 0.0, 1.0, action='CREATE'),
+            # c finished after a, but d does not depend on it
+            _span(trace.SCHEDULE, 'c', 0.0, 0.0, requires=[]),
+            _span(trace.ACTION, 'c', 0.0, 5.5, action='CREATE'),
+            _span(trace.SCHEDULE, 'd', 5.0, 6.0, requires=['a', 'b']),
+            _span(trace.ACTION, 'd', 6.0, 10.0, action='CREATE'),
+        ]
+
+        timeline = trace.critical_path(spans)
+
+        self.assertEqual(10.0, timeline['duration'])
+        self.assertEqual(['a', 'd'], self._names(timeline))
+        self.assertEqual(1.0, timeline['critical_path'][1]['wait'])
+        self.assertEqual(4.0, timeline['critical_path'][1]['duration'])
+
+    def test_no_requires(self):
+        spans = [
+            _span(trace.ACTION, 'a', 0.0, 2.0, action='CREATE'),
+            _span(trace.ACTION, 'b', 0.0, 3.0, action='CREATE'),
+            _span(trace.ACTION, 'c', 3.5, 6.0, action='CREATE'),
+        ]
+
+        self.assertEqual(['b', 'c'],
+                         self._names(trace.critical_path(spans)))
+
+    def test_phases(self):
+        spans = [
+            _span(trace.LOCK_WAIT, 'a', 0.0, 0.5),
+            _span(trace.PROPERTIES, 'a', 0.5, 1.0),
+            _span(trace.ACTION, 'a', 1.0, 10.0, action='CREATE'),
+            _span(trace.DB_WRITE, 'a', 1.0, 1.25),
+            _span(trace.HANDLE, 'a', 1.25, 3.0),
+            _span(trace.CHECK, 'a', 5.0, 5.5),
+            _span(trace.CHECK, 'a', 9.0, 9.5),
+            _span(trace.DB_WRITE, 'a', 9.5, 10.0),
+        ]
+
+        entry = trace.critical_path(spans)['critical_path'][0]
+
+        self.assertEqual(0.0, entry['start'])
+        self.assertEqual(10.0, entry['duration'])
+        self.assertEqual({trace.HANDLE: 1.75, trace.CHECK: 1.0,
+                          trace.PROPERTIES: 0.5, trace.DB_WRITE: 0.75,
+                          trace.LOCK_WAIT: 0.5},
+                         entry['phases'])
+        self.assertEqual(2, entry['check_polls'])
+
+    def test_replaced_resource(self):
+        spans = [
+            _span(trace.ACTION, 'a', 0.0, 2.0, action='CREATE'),
+            _span(trace.HANDLE, 'a', 0.5, 1.0),
+            _span(trace.ACTION, 'a', 3.0, 4.0, action='DELETE'),
+            _span(trace.HANDLE, 'a', 3.0, 3.75),
+        ]
+
+        timeline = trace.critical_path(spans)
+
+        self.assertEqual(['CREATE', 'DELETE'],
+                         [e['action'] for e in timeline['critical_path']])
+        self.assertEqual([0.5, 0.75],
+                         [e['phases'][trace.HANDLE]
+                          for e in timeline['critical_path']])
@@ -48,7 +48,7 @@ class CloudWatchAlarmTest(common.HeatTestCase):
 
         def clear_register_class():
             env = resources.global_env()
-            env.registry._registry.pop('CWLiteAlarmForTest')
+            env.registry._register_info(['CWLiteAlarmForTest'], None)
 
         self.ctx = utils.dummy_context()
         resource._register_class('CWLiteAlarmForTest',
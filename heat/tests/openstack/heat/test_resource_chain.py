@@ -208,7 +208,7 @@ class ResourceChainTest(common.HeatTestCase):
         chain = resource_chain.ResourceChain('test', snip, self.stack)
         return chain
 
-    @mock.patch.object(grouputils, 'get_rsrc_id')
+    @mock.patch.object(grouputils.GroupInspector, 'rsrc_id')
     def test_get_attribute(self, mock_get_rsrc_id):
         stack = utils.parse_stack(TEMPLATE)
         mock_get_rsrc_id.side_effect = ['0', '1']
@@ -812,7 +812,7 @@ class ResourceGroupAttrTest(common.HeatTestCase):
         self.assertRaises(exception.InvalidTemplateAttribute, resg.FnGetAtt,
                           'resource.2')
 
-    @mock.patch.object(grouputils, 'get_rsrc_id')
+    @mock.patch.object(grouputils.GroupInspector, 'rsrc_id')
     def test_get_attribute(self, mock_get_rsrc_id):
         stack = utils.parse_stack(template)
         mock_get_rsrc_id.side_effect = ['0', '1']
@@ -34,6 +34,7 @@ from heat.engine import service
 from heat.engine import stack as parser
 from heat.engine import template as templatem
 from heat.objects import stack as stack_object
+from heat.objects import stack_trace as stack_trace_object
 from heat.tests import common
 from heat.tests.engine import tools
 from heat.tests import generic_resource as generic_rsrc
@@ -665,7 +666,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      tags=None,
                                                      tags_any=None,
                                                      not_tags=None,
-                                                     not_tags_any=None)
+                                                     not_tags_any=None,
+                                                     approximate=False)
 
     @mock.patch.object(stack_object.Stack, 'count_all')
     def test_count_stacks_show_nested(self, mock_stack_count_all):
@@ -678,7 +680,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      tags=None,
                                                      tags_any=None,
                                                      not_tags=None,
-                                                     not_tags_any=None)
+                                                     not_tags_any=None,
+                                                     approximate=False)
 
     @mock.patch.object(stack_object.Stack, 'count_all')
     def test_count_stack_show_deleted(self, mock_stack_count_all):
@@ -691,7 +694,8 @@ class StackServiceTest(common.HeatTestCase):
                                                      tags=None,
                                                      tags_any=None,
                                                      not_tags=None,
-                                                     not_tags_any=None)
+                                                     not_tags_any=None,
+                                                     approximate=False)
 
     @mock.patch.object(stack_object.Stack, 'count_all')
     def test_count_stack_show_hidden(self, mock_stack_count_all):
@@ -704,7 +708,62 @@ class StackServiceTest(common.HeatTestCase):
                                                      tags=None,
                                                      tags_any=None,
                                                      not_tags=None,
-                                                     not_tags_any=None)
+                                                     not_tags_any=None,
+                                                     approximate=False)
+
+    @mock.patch.object(stack_object.Stack, 'count_all')
+    def test_count_stacks_approximate(self, mock_stack_count_all):
+        self.eng.count_stacks(self.ctx, approximate=True)
+        mock_stack_count_all.assert_called_once_with(mock.ANY,
+                                                     filters=mock.ANY,
+                                                     show_deleted=False,
+                                                     show_nested=False,
+                                                     show_hidden=False,
+                                                     tags=None,
+                                                     tags_any=None,
+                                                     not_tags=None,
+                                                     not_tags_any=None,
+                                                     approximate=True)
+
+    @mock.patch.object(stack_object.Stack, 'get_all_summary')
+    @mock.patch.object(stack_object.Stack, 'get_all')
+    def test_stack_list_fields(self, mock_stack_get_all,
+                               mock_stack_get_all_summary):
+        mock_stack_get_all_summary.return_value = [
+            {'id': 'abc', 'name': 'foo', 'tenant': 'test_tenant',
+             'action': 'CREATE', 'status': 'COMPLETE'}]
+
+        stacks = self.eng.list_stacks(self.ctx,
+                                      fields=['stack_status'],
+                                      filters={'stack_name': 'foo'})
+
+        self.assertFalse(mock_stack_get_all.called)
+        mock_stack_get_all_summary.assert_called_once_with(
+            self.ctx, ['action', 'id', 'name', 'status', 'tenant'],
+            limit=mock.ANY,
+            sort_keys=mock.ANY,
+            marker=mock.ANY,
+            sort_dir=mock.ANY,
+            filters={'name': 'foo'},
+            show_deleted=mock.ANY,
+            show_nested=mock.ANY,
+            show_hidden=mock.ANY,
+            tags=mock.ANY,
+            tags_any=mock.ANY,
+            not_tags=mock.ANY,
+            not_tags_any=mock.ANY)
+        self.assertEqual(1, len(stacks))
+        self.assertEqual({'stack_identity', 'stack_action', 'stack_status'},
+                         set(stacks[0]))
+        self.assertEqual('abc', stacks[0]['stack_identity']['stack_id'])
+        self.assertEqual('CREATE', stacks[0]['stack_action'])
+        self.assertEqual('COMPLETE', stacks[0]['stack_status'])
+
+    def test_stack_list_fields_invalid(self):
+        ex = self.assertRaises(dispatcher.ExpectedException,
+                               self.eng.list_stacks, self.ctx,
+                               fields=['parameters'])
+        self.assertEqual(exception.Invalid, ex.exc_info[0])
 
     @tools.stack_context('service_export_stack')
     def test_export_stack(self):
@@ -739,6 +798,40 @@ class StackServiceTest(common.HeatTestCase):
         self.assertEqual(['tag1', 'tag2'], ret['tags'])
         self.m.VerifyAll()
 
+    @tools.stack_context('service_stack_trace')
+    def test_get_stack_trace(self):
+        def action(name, start, end):
+            return {'phase': 'action', 'resource': name,
+                    'start': start, 'end': end,
+                    'attributes': {'action': 'UPDATE'}}
+
+        def store(operation, spans):
+            stack_trace_object.StackTrace.create(
+                self.ctx, {'stack_id': self.stack.id,
+                           'operation': operation,
+                           'action': 'UPDATE',
+                           'spans': spans})
+
+        store('old', [action('WebServer', 0.0, 100.0)])
+        # The spans of an operation may be stored by several workers
+        store('new', [action('WebServer', 200.0, 203.0)])
+        store('new', [action('Other', 203.5, 204.0)])
+
+        ret = self.eng.get_stack_trace(self.ctx, self.stack.identifier())
+
+        self.assertEqual('new', ret['operation'])
+        self.assertEqual('UPDATE', ret['action'])
+        self.assertEqual(4.0, ret['duration'])
+        self.assertEqual(['WebServer', 'Other'],
+                         [e['resource_name'] for e in ret['critical_path']])
+
+    @tools.stack_context('service_stack_trace_none', False)
+    def test_get_stack_trace_not_traced(self):
+        ret = self.eng.get_stack_trace(self.ctx, self.stack.identifier())
+
+        self.assertIsNone(ret['operation'])
+        self.assertEqual([], ret['critical_path'])
+
     @tools.stack_context('service_abandon_stack')
     def test_abandon_stack(self):
         cfg.CONF.set_override('enable_stack_abandon', True, enforce_type=True)
@@ -870,6 +870,77 @@ class ResourceRegistryTest(common.HeatTestCase):
         types = registry.get_types(version='invalid')
         self.assertEqual([], types)
 
+    def _registry(self):
+        global_registry = environment.ResourceRegistry(None, {})
+        global_registry.register_class('OS::Test::A',
+                                       generic_resource.GenericResource)
+        global_registry.register_class('OS::Test::B',
+                                       generic_resource.ResourceWithProps)
+        registry = environment.ResourceRegistry(global_registry, {})
+        return global_registry, registry
+
+    def test_get_resource_info_cached(self):
+        global_registry, registry = self._registry()
+        registry.load({'resources': {'special': {'OS::Test::A': 'a.yaml'}}})
+        mock_find = self.patchobject(registry, '_find_resource_info',
+                                     wraps=registry._find_resource_info)
+
+        for name in ('0', '1', None, '0'):
+            info = registry.get_resource_info('OS::Test::A', name)
+            self.assertEqual(generic_resource.GenericResource, info.value)
+        self.assertEqual(1, mock_find.call_count)
+
+        info = registry.get_resource_info('OS::Test::A', 'special')
+        self.assertEqual('a.yaml', info.value)
+        self.assertEqual(2, mock_find.call_count)
+
+    def test_get_resource_info_register_invalidates(self):
+        global_registry, registry = self._registry()
+        self.assertEqual(generic_resource.GenericResource,
+                         registry.get_resource_info('OS::Test::A').value)
+
+        registry.load({'OS::Test::A': 'OS::Test::B'})
+        self.assertEqual(generic_resource.ResourceWithProps,
+                         registry.get_resource_info('OS::Test::A').value)
+
+        registry.load({'OS::Test::A': None})
+        self.assertEqual(generic_resource.GenericResource,
+                         registry.get_resource_info('OS::Test::A').value)
+
+    def test_get_resource_info_global_change_invalidates(self):
+        global_registry, registry = self._registry()
+        self.assertEqual(generic_resource.GenericResource,
+                         registry.get_resource_info('OS::Test::A').value)
+
+        global_registry.register_class('OS::Test::A',
+                                       generic_resource.ResourceWithProps)
+        self.assertEqual(generic_resource.ResourceWithProps,
+                         registry.get_resource_info('OS::Test::A').value)
+
+    def test_get_resource_info_remove_item_invalidates(self):
+        global_registry, registry = self._registry()
+        registry.load({'OS::Test::C': 'c.yaml'})
+        info = registry.get_resource_info('OS::Test::C')
+        self.assertEqual('c.yaml', info.value)
+
+        registry.remove_item(info)
+        self.assertRaises(exception.EntityNotFound,
+                          registry.get_resource_info, 'OS::Test::C')
+
+    def test_get_resource_info_glob(self):
+        global_registry, registry = self._registry()
+        self.assertRaises(exception.EntityNotFound,
+                          registry.get_resource_info, 'OS::Other::A')
+
+        registry.load({'OS::Other::*': 'OS::Test::*',
+                       'Vendor::*': 'OS::Test::*'})
+        self.assertEqual('OS::Test::A',
+                         registry.get_resource_info('OS::Other::A').name)
+        self.assertEqual('OS::Test::B',
+                         registry.get_resource_info('Vendor::B').name)
+        self.assertEqual(set(['OS::Other::', 'Vendor::']),
+                         set(registry._get_glob_index()))
+
 
 class HookMatchTest(common.HeatTestCase):
 
@@ -144,6 +144,15 @@ class EventTest(EventCommon):
         e.store()
         self.assertIsNotNone(e.identifier())
 
+    def test_store_root_stack_id(self):
+        e = event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS', 'Testing',
+                        'wibble', self.resource.properties,
+                        self.resource.name, self.resource.type())
+        e.store()
+
+        ev = event_object.Event.get_by_id(self.ctx, e.id)
+        self.assertEqual(self.stack.id, ev.root_stack_id)
+
     def test_badprop(self):
         rname = 'bad_resource'
         defn = rsrc_defn.ResourceDefinition(rname,
@@ -178,6 +187,75 @@ class EventTest(EventCommon):
         self.assertEqual(expected, e.as_dict())
 
 
+class EventBufferTest(EventCommon):
+
+    def setUp(self):
+        super(EventBufferTest, self).setUp()
+        self._setup_stack(tmpl)
+        self.patchobject(event, '_event_counts', {})
+        self.patchobject(event, '_pruning', set())
+
+    def _event(self, physical_resource_id):
+        return event.Event(self.ctx, self.stack, 'TEST', 'IN_PROGRESS',
+                           'Testing', physical_resource_id,
+                           self.resource.properties,
+                           self.resource.name, self.resource.type())
+
+    def test_flush(self):
+        buf = event.EventBuffer(self.ctx, self.stack.id)
+        e1 = self._event('alabama')
+        e2 = self._event('arizona')
+        buf.add(e1)
+        buf.add(e2)
+        self.assertEqual(2, len(buf))
+        self.assertIsNotNone(e1.uuid)
+        self.assertIsNotNone(e1.timestamp)
+        self.assertEqual([], event_object.Event.get_all_by_stack(
+            self.ctx, self.stack.id))
+
+        buf.flush()
+        self.assertEqual(0, len(buf))
+        events = event_object.Event.get_all_by_stack(self.ctx, self.stack.id)
+        self.assertEqual({e1.uuid, e2.uuid}, set(ev.uuid for ev in events))
+        self.assertEqual({'Foo': 'goo'}, events[0].resource_properties)
+
+    def test_flush_when_full(self):
+        self.patchobject(event, 'MAX_BUFFERED_EVENTS', 2)
+        buf = event.EventBuffer(self.ctx, self.stack.id)
+        buf.add(self._event('alabama'))
+        self.assertEqual(1, len(buf))
+        buf.add(self._event('arizona'))
+        self.assertEqual(0, len(buf))
+        self.assertEqual(2, len(event_object.Event.get_all_by_stack(
+            self.ctx, self.stack.id)))
+
+    def test_prune(self):
+        cfg.CONF.set_override('event_purge_batch_size', 1, enforce_type=True)
+        cfg.CONF.set_override('max_events_per_stack', 3, enforce_type=True)
+        self.patchobject(event.eventlet, 'spawn_n',
+                         side_effect=lambda func, *args: func(*args))
+        self.patchobject(event.common_context, 'get_admin_context',
+                         return_value=self.ctx)
+        mock_count = self.patchobject(event_object.Event, 'count_all_by_stack',
+                                      wraps=event_object.Event.
+                                      count_all_by_stack)
+
+        buf = event.EventBuffer(self.ctx, self.stack.id)
+        for name in ('alabama', 'arizona', 'arkansas'):
+            buf.add(self._event(name))
+        buf.flush()
+        self.assertEqual(3, len(event_object.Event.get_all_by_stack(
+            self.ctx, self.stack.id)))
+
+        buf.add(self._event('california'))
+        buf.flush()
+        events = event_object.Event.get_all_by_stack(self.ctx, self.stack.id)
+        self.assertEqual(['arkansas', 'california'],
+                         sorted(ev.physical_resource_id for ev in events))
+        self.assertEqual(2, event._event_counts[self.stack.id])
+        self.assertEqual(1, mock_count.call_count)
+
+
 class EventTestSingleLargeProp(EventCommon):
 
     def setUp(self):
@@ -17,6 +17,7 @@ import six
 from heat.common import grouputils
 from heat.common import template_format
 from heat.engine import rsrc_defn
+from heat.objects import resource as resource_objects
 from heat.tests import common
 from heat.tests import utils
 
@@ -88,3 +89,36 @@ class GroupUtilsTest(common.HeatTestCase):
         self.assertEqual([rsrc_ok], grouputils.get_members(group))
         self.assertEqual(['ID-r1'], grouputils.get_member_refids(group))
         self.assertEqual(['r1'], grouputils.get_member_names(group))
+
+    def test_inspector_nested_loaded_once(self):
+        group = mock.Mock()
+        t = template_format.parse(nested_stack)
+        stack = utils.parse_stack(t)
+        mock_nested = self.patchobject(group, 'nested', return_value=stack)
+
+        inspector = grouputils.GroupInspector(group)
+        self.assertEqual(['ID-r0', 'ID-r1'],
+                         [inspector.rsrc_id('refs', False, n)
+                          for n in ('r0', 'r1')])
+        self.assertEqual('ID-r1', inspector.nested_attrs('resource.1', True))
+        self.assertEqual(2, inspector.size())
+        self.assertEqual(1, mock_nested.call_count)
+
+    def test_inspector_from_db(self):
+        group = mock.Mock(resource_id='nested_id', _nested=None)
+        mock_summaries = self.patchobject(resource_objects.Resource,
+                                          'get_summaries_by_stack',
+                                          return_value=[
+                                              ('r2', 'COMPLETE', 2),
+                                              ('r1', 'COMPLETE', 2),
+                                              ('r0', 'FAILED', 3),
+                                              ('r3', 'COMPLETE', 1)])
+
+        inspector = grouputils.GroupInspector(group)
+        self.assertEqual(3, inspector.size())
+        self.assertEqual(4, inspector.size(include_failed=True))
+        self.assertEqual(['r3', 'r1', 'r2'], inspector.member_names())
+        self.assertEqual(['r0', 'r3', 'r1', 'r2'],
+                         inspector.member_names(include_failed=True))
+        mock_summaries.assert_called_once_with(group.context, 'nested_id')
+        self.assertFalse(group.nested.called)
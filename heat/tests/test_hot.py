@@ -12,7 +12,10 @@
 #    under the License.
 
 import copy
+import random
+
 import mock
+from oslo_config import cfg
 import six
 
 from heat.common import exception
@@ -667,6 +670,46 @@ class HOTemplateTest(common.HeatTestCase):
 
         self.assertEqual('9876e', self.resolve(snippet, tmpl))
 
+    def test_str_replace_overlapping_placeholders(self):
+        """Test str_replace function with overlapping placeholders."""
+
+        snippet = {'str_replace': {'template': '%b%a% %a%b%',
+                                   'params': {'%a%': 'A', '%b%': 'B'}}}
+
+        tmpl = template.Template(hot_tpl_empty)
+
+        self.assertEqual('%bA Ab%', self.resolve(snippet, tmpl))
+
+    def test_str_replace_matcher_cached(self):
+        """Test str_replace function reuses matchers for the same params."""
+
+        matcher = hot_functions._replace_matcher({'var1': 'a', 'var2': 'b'})
+        self.assertIs(matcher,
+                      hot_functions._replace_matcher({'var2': 'c',
+                                                      'var1': 'd'}))
+        self.assertIsNot(matcher,
+                         hot_functions._replace_matcher({'var1': 'a'}))
+
+    def test_str_replace_matcher_random_overlaps(self):
+        """Test str_replace matches replacing placeholders one at a time."""
+
+        rand = random.Random(0)
+        for i in six.moves.range(2000):
+            alphabet = 'ab%$'[:rand.randint(2, 4)]
+            placeholders = set(
+                ''.join(rand.choice(alphabet)
+                        for n in six.moves.range(rand.randint(1, 4)))
+                for n in six.moves.range(rand.randint(1, 5)))
+            values = dict((p, rand.choice(['X', 'YY', '', 'a']))
+                          for p in placeholders)
+            template = ''.join(rand.choice(alphabet + 'c')
+                               for n in six.moves.range(rand.randint(0, 30)))
+
+            matcher = hot_functions._replace_matcher(values)
+            self.assertEqual(matcher._replace_each(template, values),
+                             matcher.replace(template, values),
+                             'template %r, params %r' % (template, values))
+
     def test_str_replace_syntax(self):
         """Test str_replace function syntax.
 
@@ -1152,6 +1195,48 @@ class HOTemplateTest(common.HeatTestCase):
 
         self.assertEqual({'a': [1, 2, 3]}, resolved)
 
+    def test_yaql_expression_cache(self):
+        hot_functions.reset_yaql_cache()
+        self.addCleanup(hot_functions.reset_yaql_cache)
+        tmpl = template.Template(hot_newton_tpl_empty)
+        stack = parser.Stack(utils.dummy_context(), 'test_stack', tmpl)
+        for data in ([1, 2], [3, 4]):
+            snippet = {'yaql': {'expression': '$.data.sum()',
+                                'data': data}}
+            self.resolve(snippet, tmpl, stack=stack)
+
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1},
+                         hot_functions.yaql_cache_stats())
+
+    def test_yaql_expression_cache_bounded(self):
+        hot_functions.reset_yaql_cache()
+        self.addCleanup(hot_functions.reset_yaql_cache)
+        cfg.CONF.set_override('expression_cache_size', 2, group='yaql',
+                              enforce_type=True)
+        tmpl = template.Template(hot_newton_tpl_empty)
+        stack = parser.Stack(utils.dummy_context(), 'test_stack', tmpl)
+        for expression in ('$.data + 1', '$.data + 2', '$.data + 3',
+                           '$.data + 1'):
+            snippet = {'yaql': {'expression': expression, 'data': 1}}
+            self.resolve(snippet, tmpl, stack=stack)
+
+        self.assertEqual({'hits': 0, 'misses': 4, 'size': 2},
+                         hot_functions.yaql_cache_stats())
+
+    def test_yaql_expression_cache_disabled(self):
+        hot_functions.reset_yaql_cache()
+        self.addCleanup(hot_functions.reset_yaql_cache)
+        cfg.CONF.set_override('expression_cache_size', 0, group='yaql',
+                              enforce_type=True)
+        snippet = {'yaql': {'expression': '$.data', 'data': 1}}
+        tmpl = template.Template(hot_newton_tpl_empty)
+        stack = parser.Stack(utils.dummy_context(), 'test_stack', tmpl)
+        self.assertEqual(1, self.resolve(snippet, tmpl, stack=stack))
+        self.assertEqual(1, self.resolve(snippet, tmpl, stack=stack))
+
+        self.assertEqual({'hits': 0, 'misses': 2, 'size': 0},
+                         hot_functions.yaql_cache_stats())
+
     def test_equals(self):
         hot_tpl = template_format.parse('''
         heat_template_version: 2016-10-14
@@ -1399,6 +1484,47 @@ conditions:
         self.assertRaisesRegexp(exception.StackValidationFailed, regxp,
                                 function.validate, repeat)
 
+    def test_repeat_static_parts_shared(self):
+        """Test repeat function shares the parts with no replacements."""
+        snippet = {'repeat': {'template': {'name': 'port-%var%',
+                                           'fixed_ips': [{'ip': 'any'}]},
+                              'for_each': {'%var%': ['a', 'b']}}}
+        tmpl = template.Template(hot_kilo_tpl_empty)
+        repeat = tmpl.parse(None, snippet)
+
+        result = function.resolve(repeat)
+        self.assertEqual([{'name': 'port-a', 'fixed_ips': [{'ip': 'any'}]},
+                          {'name': 'port-b', 'fixed_ips': [{'ip': 'any'}]}],
+                         result)
+        self.assertIs(result[0]['fixed_ips'], result[1]['fixed_ips'])
+        self.assertIs(result, function.resolve(repeat))
+
+    def test_repeat_result_not_reused_for_equal_values(self):
+        """Test repeat function tells apart values that compare equal."""
+        self.patchobject(hot_functions.GetParam, 'result',
+                         side_effect=[{'SERVICE_enabled': 1},
+                                      {'SERVICE_enabled': True}])
+        snippet = {'repeat': {'template': {'get_param': 'template'},
+                              'for_each': {'SERVICE': ['x']}}}
+        tmpl = template.Template(hot_kilo_tpl_empty)
+        stack = parser.Stack(utils.dummy_context(), 'test_stack', tmpl)
+        repeat = tmpl.parse(stack, snippet)
+
+        self.assertIs(1, function.resolve(repeat)[0]['x_enabled'])
+        self.assertIs(True, function.resolve(repeat)[0]['x_enabled'])
+
+    def test_repeat_max_size(self):
+        """Test repeat function fails when it would produce too many items."""
+        cfg.CONF.set_override('max_repeat_size', 5, enforce_type=True)
+        snippet = {'repeat': {'template': '%var1%-%var2%',
+                              'for_each': {'%var1%': ['a', 'b', 'c'],
+                                           '%var2%': ['1', '2']}}}
+        tmpl = template.Template(hot_kilo_tpl_empty)
+
+        regxp = ('would produce 6 items, which exceeds the maximum of 5')
+        self.assertRaisesRegexp(ValueError, regxp,
+                                self.resolve, snippet, tmpl)
+
     def test_digest(self):
         snippet = {'digest': ['md5', 'foobar']}
         snippet_resolved = '3858f62230ac3c915f300c664312c63f'
@@ -0,0 +1,78 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from heat.common import lru
+from heat.tests import common
+
+
+class LRUCacheTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(LRUCacheTest, self).setUp()
+        self.max_size = 3
+        self.cache = lru.LRUCache(lambda: self.max_size)
+
+    def test_get_missing(self):
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual('x', self.cache.get('a', 'x'))
+
+    def test_least_recently_used_evicted(self):
+        for key in 'abc':
+            self.cache.put(key, key.upper())
+        self.assertEqual('A', self.cache.get('a'))
+        self.cache.put('d', 'D')
+
+        self.assertEqual(['c', 'a', 'd'], list(self.cache))
+        self.assertNotIn('b', self.cache)
+        self.assertEqual(3, self.cache.size)
+
+    def test_sized_items(self):
+        self.cache.put('a', 'A', 2)
+        self.cache.put('b', 'B', 2)
+        self.assertEqual(['b'], list(self.cache))
+        self.assertEqual(2, self.cache.size)
+
+        self.cache.put('c', 'C', 4)
+        self.assertNotIn('c', self.cache)
+        self.assertEqual(['b'], list(self.cache))
+
+    def test_replace(self):
+        self.cache.put('a', 'A', 2)
+        self.cache.put('a', 'AA', 1)
+        self.assertEqual('AA', self.cache.get('a'))
+        self.assertEqual(1, self.cache.size)
+
+    def test_discard(self):
+        self.cache.put('a', 'A', 2)
+        self.cache.discard('a')
+        self.cache.discard('b')
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.size)
+
+    def test_max_size_changed(self):
+        for key in 'abc':
+            self.cache.put(key, key.upper())
+        self.max_size = 1
+        self.cache.put('d', 'D')
+        self.assertEqual(['d'], list(self.cache))
+
+    def test_disabled(self):
+        self.max_size = 0
+        self.cache.put('a', 'A')
+        self.assertEqual(0, len(self.cache))
+
+    def test_clear(self):
+        self.cache.put('a', 'A')
+        self.cache.clear()
+        self.assertEqual(0, len(self.cache))
+        self.assertEqual(0, self.cache.size)
@@ -1027,6 +1027,48 @@ class ResourceTest(common.HeatTestCase):
 
         self.m.VerifyAll()
 
+    def test_create_poll_policy_fast_path(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.CancellableResource('test_resource', tmpl,
+                                               self.stack)
+        res.poll_policy = scheduler.ExponentialBackoff()
+        self.patchobject(res, 'handle_create', return_value='cookie')
+        check = self.patchobject(res, 'check_create_complete',
+                                 return_value=True)
+        self.addCleanup(scheduler.poll_stats.reset)
+
+        runner = scheduler.TaskRunner(res.create)
+        runner.start()
+
+        self.assertTrue(runner.done())
+        check.assert_called_once_with('cookie')
+        self.assertEqual((res.CREATE, res.COMPLETE), res.state)
+        stats = scheduler.poll_stats.get()['Foo']
+        self.assertEqual(1, stats['tasks'])
+        self.assertEqual(1, stats['polls'])
+
+    def test_create_poll_policy_backoff(self):
+        tmpl = rsrc_defn.ResourceDefinition('test_resource', 'Foo')
+        res = generic_rsrc.CancellableResource('test_resource', tmpl,
+                                               self.stack)
+        res.poll_policy = scheduler.ExponentialBackoff(jitter=0)
+        self.patchobject(res, 'handle_create', return_value='cookie')
+        check = self.patchobject(res, 'check_create_complete',
+                                 side_effect=[False, False, True])
+        self.addCleanup(scheduler.poll_stats.reset)
+
+        runner = scheduler.TaskRunner(res.create)
+        runner.start()
+        self.assertEqual(1, check.call_count)
+        # Waits 1 step, then 2 steps
+        runner.step()
+        self.assertEqual(2, check.call_count)
+        runner.step()
+        self.assertEqual(2, check.call_count)
+        self.assertTrue(runner.step())
+        self.assertEqual(3, check.call_count)
+        self.assertEqual(3, scheduler.poll_stats.get()['Foo']['polls'])
+
     def test_preview(self):
         tmpl = rsrc_defn.ResourceDefinition('test_resource',
                                             'GenericResourceType')
@@ -2496,6 +2538,7 @@ class ResourceTest(common.HeatTestCase):
         self.assertTrue(mock_stack_load.called)
         mock_stack_load.assert_called_with(stack.context,
                                            stack_id=stack.id,
+                                           stack=mock.ANY,
                                            cache_data=data)
         self.assertTrue(mock_load_data.called)
 
@@ -117,6 +117,7 @@ class EngineRpcAPITestCase(common.HeatTestCase):
             'tags_any': mock.ANY,
             'not_tags': mock.ANY,
             'not_tags_any': mock.ANY,
+            'fields': mock.ANY,
         }
         self._test_engine_api('list_stacks', 'call', **default_args)
 
@@ -130,6 +131,7 @@ class EngineRpcAPITestCase(common.HeatTestCase):
             'tags_any': mock.ANY,
             'not_tags': mock.ANY,
             'not_tags_any': mock.ANY,
+            'approximate': mock.ANY,
         }
         self._test_engine_api('count_stacks', 'call', **default_args)
 
@@ -139,7 +141,8 @@ class EngineRpcAPITestCase(common.HeatTestCase):
 
     def test_show_stack(self):
         self._test_engine_api('show_stack', 'call', stack_identity='wordpress',
-                              resolve_outputs=True)
+                              resolve_outputs=True, live_outputs=False,
+                              version='1.37')
 
     def test_preview_stack(self):
         self._test_engine_api('preview_stack', 'call', stack_name='wordpress',
@@ -236,7 +239,8 @@ class EngineRpcAPITestCase(common.HeatTestCase):
                   'sort_keys': None,
                   'sort_dir': None,
                   'filters': None,
-                  'nested_depth': None}
+                  'nested_depth': None,
+                  'tail': False}
         self._test_engine_api('list_events', 'call', **kwargs)
 
     def test_describe_stack_resource(self):
@@ -395,7 +399,12 @@ class EngineRpcAPITestCase(common.HeatTestCase):
     def test_stack_show_output(self):
         self._test_engine_api(
             'show_output', 'call', stack_identity=self.identity,
-            output_key='test', version='1.19')
+            output_key='test', live_outputs=False, version='1.37')
+
+    def test_get_stack_trace(self):
+        self._test_engine_api('get_stack_trace', 'call',
+                              stack_identity=self.identity,
+                              version='1.39')
 
     def test_export_stack(self):
         self._test_engine_api('export_stack',
@@ -32,6 +32,7 @@ from heat.common import timeutils
 from heat.db import api as db_api
 from heat.engine.clients.os import keystone
 from heat.engine.clients.os import nova
+from heat.engine import dependencies
 from heat.engine import environment
 from heat.engine import function
 from heat.engine import output
@@ -40,11 +41,13 @@ from heat.engine import scheduler
 from heat.engine import service
 from heat.engine import stack
 from heat.engine import template
+from heat.engine import trace
 from heat.engine import update
 from heat.objects import raw_template as raw_template_object
 from heat.objects import resource as resource_objects
 from heat.objects import stack as stack_object
 from heat.objects import stack_tag as stack_tag_object
+from heat.objects import stack_trace as stack_trace_object
 from heat.objects import user_creds as ucreds_object
 from heat.tests import common
 from heat.tests import fakes
@@ -108,6 +111,24 @@ class StackTest(common.HeatTestCase):
                                  timeout_mins=10)
         self.assertEqual(600, self.stack.timeout_secs())
 
+    def test_concurrency_options_default(self):
+        deps = dependencies.Dependencies([('b', 'a')])
+        self.assertEqual({}, stack.Stack.concurrency_options(deps))
+
+    def test_concurrency_options(self):
+        cfg.CONF.set_override('max_concurrent_resource_actions', 10,
+                              enforce_type=True)
+        cfg.CONF.set_override('resource_type_concurrency_limits',
+                              {'OS::Nova::Server': '5', 'Bad': 'x'},
+                              enforce_type=True)
+        deps = dependencies.Dependencies([('b', 'a')])
+        opts = stack.Stack.concurrency_options(deps)
+        self.assertEqual(10, opts['max_concurrency'])
+        self.assertEqual({'OS::Nova::Server': 5},
+                         opts['concurrency_limits'])
+        self.assertEqual(2, opts['priority']('a'))
+        self.assertEqual(1, opts['priority']('b'))
+
     @mock.patch.object(stack, 'datetime')
     def test_time_elapsed(self, mock_dt):
         self.stack = stack.Stack(self.ctx, 'test_stack', self.tmpl)
@@ -301,6 +322,54 @@ class StackTest(common.HeatTestCase):
         names = sorted([r.name for r in all_resources])
         self.assertEqual(['A', 'B'], names)
 
+    @mock.patch.object(resource_objects.Resource, 'get_all_by_stack')
+    def test_iter_resources_parses_template_once(self, mock_db_call):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources':
+               {'A': {'Type': 'GenericResourceType'},
+                'B': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'test_stack',
+                                 template.Template(tpl),
+                                 status_reason='blarg')
+        self.stack.store()
+        tpl2 = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources':
+                {'C': {'Type': 'GenericResourceType'},
+                 'D': {'Type': 'GenericResourceType'}}}
+        t2 = template.Template(tpl2)
+        t2.store(self.ctx)
+
+        db_resources = {}
+        for name, tid in (('A', self.stack.t.id), ('B', self.stack.t.id),
+                          ('C', t2.id), ('D', t2.id)):
+            db_resources[name] = mock.MagicMock(current_template_id=tid)
+            db_resources[name].name = name
+        mock_db_call.return_value = db_resources
+
+        tmpl_cls = type(self.stack.t)
+        mock_defns = self.patchobject(
+            tmpl_cls, 'resource_definitions',
+            side_effect=tmpl_cls.resource_definitions, autospec=True)
+
+        names = sorted(r.name for r in self.stack.iter_resources())
+        self.assertEqual(['A', 'B', 'C', 'D'], names)
+        self.assertEqual('C', self.stack.resource_get('C').name)
+        self.assertEqual(2, mock_defns.call_count)
+
+    def test_resource_definitions_reset_on_param_change(self):
+        tpl = {'HeatTemplateFormatVersion': '2012-12-12',
+               'Resources':
+               {'A': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'test_stack',
+                                 template.Template(tpl))
+        defns = self.stack._resource_definitions(self.stack.t)
+        self.assertIs(defns, self.stack._resource_definitions(self.stack.t))
+
+        self.stack.parameters = self.stack.t.parameters(
+            self.stack.identifier(), {})
+        self.assertIsNot(defns,
+                         self.stack._resource_definitions(self.stack.t))
+
     @mock.patch.object(resource_objects.Resource, 'get_all_by_stack')
     def test_iter_resources_with_nested(self, mock_db_call):
         tpl = {'HeatTemplateFormatVersion': '2012-12-12',
@@ -426,7 +495,7 @@ class StackTest(common.HeatTestCase):
         t = template.Template.load(self.ctx, stk.raw_template_id)
         self.m.StubOutWithMock(template.Template, 'load')
         template.Template.load(
-            self.ctx, stk.raw_template_id, stk.raw_template
+            self.ctx, stk.raw_template_id, stk.raw_template, cache=False
         ).AndReturn(t)
 
         self.m.StubOutWithMock(stack.Stack, '__init__')
@@ -614,7 +683,7 @@ class StackTest(common.HeatTestCase):
         stack2 = stack.Stack(self.ctx, 'stack2', tmpl2)
         stack2.store()
 
-        def fake_load(ctx, template_id, tmpl):
+        def fake_load(ctx, template_id, tmpl, cache=False):
             if template_id == stack2.t.id:
                 raise exception.NotFound()
             else:
@@ -1124,6 +1193,77 @@ class StackTest(common.HeatTestCase):
             self.assertEqual(rsrc, ref_rsrc)
             self.assertIn(b_rsrc.name, ref_rsrc.required_by())
 
+    def test_create_batches_resource_updates(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'},
+                    'BResource': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'batch_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+        mock_update = self.patchobject(resource_objects.Resource,
+                                       'update_by_id')
+        mock_batch = self.patchobject(db_api, 'resource_update_batch',
+                                      wraps=db_api.resource_update_batch)
+
+        self.stack.create()
+
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        self.assertFalse(mock_update.called)
+        self.assertTrue(mock_batch.called)
+        self.assertIsNone(self.stack.resource_update_batch)
+        for name in ('AResource', 'BResource'):
+            db_res = resource_objects.Resource.get_by_name_and_stack(
+                self.ctx, name, self.stack.id)
+            self.assertEqual((resource.Resource.CREATE,
+                              resource.Resource.COMPLETE),
+                             (db_res.action, db_res.status))
+
+    def test_create_traced(self):
+        cfg.CONF.set_override('enable_stack_tracing', True, enforce_type=True)
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'},
+                    'BResource': {'Type': 'GenericResourceType',
+                                  'DependsOn': 'AResource'}}}
+        self.stack = stack.Stack(self.ctx, 'trace_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+
+        self.stack.create()
+
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+        traces = stack_trace_object.StackTrace.get_all_by_stack(
+            self.ctx, self.stack.id)
+        self.assertEqual(1, len(traces))
+        self.assertEqual(stack.Stack.CREATE, traces[0].action)
+        recorded = set((s['resource'], s['phase']) for s in traces[0].spans)
+        for name in ('AResource', 'BResource'):
+            for phase in (trace.SCHEDULE, trace.ACTION, trace.HANDLE,
+                          trace.PROPERTIES, trace.DB_WRITE):
+                self.assertIn((name, phase), recorded)
+
+        timeline = trace.critical_path(traces[0].spans)
+        self.assertEqual(['AResource', 'BResource'],
+                         [e['resource_name']
+                          for e in timeline['critical_path']])
+
+    def test_create_not_traced(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'}}}
+        self.stack = stack.Stack(self.ctx, 'trace_test_stack',
+                                 template.Template(tmpl))
+        self.stack.store()
+
+        self.stack.create()
+
+        self.assertIs(trace.NULL_TRACER, self.stack.tracer)
+        self.assertEqual([], stack_trace_object.StackTrace.get_all_by_stack(
+            self.ctx, self.stack.id))
+
     def test_create_failure_recovery(self):
         """Check that rollback still works with dynamic metadata.
 
@@ -1754,6 +1894,115 @@ class StackTest(common.HeatTestCase):
         self.assertEqual((self.stack.DELETE, self.stack.COMPLETE),
                          self.stack.state)
 
+    def _create_stack_with_outputs(self):
+        tmpl = {'HeatTemplateFormatVersion': '2012-12-12',
+                'Resources': {
+                    'AResource': {'Type': 'ResourceWithPropsType',
+                                  'Properties': {'Foo': 'abc'}}},
+                'Outputs': {
+                    'Resource_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Foo']}},
+                    'Bad_attr': {
+                        'Value': {
+                            'Fn::GetAtt': ['AResource', 'Bar']}}}}
+
+        self.stack = stack.Stack(self.ctx, 'stack_with_cached_outputs',
+                                 template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual((stack.Stack.CREATE, stack.Stack.COMPLETE),
+                         self.stack.state)
+
+    def test_resolved_outputs_stored_on_create(self):
+        self._create_stack_with_outputs()
+
+        cached = stack_object.Stack.get_output_cache(self.ctx, self.stack.id)
+        self.assertEqual({'output_value': 'AResource'},
+                         cached['Resource_attr'])
+        self.assertIsNone(cached['Bad_attr']['output_value'])
+        self.assertIn('The Referenced Attribute (AResource Bar) is '
+                      'incorrect.', cached['Bad_attr']['output_error'])
+
+        get_value = self.patchobject(output.OutputDefinition, 'get_value')
+        self.assertEqual(cached, self.stack.resolved_outputs())
+        self.assertEqual({'output_value': 'AResource'},
+                         self.stack.resolved_output('Resource_attr'))
+        self.assertEqual(0, get_value.call_count)
+
+    def test_resolved_outputs_live(self):
+        self._create_stack_with_outputs()
+
+        get_value = self.patchobject(output.OutputDefinition, 'get_value',
+                                     return_value='live')
+        resolved = self.stack.resolved_outputs(live=True)
+        self.assertEqual({'output_value': 'live'}, resolved['Resource_attr'])
+        self.assertEqual(2, get_value.call_count)
+        self.assertEqual({'output_value': 'live'},
+                         self.stack.resolved_output('Resource_attr',
+                                                    live=True))
+        self.assertEqual(3, get_value.call_count)
+
+    def test_resolved_outputs_invalidated_by_resource(self):
+        self._create_stack_with_outputs()
+
+        self.stack['AResource'].state_set(self.stack['AResource'].CHECK,
+                                          self.stack['AResource'].COMPLETE)
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+
+        get_value = self.patchobject(output.OutputDefinition, 'get_value',
+                                     return_value='new')
+        self.assertEqual({'output_value': 'new'},
+                         self.stack.resolved_outputs()['Resource_attr'])
+        self.assertEqual(2, get_value.call_count)
+        # only the completion of a stack action stores the values again
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+
+    def test_resolved_outputs_invalidated_in_progress(self):
+        self._create_stack_with_outputs()
+
+        self.stack.state_set(self.stack.UPDATE, self.stack.IN_PROGRESS,
+                             'updating')
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+
+        self.stack.resolved_outputs()
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+
+    def test_resolved_outputs_not_cached(self):
+        cfg.CONF.set_override('cache_stack_outputs', False,
+                              enforce_type=True)
+        get_value = self.patchobject(output.OutputDefinition, 'get_value',
+                                     return_value='AResource')
+        self._create_stack_with_outputs()
+        # the outputs are not resolved when the action completes
+        self.assertEqual(0, get_value.call_count)
+
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+        self.assertEqual({'output_value': 'AResource'},
+                         self.stack.resolved_outputs()['Resource_attr'])
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, self.stack.id))
+
+    def test_invalidate_output_cache_parents(self):
+        self._create_stack_with_outputs()
+        parent_id = self.stack.id
+        nested = stack.Stack(self.ctx, 'nested_stack',
+                             template.Template(empty_template),
+                             owner_id=parent_id, nested_depth=1)
+        nested.store()
+        stack_object.Stack.set_output_cache(self.ctx, nested.id, {})
+
+        nested.invalidate_output_cache()
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, nested.id))
+        self.assertIsNone(stack_object.Stack.get_output_cache(
+            self.ctx, parent_id))
+
     def test_stack_load_no_param_value_validation(self):
         """Test stack loading with disabled parameter value validation."""
         tmpl = template_format.parse('''
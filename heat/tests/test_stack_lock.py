@@ -12,6 +12,7 @@
 #    under the License.
 
 import mock
+from oslo_config import cfg
 
 from heat.common import exception
 from heat.common import service_utils
@@ -169,6 +170,97 @@ class StackLockTest(common.HeatTestCase):
             [mock.call(self.context, self.stack_id,
                        'fake-engine-id', self.engine_id)] * 2)
 
+    def _setup_lease(self, expired):
+        cfg.CONF.set_override('stack_lock_lease_duration', 30,
+                              enforce_type=True)
+        self.patchobject(stack_lock_object.StackLock, 'lease_expired',
+                         return_value=expired)
+        self.mock_alive = self.patchobject(service_utils, 'engine_alive')
+
+    def test_successful_acquire_new_lock_lease(self):
+        self._setup_lease(None)
+        mock_create = self.patchobject(stack_lock_object.StackLock,
+                                       'create',
+                                       return_value=None)
+
+        slock = stack_lock.StackLock(self.context, self.stack_id,
+                                     self.engine_id)
+        slock.acquire()
+
+        mock_create.assert_called_once_with(
+            self.context, self.stack_id, self.engine_id, lease_duration=30)
+
+    def test_successful_acquire_existing_lock_lease_expired(self):
+        self._setup_lease(True)
+        self.patchobject(stack_lock_object.StackLock, 'create',
+                         return_value='fake-engine-id')
+        mock_steal = self.patchobject(stack_lock_object.StackLock,
+                                      'steal',
+                                      return_value=None)
+
+        slock = stack_lock.StackLock(self.context, self.stack_id,
+                                     self.engine_id)
+        slock.acquire()
+
+        self.assertFalse(self.mock_alive.called)
+        mock_steal.assert_called_once_with(
+            self.context, self.stack_id, 'fake-engine-id', self.engine_id,
+            lease_duration=30)
+
+    def test_failed_acquire_existing_lock_lease_current(self):
+        self._setup_lease(False)
+        self.patchobject(stack_lock_object.StackLock, 'create',
+                         return_value='fake-engine-id')
+        mock_steal = self.patchobject(stack_lock_object.StackLock, 'steal')
+
+        slock = stack_lock.StackLock(self.context, self.stack_id,
+                                     self.engine_id)
+        self.assertRaises(exception.ActionInProgress, slock.acquire)
+
+        self.assertFalse(self.mock_alive.called)
+        self.assertFalse(mock_steal.called)
+
+    def test_failed_acquire_existing_lock_lease_renewed(self):
+        self._setup_lease(True)
+        self.patchobject(stack_lock_object.StackLock, 'create',
+                         return_value='fake-engine-id')
+        self.patchobject(stack_lock_object.StackLock, 'steal',
+                         return_value='fake-engine-id')
+
+        slock = stack_lock.StackLock(self.context, self.stack_id,
+                                     self.engine_id)
+        self.assertRaises(exception.ActionInProgress, slock.acquire)
+        self.assertFalse(self.mock_alive.called)
+
+    def test_acquire_existing_lock_without_lease_checks_engine(self):
+        self._setup_lease(None)
+        self.mock_alive.return_value = True
+        self.patchobject(stack_lock_object.StackLock, 'create',
+                         return_value='fake-engine-id')
+
+        slock = stack_lock.StackLock(self.context, self.stack_id,
+                                     self.engine_id)
+        self.assertRaises(exception.ActionInProgress, slock.acquire)
+        self.mock_alive.assert_called_once_with(self.context,
+                                                'fake-engine-id')
+
+    def test_renew_leases(self):
+        self._setup_lease(None)
+        mock_renew = self.patchobject(stack_lock_object.StackLock, 'renew',
+                                      return_value=2)
+
+        stack_lock.renew_leases(self.context, self.engine_id)
+
+        mock_renew.assert_called_once_with(self.context, self.engine_id, 30)
+        self.assertEqual(10, stack_lock.heartbeat_interval())
+
+    def test_renew_leases_disabled(self):
+        mock_renew = self.patchobject(stack_lock_object.StackLock, 'renew')
+
+        stack_lock.renew_leases(self.context, self.engine_id)
+
+        self.assertFalse(mock_renew.called)
+
     def test_context_mgr_exception(self):
         stack_lock_object.StackLock.create = mock.Mock(return_value=None)
         stack_lock_object.StackLock.release = mock.Mock(return_value=None)
@@ -16,6 +16,7 @@ import hashlib
 import json
 
 import fixtures
+from oslo_config import cfg
 from oslotest import mockpatch
 import six
 from stevedore import extension
@@ -32,6 +33,7 @@ from heat.engine import parameters
 from heat.engine import rsrc_defn
 from heat.engine import stack
 from heat.engine import template
+from heat.objects import raw_template as template_object
 from heat.tests import common
 from heat.tests.openstack.nova import fakes as fakes_nova
 from heat.tests import utils
@@ -1485,6 +1487,68 @@ class TemplateTest(common.HeatTestCase):
         self.assertEqual(hot_tmpl.env, empty_template.env)
 
 
+class TemplateCacheTest(common.HeatTestCase):
+
+    def setUp(self):
+        super(TemplateCacheTest, self).setUp()
+        self.ctx = utils.dummy_context()
+        tmpl = template.Template(copy.deepcopy(resource_template),
+                                 env=environment.Environment({'foo': 'bar'}))
+        self.tmpl_id = tmpl.store(self.ctx)
+
+    def test_load_cached(self):
+        get = self.patchobject(template_object.RawTemplate, 'get_by_id',
+                               wraps=template_object.RawTemplate.get_by_id)
+        t1 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        t2 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+
+        self.assertEqual(1, get.call_count)
+        self.assertEqual(self.tmpl_id, t2.id)
+        self.assertEqual(t1.t, t2.t)
+        self.assertEqual({'foo': 'bar'}, t2.env.params)
+        self.assertIsNot(t1.env, t2.env)
+
+    def test_load_not_cached(self):
+        get = self.patchobject(template_object.RawTemplate, 'get_by_id',
+                               wraps=template_object.RawTemplate.get_by_id)
+        template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        template.Template.load(self.ctx, self.tmpl_id)
+
+        self.assertEqual(2, get.call_count)
+
+    def test_cached_template_unmodified(self):
+        t1 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        t1.remove_resource('foo')
+        t1.env.params['foo'] = 'baz'
+
+        t2 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        self.assertIn('foo', t2.t['Resources'])
+        self.assertEqual({'foo': 'bar'}, t2.env.params)
+
+    def test_store_invalidates_cache(self):
+        t1 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        t1.remove_resource('foo')
+        t1.store(self.ctx)
+
+        t2 = template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        self.assertNotIn('foo', t2.t['Resources'])
+
+    def test_cache_size(self):
+        template._template_cache.clear()
+        cfg.CONF.set_override('template_cache_size', 1, enforce_type=True)
+        tmpl = template.Template(copy.deepcopy(resource_template))
+        other_id = tmpl.store(self.ctx)
+
+        template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        template.Template.load(self.ctx, other_id, cache=True)
+        self.assertEqual([other_id], list(template._template_cache))
+
+        cfg.CONF.set_override('template_cache_size', 0, enforce_type=True)
+        template._template_cache.clear()
+        template.Template.load(self.ctx, self.tmpl_id, cache=True)
+        self.assertEqual(0, len(template._template_cache))
+
+
 class TemplateFnErrorTest(common.HeatTestCase):
     scenarios = [
         ('select_from_list_not_int',
@@ -148,6 +148,57 @@ Outputs: {}
         self.assertEqual(expected, template_format.parse(tmpl_str))
 
 
+class ParseCacheTest(common.HeatTestCase):
+
+    tmpl_str = """
+heat_template_version: 2015-04-30
+resources:
+  server:
+    type: OS::Nova::Server
+    properties:
+      networks: [{network: private}]
+"""
+
+    def setUp(self):
+        super(ParseCacheTest, self).setUp()
+        template_format._parse_cache.clear()
+        self.addCleanup(template_format._parse_cache.clear)
+
+    def test_parse_cached(self):
+        simple_parse = self.patchobject(template_format, 'simple_parse',
+                                        wraps=template_format.simple_parse)
+        tpl1 = template_format.parse(self.tmpl_str)
+        tpl2 = template_format.parse(self.tmpl_str)
+
+        self.assertEqual(1, simple_parse.call_count)
+        self.assertEqual(tpl1, tpl2)
+
+    def test_parse_cached_copy(self):
+        tpl1 = template_format.parse(self.tmpl_str)
+        tpl1['resources']['server']['properties']['networks'].append({})
+        del tpl1['heat_template_version']
+
+        tpl2 = template_format.parse(self.tmpl_str)
+        self.assertEqual('2015-04-30', tpl2['heat_template_version'])
+        self.assertEqual([{'network': 'private'}],
+                         tpl2['resources']['server']['properties']['networks'])
+
+    def test_parse_cache_size(self):
+        other_str = self.tmpl_str.replace('private', 'public')
+        self.patchobject(template_format, 'MAX_PARSE_CACHE_SIZE',
+                         len(self.tmpl_str) + 1)
+
+        template_format.parse(self.tmpl_str)
+        template_format.parse(other_str)
+
+        self.assertEqual(1, len(template_format._parse_cache))
+        self.assertEqual(len(other_str), template_format._parse_cache.size)
+
+    def test_parse_error_not_cached(self):
+        self.assertRaises(ValueError, template_format.parse, 'foo: bar')
+        self.assertEqual(0, len(template_format._parse_cache))
+
+
 class YamlParseExceptions(common.HeatTestCase):
 
     scenarios = [
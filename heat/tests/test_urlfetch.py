@@ -11,8 +11,13 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+
+import fixtures
+import mock
 from oslo_config import cfg
 import requests
+from requests import adapters
 from requests import exceptions
 import six
 
@@ -21,8 +26,10 @@ from heat.tests import common
 
 
 class Response(object):
-    def __init__(self, buf=''):
+    def __init__(self, buf='', status_code=200, headers=None):
         self.buf = buf
+        self.status_code = status_code
+        self.headers = headers or {}
 
     def iter_content(self, chunk_size=1):
         while self.buf:
@@ -32,11 +39,47 @@ class Response(object):
     def raise_for_status(self):
         pass
 
+    def close(self):
+        pass
+
+
+class CookieAdapter(adapters.BaseAdapter):
+    """A transport that sets a cookie and records the cookies sent to it."""
+
+    def __init__(self, data):
+        super(CookieAdapter, self).__init__()
+        self.data = data
+        self.cookies_sent = []
+
+    def send(self, request, **kwargs):
+        self.cookies_sent.append(request.headers.get('Cookie'))
+
+        def set_cookie(name, default=None):
+            if name == 'Set-Cookie':
+                return ['session=secret; Path=/']
+            return default if default is not None else []
+
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = request.url
+        resp.request = request
+        resp.raw = mock.Mock()
+        msg = resp.raw._original_response.msg
+        msg.get_all.side_effect = set_cookie
+        msg.getheaders.side_effect = set_cookie
+        resp._content = self.data
+        resp._content_consumed = True
+        return resp
+
+    def close(self):
+        pass
+
 
 class UrlFetchTest(common.HeatTestCase):
     def setUp(self):
         super(UrlFetchTest, self).setUp()
-        self.m.StubOutWithMock(requests, 'get')
+        self.patchobject(urlfetch, '_session', new=None)
+        self.m.StubOutWithMock(requests.Session, 'get')
 
     def test_file_scheme_default_behaviour(self):
         self.m.ReplayAll()
@@ -72,7 +115,7 @@ class UrlFetchTest(common.HeatTestCase):
         url = 'http://example.com/template'
         data = b'{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
@@ -81,7 +124,7 @@ class UrlFetchTest(common.HeatTestCase):
         url = 'https://example.com/template'
         data = b'{ "foo": "bar" }'
         response = Response(data)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         self.assertEqual(data, urlfetch.get(url))
         self.m.VerifyAll()
@@ -89,7 +132,8 @@ class UrlFetchTest(common.HeatTestCase):
     def test_http_error(self):
         url = 'http://example.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.HTTPError())
+        requests.Session.get(url, stream=True, headers={}).AndRaise(
+            exceptions.HTTPError())
         self.m.ReplayAll()
 
         self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
@@ -98,7 +142,8 @@ class UrlFetchTest(common.HeatTestCase):
     def test_non_exist_url(self):
         url = 'http://non-exist.com/template'
 
-        requests.get(url, stream=True).AndRaise(exceptions.Timeout())
+        requests.Session.get(url, stream=True, headers={}).AndRaise(
+            exceptions.Timeout())
         self.m.ReplayAll()
 
         self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
@@ -114,7 +159,7 @@ class UrlFetchTest(common.HeatTestCase):
         data = b'{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 500, enforce_type=True)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         urlfetch.get(url)
         self.m.VerifyAll()
@@ -124,9 +169,145 @@ class UrlFetchTest(common.HeatTestCase):
         data = b'{ "foo": "bar" }'
         response = Response(data)
         cfg.CONF.set_override('max_template_size', 5, enforce_type=True)
-        requests.get(url, stream=True).AndReturn(response)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
         self.m.ReplayAll()
         exception = self.assertRaises(urlfetch.URLFetchError,
                                       urlfetch.get, url)
         self.assertIn("Template exceeds", six.text_type(exception))
         self.m.VerifyAll()
+
+    def test_content_length_exceeds_max_fetch_size(self):
+        url = 'http://example.com/template'
+        response = Response(b'{}', headers={'Content-Length': '600'})
+        cfg.CONF.set_override('max_template_size', 500, enforce_type=True)
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
+        self.m.ReplayAll()
+        self.assertRaises(urlfetch.URLFetchError, urlfetch.get, url)
+        self.m.VerifyAll()
+
+    def test_content_shorter_than_content_length(self):
+        url = 'http://example.com/template'
+        data = b'{ "foo": "bar" }'
+        response = Response(data, headers={'Content-Length': '100'})
+        requests.Session.get(url, stream=True, headers={}).AndReturn(response)
+        self.m.ReplayAll()
+        self.assertEqual(data, urlfetch.get(url))
+        self.m.VerifyAll()
+
+
+class UrlFetchCacheTest(common.HeatTestCase):
+    url = 'http://example.com/template'
+    data = b'{ "foo": "bar" }'
+
+    def setUp(self):
+        super(UrlFetchCacheTest, self).setUp()
+        self.patchobject(urlfetch, '_session', new=None)
+        urlfetch._memory_cache.clear()
+        self.addCleanup(urlfetch._memory_cache.clear)
+        self.mock_get = self.patchobject(requests.Session, 'get')
+        cfg.CONF.set_override('template_url_cache_size', 2,
+                              enforce_type=True)
+
+    def _fetch(self, response):
+        self.mock_get.reset_mock()
+        self.mock_get.return_value = response
+        return urlfetch.get(self.url)
+
+    def test_not_modified(self):
+        headers = {'ETag': '"v1"', 'Last-Modified': 'yesterday'}
+        self.assertEqual(self.data,
+                         self._fetch(Response(self.data, headers=headers)))
+        self.mock_get.assert_called_once_with(self.url, stream=True,
+                                              headers={})
+
+        self.assertEqual(self.data, self._fetch(Response(status_code=304)))
+        self.mock_get.assert_called_once_with(
+            self.url, stream=True,
+            headers={'If-None-Match': '"v1"',
+                     'If-Modified-Since': 'yesterday'})
+
+    def test_modified(self):
+        self._fetch(Response(self.data, headers={'ETag': '"v1"'}))
+        new_data = b'{ "foo": "baz" }'
+        self.assertEqual(new_data,
+                         self._fetch(Response(new_data,
+                                              headers={'ETag': '"v2"'})))
+        self._fetch(Response(status_code=304))
+        self.mock_get.assert_called_once_with(
+            self.url, stream=True, headers={'If-None-Match': '"v2"'})
+
+    def test_no_validators(self):
+        self._fetch(Response(self.data))
+        self._fetch(Response(self.data))
+        self.mock_get.assert_called_once_with(self.url, stream=True,
+                                              headers={})
+
+    def test_no_store(self):
+        self._fetch(Response(self.data, headers={'ETag': '"v1"',
+                                                 'Cache-Control': 'no-store'}))
+        self._fetch(Response(self.data))
+        self.mock_get.assert_called_once_with(self.url, stream=True,
+                                              headers={})
+
+    def test_disabled(self):
+        cfg.CONF.set_override('template_url_cache_size', 0,
+                              enforce_type=True)
+        self._fetch(Response(self.data, headers={'ETag': '"v1"'}))
+        self._fetch(Response(self.data))
+        self.mock_get.assert_called_once_with(self.url, stream=True,
+                                              headers={})
+
+    def test_least_recently_used_evicted(self):
+        for i in range(3):
+            self.mock_get.return_value = Response(
+                self.data, headers={'ETag': '"%d"' % i})
+            urlfetch.get('%s/%d' % (self.url, i))
+        self.assertEqual(['%s/1' % self.url, '%s/2' % self.url],
+                         list(urlfetch._memory_cache))
+
+    def test_session_reused(self):
+        self._fetch(Response(self.data))
+        session = urlfetch._session
+        self.assertIsInstance(session, requests.Session)
+        self._fetch(Response(self.data))
+        self.assertIs(session, urlfetch._session)
+
+    def test_disk_cache(self):
+        cache_dir = os.path.join(self.useFixture(fixtures.TempDir()).path,
+                                 'cache')
+        cfg.CONF.set_override('template_url_cache_size', 0,
+                              enforce_type=True)
+        cfg.CONF.set_override('template_url_cache_dir', cache_dir,
+                              enforce_type=True)
+        self._fetch(Response(self.data, headers={'ETag': '"v1"'}))
+        self.assertEqual(2, len(os.listdir(cache_dir)))
+
+        self.assertEqual(self.data, self._fetch(Response(status_code=304)))
+        self.mock_get.assert_called_once_with(
+            self.url, stream=True, headers={'If-None-Match': '"v1"'})
+
+    def test_cached_exceeds_max_fetch_size(self):
+        self._fetch(Response(self.data, headers={'ETag': '"v1"'}))
+        cfg.CONF.set_override('max_template_size', 5, enforce_type=True)
+        self.assertRaises(urlfetch.URLFetchError,
+                          self._fetch, Response(status_code=304))
+
+
+class UrlFetchSessionTest(common.HeatTestCase):
+    url = 'http://example.com/template'
+    data = b'{ "foo": "bar" }'
+
+    def setUp(self):
+        super(UrlFetchSessionTest, self).setUp()
+        self.patchobject(urlfetch, '_session', new=None)
+        cfg.CONF.set_override('template_url_cache_size', 0,
+                              enforce_type=True)
+
+    def test_cookies_not_sent_back(self):
+        adapter = CookieAdapter(self.data)
+        urlfetch.get_session().mount('http://', adapter)
+
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual(self.data, urlfetch.get(self.url))
+        self.assertEqual([None, None], adapter.cookies_sent)
+        self.assertEqual(0, len(urlfetch.get_session().cookies))